@@ -0,0 +1,414 @@
+"""
+Revvy AI Companion - AI Admission Control
+The front door of the AI engine. One generation takes the whole CPU of a Pi for
+seconds, so queries are admitted through per-client token buckets into one bounded
+queue and run at most `max_concurrent_queries` at a time, on low priority threads.
+The driver's voice commands skip the rate limits and go ahead of remote clients;
+remote clients take turns. Identical queries already queued or running are merged.
+"""
+
+import os
+import re
+import time
+import logging
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger("AIAdmission")
+
+PRIORITY_DRIVER = 0     # Voice commands in the car
+PRIORITY_REMOTE = 1     # Websocket and HTTP clients
+
+DRIVER_CLIENT = "driver"
+
+REASON_RATE_LIMITED = "rate_limited"
+REASON_QUEUE_FULL = "queue_full"
+REASON_STOPPED = "stopped"
+
+# Clients whose token bucket is remembered
+MAX_TRACKED_CLIENTS = 256
+
+
+class AdmissionRejected(Exception):
+    """A query was not admitted, retry_after is a hint in seconds"""
+    
+    def __init__(self, reason, message, retry_after=None):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+    
+    def to_dict(self):
+        return {"error": "overloaded", "reason": self.reason, "message": str(self), "retry_after": self.retry_after}
+
+
+class TokenBucket:
+    """`rate` queries per second on average, at most `burst` at once"""
+    
+    __slots__ = ("rate", "burst", "tokens", "updated")
+    
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+    
+    def take(self):
+        """Take one token, returns 0 if there was one or the seconds until there is"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate if self.rate > 0 else None
+
+
+class QueryJob:
+    """One admitted query and everyone waiting for its answer"""
+    
+    __slots__ = ("query_id", "key", "text", "context", "client", "priority", "callbacks", "listeners",
+                 "token_listeners", "tokens", "stream_lock", "queued_at", "started_at", "done")
+    
+    def __init__(self, query_id, key, text, context, client, priority):
+        self.query_id = query_id
+        self.key = key
+        self.text = text
+        self.context = context
+        self.client = client
+        self.priority = priority
+        self.callbacks = []     # callback(query_id, response) of every merged request
+        self.listeners = []     # on_status(query_id, status dict) of every merged request
+        self.token_listeners = []   # on_token(query_id, text, index) of every merged request
+        self.tokens = []        # Pieces streamed so far, replayed to requests merged late
+        self.stream_lock = threading.Lock()     # Guards tokens and token_listeners, keeps each listener's pieces in order
+        self.queued_at = time.monotonic()
+        self.started_at = None
+        self.done = threading.Event()
+
+
+def normalize_query(text):
+    """Key of a query for duplicate detection: lower case, single spaces, no punctuation"""
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", text.lower())).strip()
+
+
+class AIAdmission:
+    """Admission control in front of an AI engine, with the engine's interface"""
+    
+    def __init__(self, engine, config):
+        self.engine = engine
+        self.config = config
+        self.max_concurrent = max(1, self.config.get("ai", "max_concurrent_queries", 1))
+        self.max_queued = self.config.get("ai", "max_queued_queries", 8)
+        self.client_rate = self.config.get("ai", "client_queries_per_minute", 6) / 60.0
+        self.client_burst = self.config.get("ai", "client_query_burst", 3)
+        self.generation_timeout = self.config.get("ai", "generation_timeout", 120.0)
+        self.worker_nice = self.config.get("ai", "worker_nice", 5)
+        
+        self.lock = threading.Condition()
+        self.queues = {}            # Client -> deque of its queued jobs
+        self.turns = deque()        # Remote clients with queued jobs, next to be served first
+        self.jobs = {}              # Normalized query -> queued or running job
+        self.by_id = {}             # query_id -> queued or running job
+        self.running = 0
+        self.buckets = OrderedDict()
+        self.query_ids = itertools.count(1)
+        
+        self.workers = []
+        self.active = False
+        
+        # Metrics
+        self.admitted = 0
+        self.merged = 0
+        self.rejected = {REASON_RATE_LIMITED: 0, REASON_QUEUE_FULL: 0, REASON_STOPPED: 0}
+        self.wait_time = 0.0        # Moving averages of seconds in the queue and generating
+        self.run_time = 0.0
+    
+    @property
+    def results(self):
+        return getattr(self.engine, "results", None)
+    
+    def __getattr__(self, name):
+        # Everything else (set_personality, interpret_dtc, ...) is the engine's
+        return getattr(self.engine, name)
+    
+    def start(self):
+        """Start the engine and the workers"""
+        self.engine.start()
+        with self.lock:
+            self.active = True
+        self.workers = [
+            threading.Thread(target=self._worker, name=f"AIWorker-{i}", daemon=True)
+            for i in range(self.max_concurrent)
+        ]
+        for worker in self.workers:
+            worker.start()
+        logger.info(f"AI admission: {self.max_concurrent} concurrent, {self.max_queued} queued, "
+                    f"{self.client_rate * 60:g}/min per client")
+    
+    def stop(self):
+        """Stop the workers (queued queries are dropped) and the engine"""
+        with self.lock:
+            self.active = False
+            dropped = [job for queue in self.queues.values() for job in queue]
+            self.queues.clear()
+            self.turns.clear()
+            self.lock.notify_all()
+        
+        for job in dropped:
+            self._forget(job)
+            if self.results is not None:
+                self.results.finish(job.query_id, error="AI stopped before the query ran")
+        
+        for worker in self.workers:
+            worker.join(timeout=5.0)
+        self.workers = []
+        self.engine.stop()
+    
+    def query(self, query_text, context=None, callback=None, on_token=None):
+        """Engine compatible query: submitted as the driver, returns the query_id"""
+        return self.submit(query_text, context, callback, client=DRIVER_CLIENT, priority=PRIORITY_DRIVER,
+                           on_token=on_token)["query_id"]
+    
+    def submit(self, query_text, context=None, callback=None, client=DRIVER_CLIENT,
+               priority=PRIORITY_REMOTE, on_status=None, on_token=None):
+        """Admit a query, returns {query_id, position, merged} or raises AdmissionRejected
+        
+        on_status(query_id, {"status", "position"}) is called as the query moves up the queue and starts,
+        on_token(query_id, text, index) with each piece of the answer as it is generated.
+        """
+        key = normalize_query(query_text)
+        with self.lock:
+            if not self.active:
+                self.rejected[REASON_STOPPED] += 1
+                raise AdmissionRejected(REASON_STOPPED, "The AI is not running")
+            
+            # The same question is already on its way: share its answer, costs no token
+            job = self.jobs.get(key)
+            merged = job is not None
+            if merged:
+                self.merged += 1
+                # The driver doesn't wait behind remote clients for a question it shares with them
+                if priority == PRIORITY_DRIVER and job.priority != PRIORITY_DRIVER and job.started_at is None:
+                    self._promote(job)
+            else:
+                job = self._admit(key, query_text, context, client, priority)
+            
+            if callback:
+                job.callbacks.append(callback)
+            if on_status:
+                job.listeners.append(on_status)
+            position = self._position(job)
+        
+        if on_token:
+            self._listen(job, on_token)
+        
+        # Pending right away, so the result can be waited for while the query is queued
+        if not merged and self.results is not None:
+            self.results.start(job.query_id, query_text)
+        return {"query_id": job.query_id, "position": position, "merged": merged}
+    
+    def _admit(self, key, query_text, context, client, priority):
+        """Queue a new job, raises AdmissionRejected past the client's rate or the queue cap (lock held)"""
+        if priority != PRIORITY_DRIVER:
+            retry_after = self._bucket(client).take()
+            if retry_after:
+                self.rejected[REASON_RATE_LIMITED] += 1
+                raise AdmissionRejected(REASON_RATE_LIMITED, "Too many questions, please wait a moment",
+                                        round(retry_after, 1))
+        
+        queued = sum(len(queue) for queue in self.queues.values())
+        if queued >= self.max_queued:
+            self.rejected[REASON_QUEUE_FULL] += 1
+            raise AdmissionRejected(REASON_QUEUE_FULL, "The AI is busy, please try again shortly",
+                                    round((self.run_time or 10.0) * (queued + 1) / self.max_concurrent, 1))
+        
+        job = QueryJob(f"q{int(time.time() * 1000)}-{next(self.query_ids)}", key, query_text,
+                       context, client, priority)
+        queue = self.queues.setdefault(client, deque())
+        queue.append(job)
+        if priority != PRIORITY_DRIVER and client not in self.turns:
+            self.turns.append(client)
+        self.jobs[key] = job
+        self.by_id[job.query_id] = job
+        self.admitted += 1
+        self.lock.notify()
+        return job
+    
+    def _promote(self, job):
+        """Move a queued remote job to the front of the line, in the driver's queue (lock held)"""
+        queue = self.queues[job.client]
+        queue.remove(job)
+        if not queue and job.client in self.turns:
+            self.turns.remove(job.client)
+        
+        job.client = DRIVER_CLIENT
+        job.priority = PRIORITY_DRIVER
+        self.queues.setdefault(DRIVER_CLIENT, deque()).append(job)
+    
+    def _listen(self, job, on_token):
+        """Stream a job's answer to on_token, starting with the pieces already generated"""
+        with job.stream_lock:
+            for index, text in enumerate(job.tokens):
+                self._call_token_listener(on_token, job, text, index)
+            job.token_listeners.append(on_token)
+    
+    def position(self, query_id):
+        """Queue position of a query (1 = next), 0 if running, None if unknown or finished"""
+        with self.lock:
+            job = self.by_id.get(query_id)
+            return self._position(job) if job else None
+    
+    def _bucket(self, client):
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self.buckets[client] = bucket
+            if len(self.buckets) > MAX_TRACKED_CLIENTS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+        return bucket
+    
+    def _order(self):
+        """Queued jobs in the order they will run: driver first, then remote clients taking turns"""
+        order = list(self.queues.get(DRIVER_CLIENT, ()))
+        remote = [deque(self.queues[client]) for client in self.turns if self.queues.get(client)]
+        while remote:
+            for queue in list(remote):
+                order.append(queue.popleft())
+                if not queue:
+                    remote.remove(queue)
+        return order
+    
+    def _position(self, job):
+        if job.started_at is not None:
+            return 0
+        return self._order().index(job) + 1
+    
+    def _next_job(self):
+        """Take the next job off the queues (lock held)"""
+        driver = self.queues.get(DRIVER_CLIENT)
+        if driver:
+            return driver.popleft()
+        
+        while self.turns:
+            client = self.turns.popleft()
+            queue = self.queues.get(client)
+            if not queue:
+                continue
+            job = queue.popleft()
+            # Back of the line for its next query
+            if queue:
+                self.turns.append(client)
+            return job
+        return None
+    
+    def _forget(self, job):
+        with self.lock:
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+            self.by_id.pop(job.query_id, None)
+    
+    def _worker(self):
+        # Generations are CPU bound, keep them behind the OBD, GPS and API threads
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.worker_nice)
+        except (AttributeError, OSError) as e:
+            logger.debug(f"Could not lower AI worker priority: {e}")
+        
+        while True:
+            with self.lock:
+                job = None
+                while self.active and job is None:
+                    job = self._next_job()
+                    if job is None:
+                        self.lock.wait()
+                if not self.active:
+                    return
+                
+                job.started_at = time.monotonic()
+                self.wait_time += (job.started_at - job.queued_at - self.wait_time) * 0.2
+                self.running += 1
+                waiting = self._order()
+            
+            self._notify(job, "running", 0)
+            for position, queued in enumerate(waiting, 1):
+                self._notify(queued, "queued", position)
+            
+            try:
+                callback = lambda qid, response: self._finish(job, response)
+                on_token = lambda qid, text, index: self._token(job, text, index)
+                
+                # Generate on this (low priority) thread when the engine can, it stops at the deadline
+                run_query = getattr(self.engine, "run_query", None)
+                if run_query:
+                    run_query(job.text, job.context, callback, query_id=job.query_id, on_token=on_token,
+                              deadline=job.started_at + self.generation_timeout)
+                else:
+                    self.engine.query(job.text, job.context, callback, query_id=job.query_id, on_token=on_token)
+                
+                # Engines answering on their own thread get the same time
+                remaining = job.started_at + self.generation_timeout - time.monotonic()
+                if not job.done.wait(max(0.0, remaining)):
+                    logger.error(f"AI query {job.query_id} did not finish within {self.generation_timeout:g} s")
+                    self._forget(job)
+                    if self.results is not None:
+                        self.results.finish(job.query_id, error=f"No answer within {self.generation_timeout:g} s")
+            except Exception as e:
+                logger.error(f"Error running AI query {job.query_id}: {e}")
+                self._forget(job)
+                if self.results is not None:
+                    self.results.finish(job.query_id, error=e)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.run_time += (time.monotonic() - job.started_at - self.run_time) * 0.2
+    
+    def _finish(self, job, response):
+        """The engine answered: deliver it to every merged request"""
+        self._forget(job)
+        job.done.set()
+        for callback in job.callbacks:
+            try:
+                callback(job.query_id, response)
+            except Exception as e:
+                logger.error(f"Error in AI query callback: {e}")
+    
+    def _token(self, job, text, index):
+        """The engine streamed a piece of the answer: pass it to every merged request"""
+        # Only the job's own lock is held, a slow listener never blocks admission
+        with job.stream_lock:
+            job.tokens.append(text)
+            for listener in job.token_listeners:
+                self._call_token_listener(listener, job, text, index)
+    
+    def _call_token_listener(self, listener, job, text, index):
+        try:
+            listener(job.query_id, text, index)
+        except Exception as e:
+            logger.error(f"Error in AI token listener: {e}")
+    
+    def _notify(self, job, status, position):
+        for listener in job.listeners:
+            try:
+                listener(job.query_id, {"status": status, "position": position})
+            except Exception as e:
+                logger.error(f"Error in AI query status listener: {e}")
+    
+    def get_stats(self):
+        with self.lock:
+            stats = {
+                "queued": sum(len(queue) for queue in self.queues.values()),
+                "running": self.running,
+                "admitted": self.admitted,
+                "merged": self.merged,
+                "rejected": dict(self.rejected),
+                "queue_wait_s": round(self.wait_time, 2),
+                "generation_s": round(self.run_time, 2)
+            }
+        
+        engine_stats = getattr(self.engine, "get_stats", None)
+        if engine_stats:
+            stats["engine"] = engine_stats()
+        return stats
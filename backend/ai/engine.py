@@ -1,89 +1,529 @@
-# Add unit awareness to the AI Engine
+"""
+Revvy AI Companion - AI Engine
+Runs the local LLM (a GGUF model on llama.cpp). The weights are memory-mapped and
+loaded once, on a background thread, so the rest of the system comes up right away:
+the file is read ahead into the page cache, the model is created and a short warm-up
+generation runs before the engine reports ready.
+
+Prompts start with a prefix that only changes with the personality (persona, behavior
+guide, unit system). Its evaluated KV state is kept per personality and restored
+instead of evaluating it again, and the context left by the last answer is reused by
+llama.cpp's prefix match, so a follow-up only evaluates the tokens that are new.
+"""
+
+import os
+import re
+import time
+import logging
+import itertools
+import threading
+import textwrap
+from collections import OrderedDict
 from datetime import datetime
+from llama_cpp import Llama
+from .results import QueryResults
+from .response_cache import ResponseCache
 
-def _build_prompt(self, query, context=None):
-    """Build a prompt with context and conversation history"""
-    # Get personality traits
-    personality_traits = self._get_personality_traits()
-    
-    # Get unit system
-    unit_system = self.config.get("display", "unit_system", "metric")
+logger = logging.getLogger("AIEngine")
+
+STATE_STOPPED = "stopped"
+STATE_LOADING = "loading"
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_ERROR = "error"
+
+# Page cache read-ahead block size, and the share of load progress it accounts for
+PREFETCH_BLOCK = 8 * 1024 * 1024
+PREFETCH_PROGRESS = 0.7
+
+PERSONALITIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "personalities.js")
+
+WARMING_UP_RESPONSE = "I'm still warming up, give me a few more seconds."
+
+
+def load_behavior_guides(path=PERSONALITIES_PATH):
+    """Get {personality: behavior guide} from the personality profiles shared with the frontend"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+    except OSError as e:
+        logger.warning(f"Could not read personality profiles: {e}")
+        return {}
     
-    # Start with system prompt
-    prompt = f"""You are {self.current_personality}, an AI assistant for vehicles. 
-{personality_traits}
+    guides = {}
+    for name, guide in re.findall(r'"([^"]+)":\s*\{.*?behaviorGuide:\s*`(.*?)`', source, re.DOTALL):
+        guides[name] = textwrap.dedent(guide).strip()
+    return guides
 
-Current Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Using {unit_system.capitalize()} Units
-"""
+
+class AIEngine:
+    """Local LLM with background load, warm-up and a result store"""
+    
+    def __init__(self, config):
+        self.config = config
+        self.model_path = self.config.get("ai", "model_path")
+        self.max_tokens = self.config.get("ai", "max_tokens", 256)
+        self.temperature = self.config.get("ai", "temperature", 0.7)
+        self.load_wait = self.config.get("ai", "load_wait", 30.0)
+        
+        self.llm = None
+        self.running = False
+        self.loader = None
+        self.ready = threading.Event()
+        self.generate_lock = threading.Lock()   # One llama context, one generation at a time
+        
+        self.status = {"state": STATE_STOPPED, "progress": 0.0, "message": "Not started", "error": None}
+        self.status_listeners = []
+        self.load_seconds = None
+        
+        self.current_personality = "Revvy OG"
+        self.behavior_guides = load_behavior_guides()
+        self.vehicle_context = {}
+        self.conversation_history = []
+        
+        # Evaluated KV state of each stable prefix {prefix: (tokens, LlamaState)}, least recently used first
+        self.prefix_cache_entries = self.config.get("ai", "prefix_cache_entries", 3)
+        self.prefix_states = OrderedDict()
+        self.kv_stats = {"prefix_hits": 0, "prefix_misses": 0, "context_hits": 0,
+                         "prompt_tokens": 0, "reused_tokens": 0, "first_token_s": 0.0}
+        
+        # Answers by query_id for clients that can't take a callback
+        self.results = QueryResults(
+            ttl=self.config.get("ai", "result_ttl", 300),
+            max_entries=self.config.get("ai", "max_results", 256)
+        )
+        self.query_counter = itertools.count(1)
+        
+        # Answers to repeated questions about a car in the same state
+        self.response_cache = None
+        if self.config.get("ai", "response_cache", True):
+            self.response_cache = ResponseCache(
+                self.config.get("ai", "response_cache_path", "./data/ai_response_cache.json"),
+                max_entries=self.config.get("ai", "response_cache_entries", 256),
+                ttl=self.config.get("ai", "response_cache_ttl", 3600),
+                model=os.path.basename(self.model_path or "")
+            )
+        
+        logger.info(f"AI Engine initialized ({len(self.behavior_guides)} personalities)")
+    
+    def start(self):
+        """Start loading the model in the background, returns right away"""
+        if self.running:
+            return
+        
+        self.running = True
+        self.loader = threading.Thread(target=self._load, name="AIModelLoader")
+        self.loader.daemon = True
+        self.loader.start()
+    
+    def stop(self):
+        """Stop the engine and release the model"""
+        self.running = False
+        if self.loader:
+            self.loader.join(timeout=5.0)
+            self.loader = None
+        
+        with self.generate_lock:
+            self.ready.clear()
+            self.llm = None
+            self.prefix_states.clear()
+        if self.response_cache:
+            self.response_cache.save()
+        self._set_status(STATE_STOPPED, 0.0, "Stopped")
+        logger.info("AI Engine stopped")
+    
+    def is_ready(self):
+        return self.ready.is_set()
+    
+    def get_status(self):
+        """Load state: {state, progress 0..1, message, error}"""
+        return dict(self.status)
+    
+    def add_status_listener(self, listener):
+        """Call listener(status) on every load state or progress change"""
+        self.status_listeners = self.status_listeners + [listener]
+        listener(self.get_status())
+    
+    def remove_status_listener(self, listener):
+        self.status_listeners = [l for l in self.status_listeners if l is not listener]
+    
+    def _set_status(self, state, progress, message, error=None):
+        self.status = {"state": state, "progress": round(progress, 3), "message": message, "error": error}
+        for listener in self.status_listeners:
+            try:
+                listener(self.get_status())
+            except Exception as e:
+                logger.error(f"Error in AI status listener: {e}")
+    
+    def _load(self):
+        """Read the weights into the page cache, create the model and warm it up (loader thread)"""
+        started = time.monotonic()
+        try:
+            if not self.model_path or not os.path.isfile(self.model_path):
+                raise FileNotFoundError(f"Model not found: {self.model_path}")
+            
+            if self.config.get("ai", "prefetch_model", True):
+                self._prefetch()
+            if not self.running:
+                return
+            
+            # mmap'd: the pages just read are mapped, not copied
+            self._set_status(STATE_LOADING, PREFETCH_PROGRESS, "Creating model")
+            llm = Llama(
+                model_path=self.model_path,
+                n_ctx=self.config.get("ai", "context_size", 2048),
+                n_batch=self.config.get("ai", "batch_size", 128),
+                n_threads=self.config.get("ai", "threads", max(1, (os.cpu_count() or 2) - 1)),
+                use_mmap=True,
+                use_mlock=self.config.get("ai", "use_mlock", False),
+                verbose=False
+            )
+            
+            with self.generate_lock:
+                self.llm = llm
+            
+            # The first evaluation faults in the rest of the weights and sizes the buffers,
+            # and leaves the current personality's prefix cached
+            if self.config.get("ai", "warmup", True):
+                self._set_status(STATE_WARMING, 0.9, "Warming up")
+                self.generate(self._build_prompt("Hello"), max_tokens=1)
+            
+            self.load_seconds = time.monotonic() - started
+            self.ready.set()
+            self._set_status(STATE_READY, 1.0, f"Ready in {self.load_seconds:.1f} s")
+            logger.info(f"AI model ready in {self.load_seconds:.1f} s")
+        
+        except Exception as e:
+            logger.error(f"Failed to load AI model: {e}")
+            self._set_status(STATE_ERROR, 0.0, "Model failed to load", str(e))
+    
+    def _prefetch(self):
+        """Read the model file once so the page cache holds it before llama.cpp maps it"""
+        size = os.path.getsize(self.model_path)
+        done = 0
+        with open(self.model_path, "rb", buffering=0) as f:
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except (AttributeError, OSError):
+                pass
+            
+            block = bytearray(PREFETCH_BLOCK)
+            while self.running:
+                n = f.readinto(block)
+                if not n:
+                    break
+                done += n
+                self._set_status(STATE_LOADING, PREFETCH_PROGRESS * done / size,
+                                 f"Reading model {done * 100 // size}%")
     
-    # Add vehicle context if available
-    if context and 'vehicle_data' in context:
-        vehicle_data = context['vehicle_data']
-        
-        # Format vehicle data with appropriate units
-        vehicle_context = "Current Vehicle Status:\n"
-        
-        # Speed in appropriate units
-        if 'speed' in vehicle_data and vehicle_data['speed'] is not None:
-            speed_unit = "mph" if unit_system == "imperial" else "km/h"
-            vehicle_context += f"- Speed: {round(vehicle_data['speed'])} {speed_unit}\n"
-        
-        # Engine RPM
-        if 'rpm' in vehicle_data and vehicle_data['rpm'] is not None:
-            vehicle_context += f"- Engine RPM: {vehicle_data['rpm']}\n"
-        
-        # Temperature in appropriate units
-        if 'coolant_temp' in vehicle_data and vehicle_data['coolant_temp'] is not None:
-            temp_unit = "°F" if unit_system == "imperial" else "°C"
-            vehicle_context += f"- Coolant Temperature: {round(vehicle_data['coolant_temp'])} {temp_unit}\n"
-        
-        # Fuel level
-        if 'fuel_level' in vehicle_data and vehicle_data['fuel_level'] is not None:
-            vehicle_context += f"- Fuel Level: {round(vehicle_data['fuel_level'])}%\n"
-        
-        # Throttle position
-        if 'throttle_pos' in vehicle_data and vehicle_data['throttle_pos'] is not None:
-            vehicle_context += f"- Throttle Position: {round(vehicle_data['throttle_pos'])}%\n"
-        
-        # Boost pressure if vehicle has turbo
-        if 'has_turbo' in vehicle_data and vehicle_data['has_turbo'] and 'boost_pressure' in vehicle_data:
-            pressure_unit = "psi" if unit_system == "imperial" else "kPa"
-            boost = vehicle_data['boost_pressure']
-            if boost is not None:
-                vehicle_context += f"- Boost Pressure: {round(boost) if unit_system == 'metric' else boost} {pressure_unit}\n"
-        
-        # Add diagnostic status
-        if 'dtc_codes' in vehicle_data and vehicle_data['dtc_codes']:
-            vehicle_context += f"- Check Engine Light: ON\n"
-            vehicle_context += f"- DTC Codes: {', '.join(vehicle_data['dtc_codes'])}\n"
+    def query(self, query_text, context=None, callback=None, query_id=None, on_token=None):
+        """Answer a query on a new thread, returns its query_id; callback(query_id, response) when done
+        
+        on_token(query_id, text, index) is called with each piece of the answer as it is generated.
+        """
+        query_id = query_id or f"q{int(time.time() * 1000)}-{next(self.query_counter)}"
+        self.results.start(query_id, query_text)
+        
+        thread = threading.Thread(target=self.run_query, args=(query_text, context, callback, query_id, on_token),
+                                  name=f"AIQuery-{query_id}")
+        thread.daemon = True
+        thread.start()
+        return query_id
+    
+    def run_query(self, query_text, context=None, callback=None, query_id=None, on_token=None, deadline=None):
+        """Answer a query on the calling thread (admission workers use this)
+        
+        Generation stops at `deadline` (time.monotonic()), the query then finishes with an error.
+        """
+        query_id = query_id or f"q{int(time.time() * 1000)}-{next(self.query_counter)}"
+        self.results.start(query_id, query_text)
+        
+        if context is None and self.vehicle_context:
+            context = {'vehicle_data': self.vehicle_context}
+        
+        # Same question about a car in the same state: answer at once, even while the model loads
+        cache_key = self._cache_key(query_text, context)
+        response = self.response_cache.get(cache_key) if cache_key else None
+        if response is not None:
+            if on_token:
+                on_token(query_id, response, 0)
+            self._remember(query_text, response)
+            self.results.finish(query_id, response)
+        
+        # Right after ignition the model may still be loading, wait a little for it
+        elif not self.ready.wait(self.load_wait):
+            response = WARMING_UP_RESPONSE if self.status["state"] != STATE_ERROR else \
+                "My AI brain isn't available right now."
+            self.results.finish(query_id, response)
         else:
-            vehicle_context += f"- Check Engine Light: OFF\n"
+            try:
+                stream = (lambda text, index: on_token(query_id, text, index)) if on_token else None
+                response = self.generate(self._build_prompt(query_text, context), on_token=stream, deadline=deadline)
+                self._remember(query_text, response)
+                self._cache_response(cache_key, response)
+                self.results.finish(query_id, response)
+            except TimeoutError as e:
+                logger.error(f"Query {query_id} stopped: {e}")
+                response = "Sorry, that took me too long to think about."
+                self.results.finish(query_id, error=e)
+            except Exception as e:
+                logger.error(f"Error generating response: {e}")
+                response = "I'm sorry, I had trouble thinking about that."
+                self.results.finish(query_id, error=e)
+        
+        if callback:
+            callback(query_id, response)
+        return response
+    
+    def generate(self, prompt, max_tokens=None, on_token=None, deadline=None):
+        """Complete a prompt, returns the text; streams it to on_token(text, index) if given
         
-        # Add vehicle context to prompt
-        prompt += f"\n{vehicle_context}\n"
+        Raises TimeoutError if still generating at `deadline` (time.monotonic()).
+        """
+        with self.generate_lock:
+            if self.llm is None:
+                raise RuntimeError("Model not loaded")
+            
+            prefix = self._stable_prefix()
+            if prompt.startswith(prefix):
+                self._restore_prefix(prefix)
+            self._count_reuse(prompt)
+            
+            started = time.monotonic()
+            output = self.llm(
+                prompt,
+                max_tokens=max_tokens or self.max_tokens,
+                temperature=self.temperature,
+                stop=["\nUser:", "User:"],
+                stream=on_token is not None or deadline is not None
+            )
+            if on_token is None and deadline is None:
+                return output["choices"][0]["text"].strip()
+            
+            # Pieces go out as llama.cpp yields them (it holds back what could be a stop sequence)
+            pieces = []
+            for chunk in output:
+                # Checked between tokens, closing the stream stops llama.cpp
+                if deadline is not None and time.monotonic() > deadline:
+                    output.close()
+                    raise TimeoutError(f"Generation timed out after {len(pieces)} pieces")
+                
+                text = chunk["choices"][0]["text"]
+                if not pieces:
+                    text = text.lstrip()
+                    if not text:
+                        continue
+                    first_token = time.monotonic() - started
+                    self.kv_stats["first_token_s"] += (first_token - self.kv_stats["first_token_s"]) * 0.2
+                if on_token:
+                    try:
+                        on_token(text, len(pieces))
+                    except Exception as e:
+                        logger.error(f"Error in AI token callback: {e}")
+                pieces.append(text)
+        return "".join(pieces).strip()
+    
+    def _evaluated_tokens(self):
+        """Tokens whose KV state is in the context now (generate lock held)"""
+        # eval_tokens before llama-cpp-python 0.1.79, _input_ids after
+        tokens = getattr(self.llm, "eval_tokens", None)
+        if tokens is None:
+            tokens = self.llm._input_ids
+        return tokens.tolist() if hasattr(tokens, "tolist") else list(tokens)
+    
+    def _restore_prefix(self, prefix):
+        """Make sure the context starts with the evaluated prefix, from the cache if it can (generate lock held)"""
+        entry = self.prefix_states.get(prefix)
+        tokens = entry[0] if entry else self.llm.tokenize(prefix.encode("utf-8"))
+        
+        # Still there from the last answer: the conversation is kept too
+        if self._evaluated_tokens()[:len(tokens)] == tokens:
+            self.kv_stats["context_hits"] += 1
+            return
+        
+        if entry:
+            self.llm.load_state(entry[1])
+            self.prefix_states.move_to_end(prefix)
+            self.kv_stats["prefix_hits"] += 1
+            return
+        
+        started = time.monotonic()
+        self.llm.reset()
+        self.llm.eval(tokens)
+        self.kv_stats["prefix_misses"] += 1
+        if self.prefix_cache_entries <= 0:
+            return
+        
+        self.prefix_states[prefix] = (tokens, self.llm.save_state())
+        while len(self.prefix_states) > self.prefix_cache_entries:
+            self.prefix_states.popitem(last=False)
+        logger.debug(f"Cached the prompt prefix of {self.current_personality}: {len(tokens)} tokens "
+                     f"in {time.monotonic() - started:.1f} s")
+    
+    def _count_reuse(self, prompt):
+        """Count the prompt tokens llama.cpp will take from the context instead of evaluating"""
+        tokens = self.llm.tokenize(prompt.encode("utf-8"))
+        reused = 0
+        for a, b in zip(self._evaluated_tokens(), tokens[:-1]):
+            if a != b:
+                break
+            reused += 1
+        self.kv_stats["prompt_tokens"] += len(tokens)
+        self.kv_stats["reused_tokens"] += reused
+    
+    def get_stats(self):
+        """Prompt reuse counters (prefix cache hits and misses, prompt tokens taken from the context)
+        the moving average time to the first streamed token and the response cache hit rate"""
+        # No lock: a generation holds it for seconds, and counters a little stale are fine
+        stats = dict(self.kv_stats)
+        stats["first_token_s"] = round(stats["first_token_s"], 2)
+        stats["cached_prefixes"] = len(self.prefix_states)
+        stats["reuse_ratio"] = round(stats["reused_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else None
+        stats["load_seconds"] = round(self.load_seconds, 1) if self.load_seconds is not None else None
+        if self.response_cache is not None:
+            stats["response_cache"] = self.response_cache.get_stats()
+        return stats
     
-    # Add GPS location if available
-    if context and 'gps_data' in context:
-        gps_data = context['gps_data']
-        if gps_data.get('fix', False):
-            lat = gps_data.get('latitude')
-            lon = gps_data.get('longitude')
-            prompt += f"\nCurrent Location: {lat}, {lon}\n"
+    def _cache_key(self, query_text, context):
+        """Response cache key of a query, None if it isn't cacheable"""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.key(query_text, self.current_personality, context,
+                                       self.config.get("display", "unit_system", "metric"))
     
-    # Add conversation history
-    if hasattr(self, 'conversation_history') and self.conversation_history:
-        prompt += "\nConversation History:\n"
+    def _cache_response(self, cache_key, response):
+        if cache_key and self.response_cache is not None:
+            self.response_cache.put(cache_key, response)
+            self.response_cache.save()
+    
+    def _remember(self, query_text, response):
+        if not self.config.get("ai", "contextual_memory", True):
+            return
+        self.conversation_history.append({"user": query_text, "assistant": response})
         
-        # Get the last few conversations based on memory limit
+        # Dropped half a window at a time: in between, each prompt extends the previous one's
+        # history and the cached prefix of the conversation is reused
         memory_limit = self.config.get("ai", "memory_limit", 10)
-        recent_history = self.conversation_history[-memory_limit:]
+        if len(self.conversation_history) > memory_limit:
+            del self.conversation_history[:len(self.conversation_history) - memory_limit // 2]
+    
+    def update_vehicle_context(self, vehicle_data):
+        """Latest vehicle data, used when a query has no context of its own"""
+        self.vehicle_context = vehicle_data or {}
+    
+    def set_personality(self, personality):
+        """Switch personality, the conversation starts over"""
+        if personality != self.current_personality:
+            self.current_personality = personality
+            self.conversation_history = []
+        return True
+    
+    def interpret_dtc(self, dtc_code):
+        """Explain a diagnostic trouble code in a few sentences"""
+        # What a code means doesn't depend on the rest of the car's state
+        cache_key = self._cache_key(f"explain dtc {dtc_code}", None)
+        response = self.response_cache.get(cache_key) if cache_key else None
+        if response is not None:
+            return response
         
-        for entry in recent_history:
-            prompt += f"User: {entry['user']}\n"
-            prompt += f"Revvy: {entry['assistant']}\n"
+        if not self.ready.wait(self.load_wait):
+            return WARMING_UP_RESPONSE
+        response = self.generate(self._build_prompt(
+            f"Explain diagnostic trouble code {dtc_code}: what it means, how serious it is and what to check."))
+        self._cache_response(cache_key, response)
+        return response
     
-    # Add the current query
-    prompt += f"\nUser: {query}\nRevvy: "
+    def _get_personality_traits(self):
+        """Behavior guide of the current personality"""
+        return self.behavior_guides.get(self.current_personality) or self.behavior_guides.get("Revvy OG", "")
     
-    return prompt
\ No newline at end of file
+    def _stable_prefix(self):
+        """Start of every prompt that only changes with the personality or unit system"""
+        personality_traits = self._get_personality_traits()
+        unit_system = self.config.get("display", "unit_system", "metric")
+        
+        return f"""You are {self.current_personality}, an AI assistant for vehicles. 
+{personality_traits}
+
+Using {unit_system.capitalize()} Units
+"""
+    
+    def _build_prompt(self, query, context=None):
+        """Build a prompt with context and conversation history
+        
+        Ordered from the least to the most volatile (persona, conversation, time, vehicle
+        status, query) so consecutive prompts share as long a start as possible.
+        """
+        unit_system = self.config.get("display", "unit_system", "metric")
+        prompt = self._stable_prefix()
+        
+        # Add conversation history
+        if hasattr(self, 'conversation_history') and self.conversation_history:
+            prompt += "\nConversation History:\n"
+            
+            # All of it, _remember keeps it within the memory limit
+            for entry in self.conversation_history:
+                prompt += f"User: {entry['user']}\n"
+                prompt += f"Revvy: {entry['assistant']}\n"
+        
+        # To the minute, seconds would only make prompts differ sooner
+        prompt += f"\nCurrent Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
+        
+        # Add vehicle context if available
+        if context and 'vehicle_data' in context:
+            vehicle_data = context['vehicle_data']
+            
+            # Format vehicle data with appropriate units
+            vehicle_context = "Current Vehicle Status:\n"
+            
+            # Speed in appropriate units
+            if 'speed' in vehicle_data and vehicle_data['speed'] is not None:
+                speed_unit = "mph" if unit_system == "imperial" else "km/h"
+                vehicle_context += f"- Speed: {round(vehicle_data['speed'])} {speed_unit}\n"
+            
+            # Engine RPM
+            if 'rpm' in vehicle_data and vehicle_data['rpm'] is not None:
+                vehicle_context += f"- Engine RPM: {vehicle_data['rpm']}\n"
+            
+            # Temperature in appropriate units
+            if 'coolant_temp' in vehicle_data and vehicle_data['coolant_temp'] is not None:
+                temp_unit = "°F" if unit_system == "imperial" else "°C"
+                vehicle_context += f"- Coolant Temperature: {round(vehicle_data['coolant_temp'])} {temp_unit}\n"
+            
+            # Fuel level
+            if 'fuel_level' in vehicle_data and vehicle_data['fuel_level'] is not None:
+                vehicle_context += f"- Fuel Level: {round(vehicle_data['fuel_level'])}%\n"
+            
+            # Throttle position
+            if 'throttle_pos' in vehicle_data and vehicle_data['throttle_pos'] is not None:
+                vehicle_context += f"- Throttle Position: {round(vehicle_data['throttle_pos'])}%\n"
+            
+            # Boost pressure if vehicle has turbo
+            if 'has_turbo' in vehicle_data and vehicle_data['has_turbo'] and 'boost_pressure' in vehicle_data:
+                pressure_unit = "psi" if unit_system == "imperial" else "kPa"
+                boost = vehicle_data['boost_pressure']
+                if boost is not None:
+                    vehicle_context += f"- Boost Pressure: {round(boost) if unit_system == 'metric' else boost} {pressure_unit}\n"
+            
+            # Add diagnostic status
+            if 'dtc_codes' in vehicle_data and vehicle_data['dtc_codes']:
+                vehicle_context += f"- Check Engine Light: ON\n"
+                vehicle_context += f"- DTC Codes: {', '.join(vehicle_data['dtc_codes'])}\n"
+            else:
+                vehicle_context += f"- Check Engine Light: OFF\n"
+            
+            # Add vehicle context to prompt
+            prompt += f"\n{vehicle_context}\n"
+        
+        # Add GPS location if available
+        if context and 'gps_data' in context:
+            gps_data = context['gps_data']
+            if gps_data.get('fix', False):
+                lat = gps_data.get('latitude')
+                lon = gps_data.get('longitude')
+                prompt += f"\nCurrent Location: {lat}, {lon}\n"
+        
+        # Add the current query
+        prompt += f"\nUser: {query}\nRevvy: "
+        
+        return prompt
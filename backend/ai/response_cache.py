@@ -0,0 +1,189 @@
+"""
+Revvy AI Companion - AI Response Cache
+Drivers ask the same things again and again. An answer is kept under the normalized
+question, the personality and a coarse fingerprint of the vehicle state it was given
+(coolant band, fuel band, speed band, check engine light, trouble codes), so the same
+question about a car in the same state is answered at once instead of generated again.
+The cache survives restarts.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from .admission import normalize_query
+
+logger = logging.getLogger("ResponseCache")
+
+# Questions that lean on the conversation ("why?", "what about that") or want a
+# different answer each time can't be answered from the cache
+FOLLOW_UP = re.compile(r"^(and|but|so|why|what about|how about)\b|\b(it|that|this|those|them|again|more|else)\b")
+FRESH = re.compile(r"\b(joke|random|surprise|story|time|date|today|tonight|now)\b")
+# Live values: the prompt has the exact figure, the fingerprint only its band, so an
+# answer quoting it (43% fuel, 92 degrees) would be replayed stale within the band
+LIVE = re.compile(r"\b(where|location|rpm|revs|throttle|boost|voltage|battery"
+                  r"|fuel|gas|petrol|diesel|tank|range|mileage"
+                  r"|speed|speeding|fast|slow|mph|kph|kmh"
+                  r"|temp|temps|temperature|hot|cold|warm|coolant|overheat\w*)\b")
+
+# Band edges of the fingerprint (metric)
+COOLANT_BANDS = (60, 90, 105)       # Cold, warming, normal, hot
+FUEL_BANDS = (15, 25, 50, 75)       # Percent
+SPEED_BANDS = (1, 50, 90)           # km/h: stopped, town, road, highway
+
+
+def band(value, edges):
+    """Index of the band value falls in, None if unknown"""
+    if value is None:
+        return None
+    return sum(1 for edge in edges if value >= edge)
+
+
+def context_fingerprint(context):
+    """Coarse, hashable summary of the vehicle state an answer depends on"""
+    vehicle_data = (context or {}).get("vehicle_data") or {}
+    
+    # Converted data carries its units, the bands are metric
+    coolant = vehicle_data.get("coolant_temp")
+    if coolant is not None and vehicle_data.get("coolant_temp_unit") == "F":
+        coolant = (coolant - 32) * 5 / 9
+    speed = vehicle_data.get("speed")
+    if speed is not None and vehicle_data.get("speed_unit") == "mph":
+        speed = speed * 1.609344
+    
+    dtc_codes = sorted(vehicle_data.get("dtc_codes") or [])
+    return "c{}-f{}-s{}-mil{}-{}".format(
+        band(coolant, COOLANT_BANDS),
+        band(vehicle_data.get("fuel_level"), FUEL_BANDS),
+        band(speed, SPEED_BANDS),
+        int(bool(dtc_codes)),
+        ",".join(dtc_codes)
+    )
+
+
+class ResponseCache:
+    """LRU of AI answers with a TTL, persisted as JSON"""
+    
+    def __init__(self, path, max_entries=256, ttl=3600.0, model=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.model = model      # Answers of another model are dropped on load
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.entries = OrderedDict()    # Key -> {"response", "created", "used", "hits"}, least recently used first
+        self.dirty = False
+        
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        
+        self.load()
+    
+    def key(self, query_text, personality, context=None, unit_system=None):
+        """Cache key of a query, None if its answer can't be reused"""
+        text = normalize_query(query_text)
+        if not text or FOLLOW_UP.search(text) or FRESH.search(text) or LIVE.search(text):
+            with self.lock:
+                self.skipped += 1
+            return None
+        return f"{personality}|{unit_system}|{context_fingerprint(context)}|{text}"
+    
+    def get(self, key):
+        """Get a cached answer, None on a miss"""
+        if key is None:
+            return None
+        
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry["created"] > self.ttl:
+                del self.entries[key]
+                self.dirty = True
+                entry = None
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            entry["used"] = now
+            entry["hits"] += 1
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry["response"]
+    
+    def put(self, key, response):
+        """Store an answer, evicting the least recently used past the cap"""
+        if key is None or not response:
+            return
+        
+        now = time.time()
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = {"response": response, "created": now, "used": now, "hits": 0}
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.dirty = True
+    
+    def load(self):
+        """Load unexpired answers from disk"""
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if self.model and data.get("model") != self.model:
+                logger.info("Cached AI answers are from another model, starting empty")
+                return
+            
+            now = time.time()
+            entries = [(key, entry) for key, entry in data.get("entries", {}).items()
+                       if now - entry.get("created", 0) <= self.ttl]
+            entries.sort(key=lambda item: item[1].get("used", 0))
+            with self.lock:
+                self.entries = OrderedDict(entries[-self.max_entries:])
+            logger.info(f"Loaded {len(self.entries)} cached AI answers")
+        except Exception as e:
+            logger.error(f"Error loading cached AI answers: {e}")
+    
+    def save(self):
+        """Write the answers to disk if they changed (atomically, so a power cut can't corrupt the file)"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"model": self.model, "entries": dict(self.entries)}
+            self.dirty = False
+        
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            with self.save_lock:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+        
+        except Exception as e:
+            logger.error(f"Error saving cached AI answers: {e}")
+    
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped": self.skipped,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None
+            }
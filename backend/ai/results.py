@@ -0,0 +1,109 @@
+"""
+Revvy AI Companion - Query Results
+Answers of AI queries kept by query_id for a while, so a client that only got the
+query_id back (HTTP, voice) can fetch or wait for the answer.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("QueryResults")
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+
+
+class QueryResults:
+    """Results of AI queries by query_id, dropped `ttl` seconds after they finish"""
+    
+    def __init__(self, ttl=300.0, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.results = OrderedDict()
+        self.condition = threading.Condition()
+        self.listeners = []
+    
+    def start(self, query_id, query_text=None):
+        """Record a query as pending (a result that already arrived is kept)"""
+        with self.condition:
+            if query_id not in self.results:
+                self.results[query_id] = {
+                    "query_id": query_id,
+                    "status": STATUS_PENDING,
+                    "query": query_text,
+                    "response": None,
+                    "error": None,
+                    "created": time.time(),
+                    "finished": None
+                }
+            self._expire()
+    
+    def finish(self, query_id, response=None, error=None):
+        """Store the answer (or error) of a query and wake everyone waiting for it"""
+        with self.condition:
+            result = dict(self.results.get(query_id) or {"query_id": query_id, "query": None, "created": time.time()})
+            result.update(
+                status=STATUS_ERROR if error else STATUS_DONE,
+                response=response,
+                error=str(error) if error else None,
+                finished=time.time()
+            )
+            # Finished results move to the end, expiry walks from the front
+            self.results.pop(query_id, None)
+            self.results[query_id] = result
+            self.condition.notify_all()
+        
+        for listener in self.listeners:
+            try:
+                listener(result)
+            except Exception as e:
+                logger.error(f"Error in query result listener: {e}")
+    
+    def get(self, query_id):
+        """Get a copy of a query's result, None if unknown or expired"""
+        with self.condition:
+            self._expire()
+            result = self.results.get(query_id)
+            return dict(result) if result else None
+    
+    def wait(self, query_id, timeout):
+        """Block until a query is finished or timeout passes, returns its result (None if unknown)"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                result = self.results.get(query_id)
+                if result is None or result["status"] != STATUS_PENDING:
+                    return dict(result) if result else None
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return dict(result)
+                self.condition.wait(remaining)
+    
+    def add_listener(self, listener):
+        """Call listener(result) whenever a query finishes (on the AI thread)"""
+        self.listeners = self.listeners + [listener]
+    
+    def remove_listener(self, listener):
+        self.listeners = [l for l in self.listeners if l is not listener]
+    
+    def _expire(self):
+        """Drop finished results older than the TTL and the oldest entries past the cap"""
+        now = time.time()
+        while self.results:
+            query_id, result = next(iter(self.results.items()))
+            finished = result["finished"]
+            expired = finished is not None and now - finished > self.ttl
+            # Pending queries that never finish must not stay forever either
+            stale = finished is None and now - result["created"] > self.ttl
+            if not (expired or stale or len(self.results) > self.max_entries):
+                break
+            self.results.popitem(last=False)
+    
+    def get_stats(self):
+        with self.condition:
+            pending = sum(1 for r in self.results.values() if r["status"] == STATUS_PENDING)
+            return {"results": len(self.results), "pending": pending}
@@ -0,0 +1,210 @@
+"""
+Revvy AI Companion - Websocket Fan-out
+One bounded send queue and writer task per websocket client, so a stalled client
+only ever delays itself. Telemetry is latest-wins, events are delivered in order
+or the client is disconnected.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger("FanOut")
+
+POLICY_DOWNRATE = "downrate"
+POLICY_DISCONNECT = "disconnect"
+
+
+class ClientChannel:
+    """Send queue and writer task of one websocket client"""
+    
+    def __init__(self, websocket, fanout):
+        self.websocket = websocket
+        self.fanout = fanout
+        self.name = getattr(websocket, "remote", None) or hex(id(websocket))
+        
+        self.events = deque()   # Lossless messages, in order
+        self.latest = {}        # Key -> newest unsent telemetry message
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.closed = False
+        self.close_reason = None
+        
+        # Slow consumer handling: telemetry intervals are divided by rate_factor
+        self.rate_factor = 1.0
+        self.window_start = time.monotonic()
+        self.window_coalesced = 0
+        
+        # Metrics
+        self.connected_at = time.time()
+        self.sent = 0
+        self.bytes_sent = 0
+        self.coalesced = 0
+        self.dropped_events = 0
+        self.max_depth = 0
+        self.send_time = 0.0     # Moving average of seconds per send
+    
+    @property
+    def depth(self):
+        return len(self.events) + len(self.latest)
+    
+    def start(self):
+        self.task = asyncio.get_event_loop().create_task(self._run())
+    
+    def offer_latest(self, key, message):
+        """Queue telemetry, replacing an unsent message with the same key"""
+        if self.closed:
+            return
+        if key in self.latest:
+            self.coalesced += 1
+            self.window_coalesced += 1
+        self.latest[key] = message
+        self._queued()
+    
+    def offer_event(self, message):
+        """Queue an event that must be delivered, disconnects the client if its queue is full"""
+        if self.closed:
+            return
+        if len(self.events) >= self.fanout.max_events:
+            self.dropped_events += 1
+            self.close(f"event queue full ({len(self.events)} queued)")
+            return
+        self.events.append(message)
+        self._queued()
+    
+    def _queued(self):
+        self.max_depth = max(self.max_depth, self.depth)
+        self.wakeup.set()
+    
+    def close(self, reason):
+        """Drop the client, its handler sees the socket close and unregisters it"""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        self.events.clear()
+        self.latest.clear()
+        self.wakeup.set()
+        self.fanout.disconnects += 1
+        logger.warning(f"Disconnecting websocket client {self.name}: {reason}")
+        asyncio.get_event_loop().create_task(self._close_socket())
+    
+    async def _close_socket(self):
+        if self.task and self.task is not asyncio.current_task():
+            self.task.cancel()
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+    
+    async def _run(self):
+        """Writer: events first, then the newest telemetry, one send at a time"""
+        try:
+            while not self.closed:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                
+                while (self.events or self.latest) and not self.closed:
+                    if self.events:
+                        message = self.events.popleft()
+                    else:
+                        key = next(iter(self.latest))
+                        message = self.latest.pop(key)
+                    await self._send(message)
+                    self._review_rate()
+        
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.close(f"send failed: {e}")
+    
+    async def _send(self, message):
+        started = time.monotonic()
+        try:
+            send = self.websocket.send_bytes if isinstance(message, bytes) else self.websocket.send_str
+            await asyncio.wait_for(send(message), timeout=self.fanout.send_timeout)
+        except asyncio.TimeoutError:
+            self.close(f"send blocked for more than {self.fanout.send_timeout:g} s")
+            return
+        
+        self.send_time += (time.monotonic() - started - self.send_time) * 0.1
+        self.sent += 1
+        self.bytes_sent += len(message)
+    
+    def _review_rate(self):
+        """Halve the telemetry rate while updates keep being coalesced, recover when caught up"""
+        now = time.monotonic()
+        if now - self.window_start < self.fanout.review_interval:
+            return
+        
+        coalesced, self.window_coalesced = self.window_coalesced, 0
+        self.window_start = now
+        
+        if coalesced > self.fanout.coalesce_tolerance:
+            if self.fanout.slow_policy == POLICY_DISCONNECT or self.rate_factor <= self.fanout.min_rate_factor:
+                self.close(f"too slow ({coalesced} updates coalesced in {self.fanout.review_interval:g} s)")
+                return
+            self.rate_factor = max(self.rate_factor / 2, self.fanout.min_rate_factor)
+            logger.info(f"Websocket client {self.name} is slow, telemetry down-rated to x{self.rate_factor:g}")
+        elif coalesced == 0 and self.rate_factor < 1.0:
+            self.rate_factor = min(self.rate_factor * 2, 1.0)
+    
+    def get_stats(self):
+        return {
+            "client": str(self.name),
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth,
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+            "coalesced": self.coalesced,
+            "dropped_events": self.dropped_events,
+            "rate_factor": self.rate_factor,
+            "send_ms": round(self.send_time * 1000, 2),
+            "connected_seconds": round(time.time() - self.connected_at, 1)
+        }
+
+
+class FanOut:
+    """Websocket clients and their channels (use on the server loop only)"""
+    
+    def __init__(self, max_events=64, send_timeout=5.0, slow_policy=POLICY_DOWNRATE,
+                 review_interval=2.0, coalesce_tolerance=2, min_rate_factor=0.125):
+        self.max_events = max_events
+        self.send_timeout = send_timeout
+        self.slow_policy = slow_policy
+        self.review_interval = review_interval
+        self.coalesce_tolerance = coalesce_tolerance
+        self.min_rate_factor = min_rate_factor
+        self.channels = {}
+        self.disconnects = 0
+    
+    def open(self, websocket):
+        """Create the channel of a new client and start its writer"""
+        channel = ClientChannel(websocket, self)
+        channel.start()
+        self.channels[websocket] = channel
+        return channel
+    
+    def close(self, websocket):
+        """Forget a client (its handler ended) and stop its writer"""
+        channel = self.channels.pop(websocket, None)
+        if channel:
+            channel.closed = True
+            if channel.task:
+                channel.task.cancel()
+    
+    def close_all(self):
+        for websocket in list(self.channels):
+            self.close(websocket)
+    
+    def broadcast(self, message):
+        """Queue an event for every client"""
+        for channel in list(self.channels.values()):
+            channel.offer_event(message)
+    
+    def get_stats(self):
+        return {
+            "clients": [channel.get_stats() for channel in self.channels.values()],
+            "disconnects": self.disconnects
+        }
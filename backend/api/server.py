@@ -8,15 +8,44 @@ import time
 import logging
 import threading
 import json
+import hashlib
 import traceback
+from collections import OrderedDict
 from datetime import datetime
 import asyncio
-import websockets
-from aiohttp import web
+import numpy as np
+from aiohttp import web, WSMsgType
 import aiohttp_cors
+from .stream import TelemetryStream, TOPICS, EVENT_TOPICS
+from .fanout import FanOut
+from .views import TelemetryView, UnitProfile, ViewCache
+from ai.admission import AdmissionRejected, PRIORITY_REMOTE, REASON_RATE_LIMITED
+from ai.results import STATUS_PENDING
+from telemetry.downsample import METHODS
+from telemetry.query import HistoryQuery
+from telemetry.system_monitor import SystemMonitor
+from telemetry.trip_recorder import TripArchive
+from voice.chunker import SentenceChunker
 
 logger = logging.getLogger("APIServer")
 
+
+def make_etag(data):
+    """Strong ETag of JSON-serializable data"""
+    return '"%s"' % hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+
+# Resources of the batch route; the rarely changing ones carry an ETag so clients can skip them
+BATCH_RESOURCES = ("status", "system", "vehicle", "mode", "achievements", "units", "personalities")
+VALIDATED_RESOURCES = ("mode", "achievements", "units", "personalities")
+
+# Longest an HTTP client waits for an AI answer per request, and the SSE keep-alive period
+LONG_POLL_SECONDS = 25.0
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# A time range ending this long ago gets no new samples, its downsampled response is cacheable
+CLOSED_RANGE_SECONDS = 2.0
+
 class APIServer:
     """API Server for Revvy AI Companion"""
     
@@ -28,8 +57,31 @@ class APIServer:
         self.app = None
         self.runner = None
         self.site = None
-        self.websocket_server = None
         self.websocket_clients = set()
+        self.loop = None
+        self.loop_thread_id = None
+        self.fanout = None
+        self.stream = None
+        self.stream_sources = []
+        
+        # HTTP clients waiting for an AI answer (query_id -> futures) and Server-Sent Events clients
+        self.result_waiters = {}
+        self.sse_clients = {}
+        
+        # Views of /api/vehicle shared by HTTP clients asking for the same fields and units
+        self.default_profile = lambda: UnitProfile.from_display(self.config)
+        self.http_views = ViewCache(self.default_profile)
+        
+        # Downsampled history: responses of closed time ranges never change, keep the latest ones
+        self.history_cache = OrderedDict()
+        self.history_cache_entries = self.config.get("telemetry", "query_cache_entries", 32)
+        self.history_max_points = self.config.get("telemetry", "query_max_points", 5000)
+        self.trip_archive = None
+        if self.config.get("telemetry", "trip_recording", True):
+            self.trip_archive = TripArchive(self.config.get("telemetry", "trip_directory", "./data/trips"))
+        
+        # Host metrics are sampled in the background, status requests only read the last sample
+        self.system_monitor = None
         
         # API settings
         self.host = self.config.API_HOST
@@ -38,6 +90,13 @@ class APIServer:
     def start(self):
         """Start API server"""
         self.running = True
+        try:
+            self.system_monitor = SystemMonitor(self.config)
+            self.system_monitor.start()
+        except Exception as e:
+            logger.error(f"Failed to start system monitor: {e}")
+            self.system_monitor = None
+        
         self.thread = threading.Thread(target=self._start_server)
         self.thread.daemon = True
         self.thread.start()
@@ -46,32 +105,65 @@ class APIServer:
     def stop(self):
         """Stop API server"""
         self.running = False
-        if self.runner:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self._shutdown())
-            loop.close()
+        self._detach_stream_sources()
+        
+        # Shut down on the server's own loop, then let run_forever return
+        if self.loop and self.loop.is_running():
+            try:
+                self.run_in_loop(self._shutdown()).result(timeout=5.0)
+            except Exception as e:
+                logger.error(f"Error shutting down API server: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(timeout=5.0)
+        if self.system_monitor:
+            self.system_monitor.stop()
         logger.info("API Server stopped")
     
     async def _shutdown(self):
         """Shutdown API server"""
+        if self.stream:
+            self.stream.close()
+        
+        # End the event streams and long-polls
+        for queue in list(self.sse_clients):
+            self._end_event_stream(queue)
+        for waiters in self.result_waiters.values():
+            for waiter in waiters:
+                waiter.cancel()
+        self.result_waiters = {}
+        
+        # Close all websocket connections first, cleanup waits for open handlers
+        for ws in list(self.websocket_clients):
+            try:
+                await ws.close()
+            except Exception:
+                pass
+        
         if self.site:
             await self.site.stop()
         if self.runner:
             await self.runner.cleanup()
-        
-        # Close all websocket connections
-        if self.websocket_clients:
-            for ws in self.websocket_clients:
-                try:
-                    await ws.close()
-                except:
-                    pass
+    
+    def run_in_loop(self, coro):
+        """Run a coroutine on the server loop from any thread, returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def call_in_loop(self, callback, *args):
+        """Schedule a plain callback on the server loop from any thread (no waiting)"""
+        if threading.get_ident() == self.loop_thread_id:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
     
     def _start_server(self):
         """Start API server in a separate thread"""
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        if self.system_monitor:
+            self.system_monitor.watch_loop(loop)
         
         # Create AIOHTTP web app
         self.app = web.Application()
@@ -98,10 +190,10 @@ class APIServer:
         self.site = web.TCPSite(self.runner, self.host, self.port)
         loop.run_until_complete(self.site.start())
         
-        # Start websocket server
-        loop.run_until_complete(self._start_websocket_server())
+        # Push stream served on /ws of the same app
+        self._start_stream()
         
-        logger.info(f"API Server running on http://{self.host}:{self.port}")
+        logger.info(f"API Server running on http://{self.host}:{self.port} (websocket /ws)")
         
         # Run event loop
         try:
@@ -115,14 +207,23 @@ class APIServer:
     def _setup_routes(self):
         """Setup API routes"""
         self.app.router.add_get('/', self._handle_index)
+        self.app.router.add_get('/ws', self._handle_websocket)
         self.app.router.add_get('/api/status', self._handle_status)
+        self.app.router.add_get('/api/batch', self._handle_batch)
+        self.app.router.add_post('/api/batch', self._handle_batch)
         self.app.router.add_get('/api/system/status', self._handle_system_status)
         self.app.router.add_post('/api/system/reconnect', self._handle_reconnect_components)
         self.app.router.add_get('/api/vehicle', self._handle_vehicle_data)
+        self.app.router.add_get('/api/vehicle/history', self._handle_vehicle_history)
+        self.app.router.add_get('/api/gps/track', self._handle_gps_track)
+        self.app.router.add_get('/api/obd/query', self._handle_obd_query)
         self.app.router.add_get('/api/mode', self._handle_get_mode)
         self.app.router.add_post('/api/mode', self._handle_set_mode)
         self.app.router.add_post('/api/voice/command', self._handle_voice_command)
+        self.app.router.add_get('/api/voice/result/{query_id}', self._handle_voice_result)
+        self.app.router.add_get('/api/events', self._handle_events)
         self.app.router.add_get('/api/achievements', self._handle_get_achievements)
+        self.app.router.add_get('/api/personalities', self._handle_get_personalities)
         self.app.router.add_post('/api/dtc/clear', self._handle_clear_dtc)
         self.app.router.add_get('/api/dtc/explanation/{code}', self._handle_get_dtc_explanation)
         
@@ -130,37 +231,88 @@ class APIServer:
         self.app.router.add_get('/api/settings/units', self._handle_get_unit_settings)
         self.app.router.add_post('/api/settings/units/toggle', self._handle_toggle_unit_system)
     
-    async def _start_websocket_server(self):
-        """Start websocket server for real-time updates"""
-        self.websocket_server = await websockets.serve(
-            self._handle_websocket,
-            self.host,
-            self.port + 1  # Use port+1 for websockets
+    def _start_stream(self):
+        """Create the topic stream and hook it to the components' publishers"""
+        # Every client gets its own bounded queue and writer, slow ones are down-rated or dropped
+        self.fanout = FanOut(
+            max_events=self.config.get("network", "ws_max_queued_events", 64),
+            send_timeout=self.config.get("network", "ws_send_timeout", 5.0),
+            slow_policy=self.config.get("network", "ws_slow_client_policy", "downrate")
+        )
+        self.stream = TelemetryStream(
+            self.loop,
+            self.fanout,
+            default_rates=self.config.get("network", "stream_rates", {}),
+            max_rate_hz=self.config.get("network", "stream_max_rate_hz", 30.0),
+            default_profile=self.default_profile
         )
-        logger.info(f"WebSocket server running on ws://{self.host}:{self.port+1}")
+        # Sources publish canonical (metric) data, clients see it through their own view
+        self.stream.register_topic("vehicle", lambda: self.revvy_core.obd.get_snapshot().data, "vehicle_data")
+        self.stream.register_topic("gps", self.revvy_core.gps.get_gps_data, "gps_data")
+        self.stream.register_topic("system", self._get_system_status, "system_status",
+                                   period=self.config.get("network", "system_status_interval", 1.0))
+        
+        # Publishers only flag the topic, frames are built on the loop when a client is due one
+        obd = self.revvy_core.obd
+        if obd and hasattr(obd, "add_snapshot_listener"):
+            listener = lambda snapshot: self.stream.notify("vehicle")
+            obd.add_snapshot_listener(listener)
+            self.stream_sources.append((obd.remove_snapshot_listener, listener))
+        
+        gps_history = getattr(self.revvy_core.gps, "history", None)
+        if gps_history is not None:
+            listener = lambda values, timestamp: self.stream.notify("gps")
+            gps_history.add_listener(listener)
+            self.stream_sources.append((gps_history.remove_listener, listener))
+        
+        # Finished AI queries wake their long-polls, AI events also go out as Server-Sent Events
+        results = getattr(self.revvy_core.ai, "results", None)
+        if results is not None:
+            listener = lambda result: self.call_in_loop(self._on_query_result, result)
+            results.add_listener(listener)
+            self.stream_sources.append((results.remove_listener, listener))
+        self.stream.add_event_listener(self._on_stream_event)
+    
+    def _detach_stream_sources(self):
+        """Stop the components from notifying the stream"""
+        for remove, listener in self.stream_sources:
+            remove(listener)
+        self.stream_sources = []
     
-    async def _handle_websocket(self, websocket, path):
-        """Handle websocket connections"""
+    async def _handle_websocket(self, request):
+        """Handle websocket connections on /ws"""
+        websocket = web.WebSocketResponse(heartbeat=30.0)
+        await websocket.prepare(request)
+        
         # Register client
         self.websocket_clients.add(websocket)
-        logger.info(f"WebSocket client connected: {websocket.remote_address}")
+        self.stream.add_client(websocket)
+        logger.info(f"WebSocket client connected: {request.remote}")
         
         try:
             # Keep connection alive and handle messages
             async for message in websocket:
+                if message.type == WSMsgType.ERROR:
+                    logger.warning(f"WebSocket error from {request.remote}: {websocket.exception()}")
+                    break
+                if message.type != WSMsgType.TEXT:
+                    continue
+                
                 try:
-                    data = json.loads(message)
+                    data = json.loads(message.data)
                     await self._process_websocket_message(websocket, data)
                 except json.JSONDecodeError:
-                    logger.warning(f"Invalid JSON from client: {message}")
+                    logger.warning(f"Invalid JSON from client: {message.data}")
                 except Exception as e:
                     logger.error(f"Error processing client message: {e}")
                     logger.error(traceback.format_exc())
-        except websockets.exceptions.ConnectionClosed:
-            logger.info(f"WebSocket client disconnected: {websocket.remote_address}")
         finally:
             # Unregister client
-            self.websocket_clients.remove(websocket)
+            self.websocket_clients.discard(websocket)
+            self.stream.remove_client(websocket)
+            logger.info(f"WebSocket client disconnected: {request.remote}")
+        
+        return websocket
     
     async def _process_websocket_message(self, websocket, data):
         """Process websocket message"""
@@ -168,11 +320,50 @@ class APIServer:
         message_type = data.get('type')
         
         if message_type == 'subscribe':
-            # Client subscribing to events
-            logger.info(f"Client subscribed to events: {data.get('events', [])}")
+            # Topics as {"vehicle": {"max_rate": 20, "fields": ["rpm"], "units": "imperial"}, ...}
+            # or ["vehicle", ...] with optional max_rate, fields and units for all of them
+            topics = data.get('topics', [])
+            if not isinstance(topics, dict):
+                topics = {t: {} for t in topics}
             
-            # Send initial vehicle data
-            await self._send_vehicle_data(websocket)
+            rates = {}
+            views = {}
+            try:
+                for topic, options in topics.items():
+                    options = options if isinstance(options, dict) else {'max_rate': options}
+                    rates[topic] = options.get('max_rate', data.get('max_rate'))
+                    fields = options.get('fields', data.get('fields'))
+                    units = options.get('units', data.get('units'))
+                    if fields or units:
+                        views[topic] = TelemetryView.parse(fields, units)
+            except ValueError as e:
+                self._send_event(websocket, {'type': 'error', 'error': str(e)})
+                return
+            topics = rates
+            
+            # Older clients only list events, vehicle_data meant a snapshot of the vehicle topic
+            if 'vehicle_data' in data.get('events', []):
+                topics.setdefault('vehicle', None)
+            
+            # Binary frames only for clients that ask for them, JSON otherwise
+            reply = {'type': 'subscribed', 'encoding': 'json'}
+            if data.get('encoding') == 'binary':
+                reply['encoding'] = 'binary'
+                reply['schemas'] = self.stream.set_encoding(websocket, 'binary')
+            elif 'encoding' in data:
+                self.stream.set_encoding(websocket, 'json')
+            
+            # Events go out before telemetry, so the client has the schemas before the first frame
+            reply['topics'] = self.stream.subscribe(websocket, topics, views)
+            logger.info(f"Client subscribed to {reply['topics']} ({reply['encoding']})")
+            self._send_event(websocket, reply)
+        
+        elif message_type == 'ack':
+            # Binary clients acknowledge applied frames so deltas can be encoded against them
+            self.stream.ack(websocket, data.get('topic'), data.get('seq'))
+        
+        elif message_type == 'unsubscribe':
+            self.stream.unsubscribe(websocket, [t for t in data.get('topics', []) if t in TOPICS])
         
         elif message_type == 'voice_command':
             # Handle voice command
@@ -180,50 +371,89 @@ class APIServer:
             if command:
                 logger.info(f"Voice command via WebSocket: {command}")
                 
-                # Process with AI engine
-                query_id = self.revvy_core.ai.query(
-                    command,
-                    callback=lambda qid, response: asyncio.run(
-                        self._send_ai_response(websocket, qid, response)
+                # Commands and questions about the car are answered right away, without the AI
+                voice = self.revvy_core.voice
+                response = await self._handle_locally(command)
+                if response is not None:
+                    self._send_event(websocket, {'type': 'ai_response', 'query_id': None, 'text': response})
+                    if voice and voice.voice_enabled:
+                        voice.speak(response)
+                    return
+                
+                # Admitted queries answer on the ai topic and to the sender, which also gets queue updates.
+                # The answer streams as ai_token frames and is spoken a sentence at a time.
+                channel = self.fanout.channels.get(websocket)
+                chunker = SentenceChunker(voice.speak) if voice and voice.voice_enabled else None
+                try:
+                    ticket = self._submit_query(
+                        command,
+                        f"ws:{channel.name if channel else id(websocket)}",
+                        callback=lambda qid, response: self._on_ai_response(qid, response, websocket, chunker),
+                        on_status=lambda qid, status: self.call_in_loop(
+                            self._send_event, websocket, dict(status, type='command_status', query_id=qid)),
+                        on_token=lambda qid, text, index: self._on_ai_token(qid, text, index, websocket, chunker)
                     )
-                )
+                except AdmissionRejected as e:
+                    self._send_event(websocket, dict(e.to_dict(), type='command_rejected'))
+                    return
                 
                 # Send acknowledgement
-                await websocket.send(json.dumps({
-                    'type': 'command_received',
-                    'query_id': query_id
-                }))
+                self._send_event(websocket, dict(ticket, type='command_received'))
+    
+    async def _handle_locally(self, command):
+        """The command handler's answer to a command, None if it needs the AI"""
+        handler = getattr(self.revvy_core, 'command_handler', None)
+        if not handler:
+            return None
+        
+        # Routing embeds the command and handlers read the vehicle, both stay off the loop
+        return await self.loop.run_in_executor(None, handler.handle_locally, command)
+    
+    def _submit_query(self, command, client, callback, on_status=None, on_token=None):
+        """Submit a remote client's query through admission control, returns {query_id, position, merged}"""
+        ai = self.revvy_core.ai
+        if not hasattr(ai, 'submit'):
+            return {'query_id': ai.query(command, callback=callback, on_token=on_token), 'position': 0, 'merged': False}
+        return ai.submit(command, callback=callback, client=client, priority=PRIORITY_REMOTE, on_status=on_status,
+                         on_token=on_token)
+    
+    def _send_event(self, websocket, message):
+        """Queue a message for one client behind its pending events (call on the loop)"""
+        channel = self.fanout.channels.get(websocket)
+        if channel:
+            channel.offer_event(json.dumps(message, default=str))
+    
+    def _on_ai_token(self, query_id, text, index, websocket=None, chunker=None):
+        """Push a streamed piece of an AI response, called on the AI thread"""
+        self.stream.publish('ai', {
+            'type': 'ai_token',
+            'query_id': query_id,
+            'text': text,
+            'index': index
+        }, also_to=websocket)
+        
+        # Sentences are spoken as soon as they are complete
+        if chunker:
+            chunker.feed(text)
     
-    async def _send_ai_response(self, websocket, query_id, response):
-        """Send AI response to client"""
+    def _on_ai_response(self, query_id, response, websocket=None, chunker=None):
+        """Push an AI response to ai subscribers (and the asking client), called on the AI thread"""
         try:
-            await websocket.send(json.dumps({
+            # The full text, for clients that don't follow the tokens
+            self.stream.publish('ai', {
                 'type': 'ai_response',
                 'query_id': query_id,
                 'text': response
-            }))
+            }, also_to=websocket)
             
-            # Also speak the response if voice is enabled
-            if self.revvy_core.voice.voice_enabled:
-                self.revvy_core.voice.speak(response)
+            # Speak the rest of the response if voice is enabled
+            if chunker:
+                chunker.finish(response)
                 
         except Exception as e:
             logger.error(f"Error sending AI response: {e}")
             logger.error(traceback.format_exc())
     
-    async def _send_vehicle_data(self, websocket):
-        """Send current vehicle data to client"""
-        try:
-            if self.revvy_core.obd:
-                data = self.revvy_core.obd.get_vehicle_data_with_units()
-                await websocket.send(json.dumps({
-                    'type': 'vehicle_data',
-                    'data': data
-                }))
-        except Exception as e:
-            logger.error(f"Error sending vehicle data: {e}")
-            logger.error(traceback.format_exc())
-    
     async def _handle_index(self, request):
         """Handle index route"""
         return web.json_response({
@@ -235,7 +465,10 @@ class APIServer:
     
     async def _handle_status(self, request):
         """Handle status route"""
-        return web.json_response({
+        return web.json_response(self._get_status())
+    
+    def _get_status(self):
+        return {
             'status': 'online',
             'obd_connected': self.revvy_core.obd.is_connected() if self.revvy_core.obd else False,
             'voice_enabled': self.revvy_core.voice.voice_enabled if self.revvy_core.voice else False,
@@ -243,7 +476,72 @@ class APIServer:
             'current_personality': self.revvy_core.current_personality,
             'system_ready': self.revvy_core.system_ready,
             'timestamp': datetime.now().isoformat()
-        })
+        }
+    
+    async def _handle_batch(self, request):
+        """Handle batch route: several resources from one snapshot of the core state
+        
+        GET  /api/batch?resources=status,vehicle,achievements&etags=achievements:<etag>
+        POST /api/batch {"resources": [...], "etags": {"achievements": <etag>}}
+        Validated resources whose ETag still matches are listed in not_modified instead of sent.
+        """
+        try:
+            if request.method == 'POST':
+                body = await request.json()
+                names = body.get('resources') or list(BATCH_RESOURCES)
+                etags = body.get('etags') or {}
+            else:
+                names = [n for n in request.query.get('resources', '').split(',') if n] or list(BATCH_RESOURCES)
+                etags = dict(part.split(':', 1) for part in request.query.get('etags', '').split(',') if ':' in part)
+        except Exception:
+            return web.json_response({'error': 'Invalid batch request'}, status=400)
+        
+        unknown = [name for name in names if name not in BATCH_RESOURCES]
+        if unknown:
+            return web.json_response({'error': f"Unknown resources: {', '.join(map(str, unknown))}"}, status=400)
+        
+        builders = {
+            'status': self._get_status,
+            'system': self._get_system_status,
+            'vehicle': self._get_vehicle,
+            'mode': self._get_mode,
+            'achievements': lambda: self.config.ACHIEVEMENTS,
+            'units': self._get_unit_settings,
+            'personalities': self._get_personalities
+        }
+        
+        # Built back to back on the loop without awaiting, so no update lands in between
+        resources = {}
+        tags = {}
+        not_modified = []
+        errors = {}
+        for name in names:
+            try:
+                data = builders[name]()
+            except Exception as e:
+                logger.error(f"Error building batch resource {name}: {e}")
+                errors[name] = str(e)
+                continue
+            
+            if name in VALIDATED_RESOURCES:
+                tags[name] = make_etag(data)
+                if str(etags.get(name, '')).strip('"') == tags[name].strip('"'):
+                    not_modified.append(name)
+                    continue
+            resources[name] = data
+        
+        result = {'resources': resources, 'etags': tags, 'not_modified': not_modified}
+        if errors:
+            result['errors'] = errors
+        return self._validated_response(request, result)
+    
+    def _validated_response(self, request, data):
+        """JSON response with an ETag, 304 if the client already has this version"""
+        etag = make_etag(data)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers=headers)
+        return web.json_response(data, headers=headers, dumps=lambda obj: json.dumps(obj, default=str))
     
     async def _handle_system_status(self, request):
         """Handle system status route with component details"""
@@ -252,6 +550,10 @@ class APIServer:
                 'error': 'Core not initialized'
             }, status=500)
         
+        return web.json_response(self._get_system_status())
+    
+    def _get_system_status(self):
+        """System status with component details (also pushed on the system topic)"""
         status = {
             'status': 'online',
             'obd_connected': self.revvy_core.obd.is_connected() if self.revvy_core.obd else False,
@@ -262,24 +564,20 @@ class APIServer:
             'current_personality': self.revvy_core.current_personality,
             'system_ready': self.revvy_core.system_ready,
             'components': self.revvy_core.component_status,
+            'obd_polling': self.revvy_core.obd.get_polling_stats() if self.revvy_core.obd else {},
+            'obd_broker': self.revvy_core.obd.get_broker_stats() if self.revvy_core.obd else {},
             'unit_system': self.revvy_core.config.get('display', 'unit_system'),
+            'stream_clients': self.stream.get_stats() if self.stream else [],
+            'stream_disconnects': self.fanout.disconnects if self.fanout else 0,
+            'stream_views': self.stream.get_view_stats() if self.stream else {},
+            'ai_admission': self.revvy_core.ai.get_stats() if hasattr(self.revvy_core.ai, 'get_stats') else {},
             'timestamp': datetime.now().isoformat()
         }
         
-        try:
-            # Add system metrics
-            import psutil
-            status['system_metrics'] = {
-                'cpu_usage': psutil.cpu_percent(),
-                'memory_usage': psutil.virtual_memory().percent,
-                'disk_usage': psutil.disk_usage('/').percent,
-                'uptime': time.time() - psutil.boot_time()
-            }
-        except Exception as e:
-            logger.error(f"Error getting system metrics: {e}")
-            status['system_metrics'] = {}
+        # Last background sample and its trends, no syscalls on the loop
+        status['system_metrics'] = self.system_monitor.get_status() if self.system_monitor else {}
         
-        return web.json_response(status)
+        return status
 
     async def _handle_reconnect_components(self, request):
         """Handle component reconnection route"""
@@ -323,35 +621,166 @@ class APIServer:
         })
     
     async def _handle_vehicle_data(self, request):
-        """Handle vehicle data route"""
+        """Handle vehicle data route (?fields=rpm,speed&units=imperial or units=speed:mph)"""
         if not self.revvy_core.obd:
             return web.json_response({'error': 'OBD not initialized'}, status=500)
         
-        unit_system = self.revvy_core.config.get("display", "unit_system")
+        try:
+            view = TelemetryView.parse(request.query.get('fields'), request.query.get('units'))
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
         
-        if unit_system == "imperial":
-            data = self.revvy_core.obd.get_vehicle_data_with_units()
-        else:
-            data = self.revvy_core.obd.get_vehicle_data()
-            # Add unit labels for metric
-            if "speed" in data:
-                data["speed_unit"] = "km/h"
+        return web.json_response(self._get_vehicle(view))
+    
+    def _get_vehicle(self, view=None):
+        """Latest vehicle snapshot in a view (display units by default)"""
+        # One view per snapshot and (fields, units), shared by every client asking for it
+        snapshot = self.revvy_core.obd.get_snapshot()
+        _, data = self.http_views.get(snapshot.seq, snapshot.data, view)
+        return data
+    
+    async def _handle_vehicle_history(self, request):
+        """Handle downsampled metric history route (?metrics=rpm,boost_pressure&seconds=1800&points=500&method=lttb)"""
+        history = getattr(self.revvy_core.obd, "history", None)
+        if history is None:
+            return web.json_response({'error': 'OBD history not available'}, status=500)
+        
+        try:
+            start, end, points, closed = self._parse_history_range(request)
+            method = request.query.get('method', 'lttb')
+            if method not in METHODS:
+                raise ValueError(f"Invalid method, expected one of: {', '.join(METHODS)}")
+            metrics = [m for m in request.query.get('metrics', 'rpm').split(',') if m]
+            profile = UnitProfile.parse(request.query.get('units')) or self.default_profile()
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        
+        query = HistoryQuery(history, self.trip_archive)
+        
+        def build():
+            series = {}
+            for metric in metrics:
+                times, values, samples = query.series(metric, start, end, points, method)
+                convert, label = profile.conversion(metric)
+                if convert:
+                    values = convert(values)
+                series[metric] = {'t': np.round(times, 3).tolist(), 'v': np.round(values, 3).tolist(), 'samples': samples}
+                if label:
+                    series[metric]['unit'] = label
+            return {'start': start, 'end': end, 'method': method, 'points': points, 'series': series}
+        
+        return await self._history_response(request, closed, profile, build)
+    
+    async def _handle_gps_track(self, request):
+        """Handle downsampled GPS track route (?seconds=1800&points=500, or start= and end= epoch seconds)"""
+        history = getattr(self.revvy_core.gps, "history", None)
+        if history is None:
+            return web.json_response({'error': 'GPS history not available'}, status=500)
+        
+        try:
+            start, end, points, closed = self._parse_history_range(request)
+            profile = UnitProfile.parse(request.query.get('units')) or self.default_profile()
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        
+        query = HistoryQuery(history, self.trip_archive, prefix="gps.")
+        
+        def build():
+            track, samples = query.track(start, end, points)
+            convert, label = profile.conversion('speed')
+            if convert and 'speed' in track:
+                track['speed'] = convert(track['speed'])
             
-            for temp_field in ["coolant_temp", "intake_temp", "oil_temp"]:
-                if temp_field in data:
-                    data[f"{temp_field}_unit"] = "C"
+            # Coordinates keep 7 decimals (~1 cm), everything else 3
+            result = {name: np.round(values, 7 if name in ('latitude', 'longitude') else 3).tolist()
+                      for name, values in track.items()}
+            result.update(start=start, end=end, points=points, samples=samples, speed_unit=label)
+            return result
+        
+        return await self._history_response(request, closed, profile, build)
+    
+    def _parse_history_range(self, request):
+        """Get (start, end, points, closed) of a history query, start/end in epoch seconds or the last `seconds`"""
+        now = time.time()
+        query = request.query
+        end = float(query['end']) if 'end' in query else now
+        start = float(query['start']) if 'start' in query else end - float(query.get('seconds', 600))
+        if end <= start:
+            raise ValueError("end must be after start")
+        
+        points = int(query.get('points', 500))
+        if not 3 <= points <= self.history_max_points:
+            raise ValueError(f"points must be between 3 and {self.history_max_points}")
+        
+        # Only an explicit end in the past closes a range, "the last N seconds" keeps moving
+        closed = 'end' in query and end < now - CLOSED_RANGE_SECONDS
+        return start, end, points, closed
+    
+    async def _history_response(self, request, closed, profile, build):
+        """Build a history response off the loop; closed ranges are cached and validated by ETag"""
+        loop = asyncio.get_event_loop()
+        if not closed:
+            data = await loop.run_in_executor(None, build)
+            return web.json_response(data, headers={'Cache-Control': 'no-cache'})
+        
+        # The same query over a closed range always has the same answer
+        params = sorted(request.query.items()) + [('profile', profile.key)]
+        etag = '"%s"' % hashlib.sha1(f"{request.path}?{params}".encode()).hexdigest()[:24]
+        headers = {'ETag': etag, 'Cache-Control': 'public, max-age=86400'}
+        if etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers=headers)
+        
+        body = self.history_cache.get(etag)
+        if body is None:
+            body = json.dumps(await loop.run_in_executor(None, build))
+            self.history_cache[etag] = body
+            while len(self.history_cache) > self.history_cache_entries:
+                self.history_cache.popitem(last=False)
+        else:
+            self.history_cache.move_to_end(etag)
+        
+        return web.Response(text=body, content_type='application/json', headers=headers)
+    
+    async def _handle_obd_query(self, request):
+        """Handle on-demand PID read route (?pid=rpm,speed&max_age=0.5)"""
+        if not self.revvy_core.obd:
+            return web.json_response({'error': 'OBD not initialized'}, status=500)
+        
+        pids = [p for p in request.query.get('pid', '').split(',') if p]
+        if not pids:
+            return web.json_response({'error': 'pid is required'}, status=400)
+        
+        try:
+            max_age = float(request.query['max_age']) if 'max_age' in request.query else None
+        except ValueError:
+            return web.json_response({'error': 'Invalid max_age'}, status=400)
+        
+        try:
+            # Queued behind at most one polling batch on the OBD broker thread
+            futures = [asyncio.wrap_future(self.revvy_core.obd.submit_query(pid, max_age)) for pid in pids]
+            results = await asyncio.wait_for(asyncio.gather(*futures), timeout=10.0)
             
-            if "boost_pressure" in data:
-                data["boost_pressure_unit"] = "kPa"
-                
-        return web.json_response(data)
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        except asyncio.TimeoutError:
+            return web.json_response({'error': 'OBD query timed out'}, status=504)
+        except Exception as e:
+            logger.error(f"Error querying OBD: {e}")
+            return web.json_response({'error': str(e)}, status=503)
+        
+        return web.json_response({
+            'results': {r['name']: r for r in results}
+        }, dumps=lambda obj: json.dumps(obj, default=str))
     
     async def _handle_get_mode(self, request):
         """Handle get mode route"""
-        return web.json_response({
+        return web.json_response(self._get_mode())
+    
+    def _get_mode(self):
+        return {
             'mode': self.revvy_core.current_mode,
             'personality': self.revvy_core.current_personality
-        })
+        }
     
     async def _handle_set_mode(self, request):
         """Handle set mode route"""
@@ -385,23 +814,150 @@ class APIServer:
             if not command:
                 return web.json_response({'error': 'Command is required'}, status=400)
             
-            # Process with AI engine
-            query_id = self.revvy_core.ai.query(command)
+            # Commands and questions about the car are answered right away, without the AI
+            response = await self._handle_locally(command)
+            if response is not None:
+                return web.json_response({'success': True, 'text': response, 'message': 'Command handled'})
             
-            return web.json_response({
-                'success': True,
-                'query_id': query_id,
-                'message': 'Command received'
-            })
+            # Process with AI engine, the response is pushed to ai subscribers
+            try:
+                ticket = self._submit_query(
+                    command,
+                    f"http:{request.remote}",
+                    callback=lambda qid, response: self._on_ai_response(qid, response),
+                    on_token=lambda qid, text, index: self._on_ai_token(qid, text, index)
+                )
+            except AdmissionRejected as e:
+                # 429 for this client's rate limit, 503 when the AI is busy for everyone
+                status = 429 if e.reason == REASON_RATE_LIMITED else 503
+                headers = {'Retry-After': str(int(e.retry_after + 1))} if e.retry_after else None
+                return web.json_response(e.to_dict(), status=status, headers=headers)
+            
+            return web.json_response(dict(
+                ticket,
+                success=True,
+                result_url=f"/api/voice/result/{ticket['query_id']}",
+                message='Command received'
+            ))
                 
         except Exception as e:
             logger.error(f"Error processing voice command: {e}")
             logger.error(traceback.format_exc())
             return web.json_response({'error': str(e)}, status=500)
     
+    async def _handle_voice_result(self, request):
+        """Handle AI answer route, long-polls while the answer is pending (?timeout=25)"""
+        results = getattr(self.revvy_core.ai, "results", None)
+        if results is None:
+            return web.json_response({'error': 'AI results not available'}, status=500)
+        
+        query_id = request.match_info['query_id']
+        try:
+            timeout = min(max(float(request.query.get('timeout', LONG_POLL_SECONDS)), 0.0), LONG_POLL_SECONDS)
+        except ValueError:
+            return web.json_response({'error': 'Invalid timeout'}, status=400)
+        
+        result = results.get(query_id)
+        if result is None:
+            return web.json_response({'error': 'Unknown or expired query'}, status=404)
+        
+        if result['status'] == STATUS_PENDING and timeout > 0:
+            waiter = self.loop.create_future()
+            self.result_waiters.setdefault(query_id, []).append(waiter)
+            try:
+                result = await asyncio.wait_for(waiter, timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                waiters = self.result_waiters.get(query_id)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self.result_waiters[query_id]
+        
+        # Still pending: 202 with the queue position, and the client polls again right away
+        if result['status'] == STATUS_PENDING:
+            position = getattr(self.revvy_core.ai, 'position', None)
+            result['position'] = position(query_id) if position else None
+            return web.json_response(result, status=202)
+        return web.json_response(result)
+    
+    def _on_query_result(self, result):
+        """An AI query finished: answer its long-polls (on the loop)"""
+        for waiter in self.result_waiters.pop(result['query_id'], []):
+            if not waiter.done():
+                waiter.set_result(result)
+    
+    async def _handle_events(self, request):
+        """Handle Server-Sent Events route: AI events for clients without a websocket (?topics=ai)"""
+        topics = set(t for t in request.query.get('topics', 'ai').split(',') if t)
+        unknown = topics - set(EVENT_TOPICS)
+        if unknown:
+            return web.json_response({'error': f"Unknown event topics: {', '.join(sorted(unknown))}"}, status=400)
+        
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        await response.prepare(request)
+        
+        # Same bound as a websocket client's event queue, a client that falls behind is dropped
+        queue = asyncio.Queue(maxsize=self.config.get("network", "ws_max_queued_events", 64))
+        self.sse_clients[queue] = topics
+        try:
+            await response.write(b"retry: 3000\n\n")
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line, keeps proxies and the client from timing out
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                if event is None:
+                    break
+                
+                topic, message = event
+                await response.write(f"event: {topic}\ndata: {message}\n\n".encode())
+        
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self.sse_clients.pop(queue, None)
+        
+        return response
+    
+    def _on_stream_event(self, topic, message):
+        """Forward an event to the Server-Sent Events clients of its topic (on the loop)"""
+        for queue, topics in list(self.sse_clients.items()):
+            if topic not in topics:
+                continue
+            try:
+                queue.put_nowait((topic, message))
+            except asyncio.QueueFull:
+                logger.warning("Dropping Server-Sent Events client: event queue full")
+                self._end_event_stream(queue)
+    
+    def _end_event_stream(self, queue):
+        """Make a Server-Sent Events handler finish, even if its queue is full"""
+        self.sse_clients.pop(queue, None)
+        while queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+    
     async def _handle_get_achievements(self, request):
         """Handle get achievements route"""
-        return web.json_response(self.config.ACHIEVEMENTS)
+        return self._validated_response(request, self.config.ACHIEVEMENTS)
+    
+    async def _handle_get_personalities(self, request):
+        """Handle get personalities route"""
+        return self._validated_response(request, self._get_personalities())
+    
+    def _get_personalities(self):
+        return {
+            'modes': self.config.AVAILABLE_MODES,
+            'personalities': self.config.MODE_PERSONALITIES
+        }
     
     async def _handle_clear_dtc(self, request):
         """Handle clear DTC route"""
@@ -409,7 +965,9 @@ class APIServer:
             return web.json_response({'error': 'OBD not initialized'}, status=500)
         
         try:
-            success = self.revvy_core.obd.clear_dtc_codes()
+            # Runs on the OBD broker thread, don't block the event loop while waiting
+            loop = asyncio.get_event_loop()
+            success = await loop.run_in_executor(None, self.revvy_core.obd.clear_dtc_codes)
             
             if success:
                 return web.json_response({
@@ -444,15 +1002,16 @@ class APIServer:
         if not self.revvy_core or not self.revvy_core.config:
             return web.json_response({'error': 'Config not initialized'}, status=500)
         
-        unit_settings = {
+        return self._validated_response(request, self._get_unit_settings())
+    
+    def _get_unit_settings(self):
+        return {
             'unit_system': self.revvy_core.config.get("display", "unit_system"),
             'temperature_unit': self.revvy_core.config.get("display", "temperature_unit"),
             'pressure_unit': self.revvy_core.config.get("display", "pressure_unit"),
             'distance_unit': self.revvy_core.config.get("display", "distance_unit"),
             'speed_unit': self.revvy_core.config.get("display", "speed_unit")
         }
-        
-        return web.json_response(unit_settings)
 
     async def _handle_toggle_unit_system(self, request):
         """Handle toggle unit system route"""
@@ -562,35 +1121,18 @@ class APIServer:
             }
     
     def broadcast_event(self, event_type, data):
-        """Broadcast event to all connected websocket clients"""
-        if not self.websocket_clients:
+        """Broadcast event to all connected websocket clients, safe to call from any thread"""
+        if not self.fanout or not self.websocket_clients:
             return
         
         message = json.dumps({
             'type': event_type,
             **data
-        })
-        
-        # Schedule broadcast in event loop
-        asyncio.run(self._broadcast_message(message))
-    
-    async def _broadcast_message(self, message):
-        """Broadcast message to all websocket clients"""
-        if not self.websocket_clients:
-            return
-        
-        disconnected_clients = set()
+        }, default=str)
         
-        for client in self.websocket_clients:
-            try:
-                await client.send(message)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.add(client)
-            except Exception as e:
-                logger.error(f"Error sending message to client: {e}")
-                logger.error(traceback.format_exc())
-                disconnected_clients.add(client)
-        
-        # Remove disconnected clients
-        for client in disconnected_clients:
-            self.websocket_clients.remove(client)
\ No newline at end of file
+        # Only queues the message on the server loop, each client's writer delivers it
+        try:
+            self.call_in_loop(self.fanout.broadcast, message)
+        except RuntimeError:
+            # Loop already closed during shutdown
+            pass
\ No newline at end of file
@@ -0,0 +1,359 @@
+"""
+Revvy AI Companion - Telemetry Stream
+Topic subscriptions for websocket clients. State topics (vehicle, gps, system) push
+the latest state as soon as it is published, coalesced to the rate each client asked
+for; event topics (ai) deliver every message.
+"""
+
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from .telemetry_codec import SCHEMAS, TelemetryCodec
+from .views import UnitProfile, ViewCache
+
+logger = logging.getLogger("TelemetryStream")
+
+STATE_TOPICS = ("vehicle", "gps", "system")
+EVENT_TOPICS = ("ai",)
+TOPICS = STATE_TOPICS + EVENT_TOPICS
+
+ENCODINGS = ("json", "binary")
+
+# Frames a binary client may still acknowledge, older bases fall back to a keyframe
+MAX_UNACKED_FRAMES = 32
+
+
+class StreamClient:
+    """Subscriptions and rate limiting of one websocket client"""
+    
+    def __init__(self, channel):
+        self.channel = channel
+        self.intervals = {}     # Subscribed topic -> minimum seconds between frames
+        self.last_sent = {}     # Topic -> time the last frame was queued
+        self.dirty = set()      # State topics with a newer frame than the last one queued
+        self.timer = None
+        self.views = {}         # Topic -> TelemetryView (fields and units), None for everything
+        
+        # Binary encoding: full data of each unacknowledged frame, and the acknowledged one
+        self.encoding = "json"
+        self.sent_states = {}
+        self.acked = {}
+    
+    def interval(self, topic):
+        """Seconds between frames of a topic, stretched while the client is down-rated"""
+        return self.intervals[topic] / self.channel.rate_factor
+
+
+class TelemetryStream:
+    """Pushes topic updates from the component threads to subscribed websocket clients"""
+    
+    def __init__(self, loop, fanout, default_rates=None, max_rate_hz=30.0, default_profile=None):
+        self.loop = loop
+        self.fanout = fanout
+        self.default_rates = default_rates or {}
+        self.max_rate_hz = max_rate_hz
+        self.clients = {}
+        
+        # Data builders per state topic, data is built and serialized once per update
+        self.builders = {}
+        self.frame_types = {}
+        self.versions = {topic: 0 for topic in STATE_TOPICS}
+        self.data = {}
+        self.frames = {}
+        
+        # Clients share one view per (fields, unit profile) of each data version
+        self.default_profile = default_profile or UnitProfile
+        self.view_caches = {topic: ViewCache(self.default_profile) for topic in STATE_TOPICS}
+        
+        # Binary frames are shared by clients acknowledging the same base frame
+        self.codecs = {topic: TelemetryCodec(topic) for topic in SCHEMAS}
+        self.binary_frames = {}
+        self.notified = set()
+        self.periodic = []
+        
+        # Other consumers of event topics (e.g. Server-Sent Events), called on the loop
+        self.event_listeners = []
+    
+    def register_topic(self, topic, builder, frame_type, period=None):
+        """Build state topic data with builder(), optionally refreshed every `period` seconds"""
+        self.builders[topic] = builder
+        self.frame_types[topic] = frame_type
+        if period:
+            self.periodic.append(self.loop.create_task(self._refresh(topic, period)))
+    
+    def close(self):
+        """Stop refreshing periodic topics and pending timers"""
+        for task in self.periodic:
+            task.cancel()
+        for client in self.clients.values():
+            self._cancel_timer(client)
+        self.clients.clear()
+        self.fanout.close_all()
+    
+    def add_client(self, websocket):
+        """Start tracking a connected websocket (no telemetry is sent until it subscribes)"""
+        self.clients[websocket] = StreamClient(self.fanout.open(websocket))
+    
+    def remove_client(self, websocket):
+        """Forget a disconnected websocket"""
+        client = self.clients.pop(websocket, None)
+        if client:
+            self._cancel_timer(client)
+        self.fanout.close(websocket)
+    
+    def subscribe(self, websocket, topics, views=None):
+        """Subscribe to {topic: max_rate_hz or None} with optional {topic: TelemetryView}, returns the rates granted"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return {}
+        
+        granted = {}
+        for topic, rate in topics.items():
+            if topic not in TOPICS:
+                logger.warning(f"Unknown stream topic: {topic}")
+                continue
+            
+            if topic in EVENT_TOPICS:
+                client.intervals[topic] = 0.0
+                granted[topic] = None
+                continue
+            
+            rate = rate or self.default_rates.get(topic, self.max_rate_hz)
+            rate = min(max(float(rate), 0.01), self.max_rate_hz)
+            client.intervals[topic] = 1.0 / rate
+            granted[topic] = rate
+            
+            # A different view invalidates the frames binary deltas would be based on
+            view = (views or {}).get(topic)
+            if view is not None or topic in client.views:
+                client.views[topic] = view
+                client.sent_states.pop(topic, None)
+                client.acked.pop(topic, None)
+            
+            # New subscribers get the current state right away
+            client.last_sent.pop(topic, None)
+            if topic in self.builders:
+                client.dirty.add(topic)
+        
+        self._cancel_timer(client)
+        self._schedule(client)
+        return granted
+    
+    def set_encoding(self, websocket, encoding):
+        """Switch a client between JSON and binary frames, returns the binary schemas"""
+        client = self.clients.get(websocket)
+        if client is None or encoding not in ENCODINGS:
+            return None
+        
+        # Every subscribe restates the encoding, keep the acknowledged frames unless it changes
+        if encoding != client.encoding:
+            client.encoding = encoding
+            client.sent_states = {}
+            client.acked = {}
+        if encoding != "binary":
+            return None
+        return {topic: codec.describe() for topic, codec in self.codecs.items()}
+    
+    def ack(self, websocket, topic, seq):
+        """A binary client has applied frame `seq`, later deltas are encoded against it"""
+        client = self.clients.get(websocket)
+        sent = client.sent_states.get(topic) if client else None
+        if not sent or seq not in sent:
+            return
+        
+        client.acked[topic] = seq
+        while next(iter(sent)) != seq:
+            sent.popitem(last=False)
+    
+    def unsubscribe(self, websocket, topics):
+        """Stop sending some topics to a client"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        
+        for topic in topics:
+            client.intervals.pop(topic, None)
+            client.views.pop(topic, None)
+            client.dirty.discard(topic)
+    
+    def notify(self, topic):
+        """Mark a state topic as updated, safe to call from any thread"""
+        # One wakeup per topic until the loop has picked it up, however fast the publisher is
+        if topic in self.notified:
+            return
+        self.notified.add(topic)
+        
+        try:
+            self.loop.call_soon_threadsafe(self._on_update, topic)
+        except RuntimeError:
+            # Loop already closed during shutdown
+            self.notified.discard(topic)
+    
+    def publish(self, topic, message, also_to=None):
+        """Queue an event message for every subscriber of topic (and also_to), from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._on_event, topic, json.dumps(message, default=str), also_to)
+        except RuntimeError:
+            pass
+    
+    def add_event_listener(self, listener):
+        """Call listener(topic, serialized message) for every event (on the loop)"""
+        self.event_listeners = self.event_listeners + [listener]
+    
+    def remove_event_listener(self, listener):
+        self.event_listeners = [l for l in self.event_listeners if l is not listener]
+    
+    def _on_update(self, topic):
+        """New state for a topic: mark it dirty for its subscribers"""
+        self.notified.discard(topic)
+        self.versions[topic] += 1
+        
+        for client in self.clients.values():
+            if topic in client.intervals:
+                client.dirty.add(topic)
+                self._schedule(client)
+    
+    def _on_event(self, topic, message, also_to):
+        """Queue an event for its subscribers, events never wait for a rate limit"""
+        for websocket, client in self.clients.items():
+            if topic in client.intervals or websocket is also_to:
+                client.channel.offer_event(message)
+        
+        for listener in self.event_listeners:
+            try:
+                listener(topic, message)
+            except Exception as e:
+                logger.error(f"Error in stream event listener: {e}")
+    
+    async def _refresh(self, topic, period):
+        """Periodically publish a topic that has no publisher of its own"""
+        while True:
+            await asyncio.sleep(period)
+            if any(topic in client.intervals for client in self.clients.values()):
+                self._on_update(topic)
+    
+    def _data(self, topic):
+        """Get the latest data of a state topic, built once per update"""
+        version = self.versions[topic]
+        cached = self.data.get(topic)
+        if cached and cached[0] == version:
+            return cached[1]
+        
+        try:
+            data = self.builders[topic]()
+        except Exception as e:
+            logger.error(f"Error building {topic} data: {e}")
+            return None
+        
+        self.data[topic] = (version, data)
+        return data
+    
+    def _view(self, client, topic):
+        """Get (view key, data) of the latest data as this client wants to see it"""
+        data = self._data(topic)
+        if data is None:
+            return None, None
+        return self.view_caches[topic].get(self.versions[topic], data, client.views.get(topic))
+    
+    def _frame(self, client, topic):
+        """Get the serialized latest JSON frame of a state topic in the client's view"""
+        version = self.versions[topic]
+        key, data = self._view(client, topic)
+        if data is None:
+            return None
+        
+        cached = self.frames.get(topic)
+        if not cached or cached[0] != version:
+            cached = (version, {})
+            self.frames[topic] = cached
+        
+        message = cached[1].get(key)
+        if message is None:
+            message = json.dumps({'type': self.frame_types[topic], 'seq': version, 'data': data}, default=str)
+            cached[1][key] = message
+        return message
+    
+    def _binary_frame(self, client, topic):
+        """Get the latest frame of a topic delta-encoded against the client's acknowledged frame"""
+        version = self.versions[topic]
+        key, data = self._view(client, topic)
+        if data is None:
+            return None
+        
+        sent = client.sent_states.setdefault(topic, OrderedDict())
+        base_seq = client.acked.get(topic, 0)
+        base = sent.get(base_seq)
+        if base is None:
+            base_seq = 0
+        
+        cached = self.binary_frames.get(topic)
+        if not cached or cached[0] != version:
+            cached = (version, {})
+            self.binary_frames[topic] = cached
+        
+        frame = cached[1].get((key, base_seq))
+        if frame is None:
+            frame = self.codecs[topic].encode(version, data, base_seq, base)
+            cached[1][(key, base_seq)] = frame
+        
+        sent[version] = data
+        if len(sent) > MAX_UNACKED_FRAMES:
+            sent.popitem(last=False)
+        return frame
+    
+    def _message(self, client, topic):
+        if client.encoding == "binary" and topic in self.codecs:
+            return self._binary_frame(client, topic)
+        return self._frame(client, topic)
+    
+    def _schedule(self, client):
+        """Queue the frames that are due, or wake up when the next rate-limited topic is due"""
+        if client.timer:
+            return
+        
+        now = time.monotonic()
+        next_due = None
+        for topic in list(client.dirty):
+            if topic not in client.intervals:
+                client.dirty.discard(topic)
+                continue
+            
+            due = client.last_sent.get(topic, 0.0) + client.interval(topic)
+            if due > now:
+                next_due = due if next_due is None else min(next_due, due)
+                continue
+            
+            # The channel replaces a frame its writer hasn't got to yet (latest wins)
+            client.dirty.discard(topic)
+            client.last_sent[topic] = now
+            message = self._message(client, topic)
+            if message is not None:
+                client.channel.offer_latest(topic, message)
+        
+        if next_due is not None:
+            client.timer = self.loop.call_later(next_due - now, self._on_timer, client)
+    
+    def _on_timer(self, client):
+        client.timer = None
+        self._schedule(client)
+    
+    def _cancel_timer(self, client):
+        if client.timer:
+            client.timer.cancel()
+            client.timer = None
+    
+    def get_view_stats(self):
+        """Views built and shared per topic"""
+        return {topic: cache.get_stats() for topic, cache in self.view_caches.items()}
+    
+    def get_stats(self):
+        """Per-client subscriptions and send queue metrics"""
+        return [
+            dict(
+                client.channel.get_stats(),
+                topics={topic: (round(1.0 / interval, 2) if interval else None) for topic, interval in client.intervals.items()}
+            )
+            for client in self.clients.values()
+        ]
@@ -0,0 +1,170 @@
+"""
+Revvy AI Companion - Binary Telemetry Codec
+Compact frames for the websocket stream: numeric fields as (field id, value) pairs
+from a fixed schema, delta-encoded against the last frame the client acknowledged.
+Fields outside the schema (units, DTC list, flags) ride along as a small JSON
+trailer only when they change.
+
+    python -m backend.api.telemetry_codec       # size and encode cost vs JSON
+
+Frame layout (little endian):
+    header   uint8 kind, uint8 flags, uint32 seq, uint32 base_seq, float64 timestamp,
+             uint8 field count, uint16 trailer length
+    fields   uint8 field id + value ('f' float32 or 'd' float64, per schema)
+    trailer  UTF-8 JSON object of changed non-schema fields (null = removed)
+"""
+
+import json
+import time
+import struct
+
+FLAG_KEYFRAME = 0x01
+
+HEADER = struct.Struct("<BBIIdBH")
+
+# Fixed schemas per topic: field id -> (name, struct format). Never reuse an id.
+SCHEMAS = {
+    "vehicle": (1, {
+        1: ("rpm", "f"),
+        2: ("speed", "f"),
+        3: ("coolant_temp", "f"),
+        4: ("intake_temp", "f"),
+        5: ("throttle_pos", "f"),
+        6: ("engine_load", "f"),
+        7: ("fuel_level", "f"),
+        8: ("battery_voltage", "f"),
+        9: ("boost_pressure", "f"),
+        10: ("oil_temp", "f"),
+        11: ("last_updated", "d"),
+    }),
+    "gps": (2, {
+        1: ("latitude", "d"),
+        2: ("longitude", "d"),
+        3: ("altitude", "f"),
+        4: ("speed", "f"),
+        5: ("heading", "f"),
+        6: ("last_updated", "d"),
+    }),
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class TelemetryCodec:
+    """Encodes and decodes the binary frames of one topic"""
+    
+    def __init__(self, topic):
+        self.topic = topic
+        self.kind, fields = SCHEMAS[topic]
+        self.fields = fields
+        self.ids = {name: (field_id, struct.Struct("<B" + fmt)) for field_id, (name, fmt) in fields.items()}
+        self.value_structs = {field_id: struct.Struct("<" + fmt) for field_id, (name, fmt) in fields.items()}
+    
+    def describe(self):
+        """Schema as sent to clients when they negotiate the binary encoding"""
+        return {
+            "kind": self.kind,
+            "fields": {str(field_id): [name, fmt] for field_id, (name, fmt) in self.fields.items()}
+        }
+    
+    def encode(self, seq, data, base_seq=0, base=None, timestamp=None):
+        """Encode data as a frame, only the fields that differ from `base` unless it is None"""
+        keyframe = base is None
+        base = base or {}
+        parts = []
+        extras = {}
+        
+        for name, value in data.items():
+            if not keyframe and name in base and base[name] == value:
+                continue
+            
+            entry = self.ids.get(name)
+            if entry is not None and _is_number(value):
+                parts.append(entry[1].pack(entry[0], value))
+            else:
+                extras[name] = value
+        
+        for name in base:
+            if name not in data:
+                extras[name] = None
+        
+        trailer = json.dumps(extras, separators=(",", ":"), default=str).encode() if extras else b""
+        header = HEADER.pack(
+            self.kind,
+            FLAG_KEYFRAME if keyframe else 0,
+            seq,
+            0 if keyframe else base_seq,
+            timestamp if timestamp is not None else time.time(),
+            len(parts),
+            len(trailer)
+        )
+        return b"".join([header] + parts + [trailer])
+    
+    def decode(self, frame, states=None):
+        """Decode a frame to (seq, full data), applying deltas to states[base_seq]"""
+        kind, flags, seq, base_seq, timestamp, count, trailer_len = HEADER.unpack_from(frame, 0)
+        if kind != self.kind:
+            raise ValueError(f"Frame kind {kind} is not a {self.topic} frame")
+        
+        if flags & FLAG_KEYFRAME:
+            data = {}
+        else:
+            if not states or base_seq not in states:
+                raise KeyError(f"Unknown base frame {base_seq}")
+            data = dict(states[base_seq])
+        
+        offset = HEADER.size
+        for _ in range(count):
+            field_id = frame[offset]
+            value_struct = self.value_structs[field_id]
+            data[self.fields[field_id][0]] = value_struct.unpack_from(frame, offset + 1)[0]
+            offset += 1 + value_struct.size
+        
+        if trailer_len:
+            for name, value in json.loads(bytes(frame[offset:offset + trailer_len])).items():
+                if value is None:
+                    data.pop(name, None)
+                else:
+                    data[name] = value
+        
+        return seq, data
+
+
+def run_benchmark(iterations=20000):
+    """Compare JSON and binary (key and delta) frames of a typical vehicle sample"""
+    codec = TelemetryCodec("vehicle")
+    base = {
+        "rpm": 2150, "speed": 54.0, "coolant_temp": 89.5, "intake_temp": 31.0, "throttle_pos": 18.4,
+        "engine_load": 42.1, "fuel_level": 63.2, "battery_voltage": 14.1, "boost_pressure": 118.3,
+        "oil_temp": 97.0, "dtc_codes": [], "is_check_engine_on": False, "has_turbo": True,
+        "last_updated": time.time(), "speed_unit": "km/h", "coolant_temp_unit": "C",
+        "intake_temp_unit": "C", "oil_temp_unit": "C", "boost_pressure_unit": "kPa"
+    }
+    # A poll cycle at 10 Hz typically changes the fast PIDs only
+    data = dict(base, rpm=2175, speed=54.5, throttle_pos=19.2, engine_load=43.0, last_updated=base["last_updated"] + 0.1)
+    
+    results = {}
+    for label, encode in [
+        ("json", lambda: json.dumps({"type": "vehicle_data", "seq": 2, "data": data}).encode()),
+        ("binary keyframe", lambda: codec.encode(2, data)),
+        ("binary delta", lambda: codec.encode(2, data, 1, base)),
+    ]:
+        frame = encode()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            encode()
+        results[label] = (len(frame), (time.perf_counter() - started) / iterations * 1e6)
+    
+    # Round trip check
+    _, decoded = codec.decode(codec.encode(2, data, 1, base), {1: base})
+    assert decoded["rpm"] == data["rpm"] and decoded["speed_unit"] == "km/h"
+    
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'encoding':<18}{'bytes':>8}{'us/frame':>12}")
+    for label, (size, us) in run_benchmark().items():
+        print(f"{label:<18}{size:>8}{us:>12.2f}")
@@ -0,0 +1,163 @@
+"""
+Revvy AI Companion - Telemetry Views
+Per-client projections of telemetry: the fields a client asked for, in its own units.
+Each distinct view is built once per data version and shared by every client asking
+for the same one.
+"""
+
+import logging
+from utils.unit_converter import UnitConverter
+
+logger = logging.getLogger("TelemetryViews")
+
+# Fields that carry a physical quantity, stored in metric units
+FIELD_QUANTITIES = {
+    "speed": "speed",
+    "coolant_temp": "temperature",
+    "intake_temp": "temperature",
+    "oil_temp": "temperature",
+    "boost_pressure": "pressure",
+}
+
+UNIT_CHOICES = {
+    "speed": ("kph", "mph"),
+    "temperature": ("celsius", "fahrenheit"),
+    "pressure": ("kpa", "psi"),
+}
+
+UNIT_LABELS = {"kph": "km/h", "mph": "mph", "celsius": "C", "fahrenheit": "F", "kpa": "kPa", "psi": "psi"}
+
+CONVERSIONS = {
+    "mph": UnitConverter.kph_to_mph,
+    "fahrenheit": UnitConverter.celsius_to_fahrenheit,
+    "psi": UnitConverter.kpa_to_psi,
+}
+
+UNIT_SYSTEMS = {
+    "metric": {"speed": "kph", "temperature": "celsius", "pressure": "kpa"},
+    "imperial": {"speed": "mph", "temperature": "fahrenheit", "pressure": "psi"},
+}
+
+
+class UnitProfile:
+    """Display unit per quantity (speed, temperature, pressure)"""
+    
+    __slots__ = ("units", "key")
+    
+    def __init__(self, speed="kph", temperature="celsius", pressure="kpa"):
+        self.units = {"speed": speed, "temperature": temperature, "pressure": pressure}
+        for quantity, unit in self.units.items():
+            if unit not in UNIT_CHOICES[quantity]:
+                raise ValueError(f"Invalid {quantity} unit: {unit}")
+        self.key = (speed, temperature, pressure)
+    
+    @classmethod
+    def parse(cls, value):
+        """Profile from "imperial", "speed:mph,temperature:celsius" or a dict, None if not given"""
+        if not value:
+            return None
+        if isinstance(value, str):
+            if value in UNIT_SYSTEMS:
+                return cls(**UNIT_SYSTEMS[value])
+            value = dict(part.split(":", 1) for part in value.split(",") if ":" in part)
+        if not isinstance(value, dict):
+            raise ValueError(f"Invalid unit profile: {value}")
+        
+        units = dict(UNIT_SYSTEMS.get(value.get("system"), UNIT_SYSTEMS["metric"]))
+        units.update({quantity: unit for quantity, unit in value.items() if quantity in UNIT_CHOICES})
+        return cls(**units)
+    
+    @classmethod
+    def from_display(cls, config):
+        """The profile of the global display settings"""
+        system = UNIT_SYSTEMS.get(config.get("display", "unit_system"), UNIT_SYSTEMS["metric"])
+        return cls(
+            speed=config.get("display", "speed_unit", system["speed"]),
+            temperature=config.get("display", "temperature_unit", system["temperature"]),
+            pressure=config.get("display", "pressure_unit", system["pressure"])
+        )
+    
+    def conversion(self, field):
+        """Get (convert function or None, unit label) of a field, (None, None) if it has no unit"""
+        quantity = FIELD_QUANTITIES.get(field)
+        if quantity is None:
+            return None, None
+        unit = self.units[quantity]
+        return CONVERSIONS.get(unit), UNIT_LABELS[unit]
+    
+    def __repr__(self):
+        return f"UnitProfile({', '.join(self.key)})"
+
+
+class TelemetryView:
+    """Fields a client wants (None for all) and its unit profile (None for the display default)"""
+    
+    __slots__ = ("fields", "profile")
+    
+    def __init__(self, fields=None, profile=None):
+        self.fields = frozenset(fields) if fields else None
+        self.profile = profile
+    
+    @classmethod
+    def parse(cls, fields=None, units=None):
+        """View from a list or comma separated string of fields and a unit profile spec"""
+        if isinstance(fields, str):
+            fields = [f for f in fields.split(",") if f]
+        return cls(fields, UnitProfile.parse(units))
+    
+    def key(self, default_profile):
+        return (self.fields, (self.profile or default_profile).key)
+    
+    def apply(self, data, default_profile):
+        """Build the view: projected fields converted to the profile's units, with unit labels"""
+        profile = self.profile or default_profile
+        fields = self.fields
+        view = {}
+        
+        for name, value in data.items():
+            if fields is not None and name not in fields:
+                continue
+            
+            convert, label = profile.conversion(name)
+            if label is None:
+                view[name] = value
+                continue
+            
+            view[name] = convert(value) if convert and value is not None else value
+            view[f"{name}_unit"] = label
+        
+        return view
+
+
+class ViewCache:
+    """Views of the latest data version of one source, one per distinct view key"""
+    
+    def __init__(self, default_profile):
+        self.default_profile = default_profile
+        self.version = None
+        self.views = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, version, data, view=None):
+        """Get (key, view data) of version, building it only for the first client that asks"""
+        default = self.default_profile()
+        view = view or TelemetryView()
+        key = view.key(default)
+        
+        if version != self.version:
+            self.version = version
+            self.views = {}
+        
+        cached = self.views.get(key)
+        if cached is not None:
+            self.hits += 1
+            return key, cached
+        
+        self.misses += 1
+        cached = view.apply(data() if callable(data) else data, default)
+        self.views[key] = cached
+        return key, cached
+    
+    def get_stats(self):
+        return {"views": len(self.views), "hits": self.hits, "misses": self.misses}
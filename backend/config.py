@@ -28,13 +28,27 @@ class RevvyConfig:
                 "version": "1.0.0",
                 "debug_mode": False,
                 "auto_boot": True,
-                "auto_shutdown": True
+                "auto_shutdown": True,
+                "metrics_interval": 2.0,  # seconds between system metric samples (CPU, memory, temperature, loop lag)
+                "metrics_history_seconds": 600,  # Metric history kept in memory
+                "metrics_trend_seconds": 60,  # Window of the trends in the system status
+                "metrics_disk_path": "/"
             },
             
             # Network settings
             "network": {
                 "api_port": 5000,
                 "api_host": "0.0.0.0",
+                "stream_rates": {  # Default push rate (Hz) per websocket topic when a client doesn't ask for one
+                    "vehicle": 10.0,
+                    "gps": 1.0,
+                    "system": 1.0
+                },
+                "stream_max_rate_hz": 30.0,  # Cap on the rate a client can request
+                "system_status_interval": 1.0,  # seconds between system status refreshes
+                "ws_max_queued_events": 64,  # Undelivered events per client before it is disconnected
+                "ws_send_timeout": 5.0,  # seconds a single send may block before the client is dropped
+                "ws_slow_client_policy": "downrate",  # Options: "downrate" (halve its telemetry rate) or "disconnect"
                 "enable_bluetooth": True,
                 "enable_wifi": True
             },
@@ -46,7 +60,50 @@ class RevvyConfig:
                 "timeout": 30,
                 "reconnect_attempts": 5,
                 "polling_interval": 1.0,  # seconds
-                "dtc_check_interval": 300  # seconds
+                "dtc_check_interval": 300,  # seconds
+                "batch_queries": True,  # Pack up to 6 PIDs per request on CAN vehicles
+                "query_cache_ttl": 0.5,  # seconds, on-demand reads reuse results this fresh
+                "on_demand_timeout": 10.0,  # seconds
+                "fast_reconnect": True,  # Reuse the cached protocol/PID profile of a known vehicle
+                "fast_connect_timeout": 2.0,  # seconds
+                "profile_cache_path": "./data/obd_profiles.json",
+                # Vehicle specific PIDs from the manufacturer's documentation, e.g. {"name": "trans_temp",
+                # "mode": "22", "pid": "1234", "header": "7E1", "bytes": 1, "formula": "A - 40", "unit": "degC"}
+                "extended_pids": [],
+                "poll_rates": {  # Hz per metric, others use 1 / polling_interval
+                    "rpm": 10.0,
+                    "speed": 10.0,
+                    "throttle_pos": 10.0,
+                    "engine_load": 5.0,
+                    "boost_pressure": 5.0,
+                    "intake_temp": 1.0,
+                    "coolant_temp": 0.5,
+                    "battery_voltage": 0.5,
+                    "oil_temp": 0.2,
+                    "fuel_level": 0.05
+                }
+            },
+            
+            # Telemetry history settings
+            "telemetry": {
+                "history_seconds": 600,  # In-memory history kept per signal
+                "max_rate_hz": 10.0,  # Highest OBD poll rate, sizes the buffers
+                "gps_rate_hz": 10.0,
+                "trip_recording": True,  # Persist every sample to trip files
+                "trip_directory": "./data/trips",
+                "trip_chunk_records": 8192,  # Samples buffered per compressed chunk
+                "trip_chunk_seconds": 60,  # Longest a sample waits in memory before being written
+                "query_max_points": 5000,  # Most points a history query may ask for
+                "query_cache_entries": 32  # Downsampled responses of closed time ranges kept
+            },
+            
+            # Drive simulator used by the mock OBD and GPS components
+            "simulation": {
+                "drive_cycle": "wltp",  # Options: "ftp75", "wltp", "calm", "aggressive", "idle" or a CSV path
+                "rate_hz": 10.0,  # Up to 100
+                "time_scale": 1.0,
+                "loop": True,
+                "seed": 42
             },
             
             # Voice settings
@@ -56,16 +113,42 @@ class RevvyConfig:
                 "volume": 80,
                 "enable_voice": True,
                 "mic_index": 0,
-                "speaker_device": "default"
+                "speaker_device": "default",
+                "intent_routing": True,  # Match commands to handlers by meaning before asking the LLM
+                "intent_model": "./ai/models/all-MiniLM-L6-v2",  # Local copy fetched by install.sh, a Hub name needs network
+                "intent_index_path": "./data/intent_index.npz",  # Embedded intent exemplars, rebuilt when they change
+                "intent_threshold": 0.6,  # Lowest cosine similarity routed to a handler
+                "intent_margin": 0.05  # Lead the best intent needs over the next one
             },
             
             # AI settings
             "ai": {
                 "model_path": "./ai/models/mistral-7b-instruct-q4_k_m.gguf",
+                "context_size": 2048,
+                "threads": 3,  # Generation threads, leave a core for OBD/GPS/API
+                "batch_size": 128,  # Prompt tokens evaluated per batch
+                "use_mlock": False,  # Pin the weights in RAM (needs memlock limits)
+                "prefetch_model": True,  # Read the model into the page cache before mapping it
+                "warmup": True,  # Run a 1-token generation at boot so the first query is fast
+                "load_wait": 30.0,  # seconds a query waits for a model that is still loading
+                "prefix_cache_entries": 3,  # Personalities whose evaluated prompt prefix (KV state) is kept in RAM
+                "response_cache": True,  # Answer repeated questions about an unchanged car from a cache
+                "response_cache_path": "./data/ai_response_cache.json",
+                "response_cache_entries": 256,
+                "response_cache_ttl": 3600,  # seconds a cached answer stays valid
                 "max_tokens": 256,
                 "temperature": 0.7,
                 "contextual_memory": True,
-                "memory_limit": 10  # Number of conversations to remember
+                "memory_limit": 10,  # Number of conversations to remember
+                "result_ttl": 300,  # seconds an answer stays fetchable by query_id
+                "max_results": 256,
+                "command_timeout": 20.0,  # seconds a voice command waits for the AI before giving up
+                "max_concurrent_queries": 1,  # Generations running at once (each one can take every core)
+                "max_queued_queries": 8,  # Queries waiting for a slot before new ones are rejected
+                "client_queries_per_minute": 6,  # Per remote client, the driver's voice is not limited
+                "client_query_burst": 3,
+                "generation_timeout": 120.0,  # seconds a generation may run before it is stopped with an error
+                "worker_nice": 5  # Lower CPU priority of generation threads vs OBD/GPS/API
             },
             
             # GPS settings
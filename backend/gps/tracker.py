@@ -11,6 +11,8 @@ import json
 import serial
 import pynmea2
 import traceback
+import numpy as np
+from telemetry.history import TelemetryHistory
 
 logger = logging.getLogger("GPSTracker")
 
@@ -45,6 +47,13 @@ class GPSTracker:
             "last_updated": 0
         }
         
+        # Recent history of position and motion (float64, float32 would round coordinates to ~1 m)
+        self.history = TelemetryHistory(
+            history_seconds=self.config.get("telemetry", "history_seconds", 600),
+            max_rate_hz=self.config.get("telemetry", "gps_rate_hz", 10.0),
+            dtype=np.float64
+        )
+        
         # Trip data
         self.trip_start_time = 0
         self.trip_distance = 0.0
@@ -159,6 +168,12 @@ class GPSTracker:
                     self.gps_data["fix"] = msg.gps_qual > 0
                     self.gps_data["last_updated"] = time.time()
                     
+                    self.history.record({
+                        "latitude": self.gps_data["latitude"],
+                        "longitude": self.gps_data["longitude"],
+                        "altitude": self.gps_data["altitude"]
+                    }, self.gps_data["last_updated"])
+                    
                     # Update trip data
                     self._update_trip_data()
             
@@ -167,6 +182,11 @@ class GPSTracker:
                 if msg.status == 'A':  # A=active, V=void
                     self.gps_data["speed"] = msg.spd_over_grnd * 1.852 if msg.spd_over_grnd else 0.0  # Convert knots to km/h
                     self.gps_data["heading"] = msg.true_course if msg.true_course else 0.0
+                    
+                    self.history.record({
+                        "speed": self.gps_data["speed"],
+                        "heading": self.gps_data["heading"]
+                    }, time.time())
                 
         except Exception as e:
             logger.error(f"Error processing NMEA message: {e}")
@@ -253,6 +273,10 @@ class GPSTracker:
         self.last_location = None
         logger.info("Trip data reset")
     
+    def get_history(self, field, seconds):
+        """Get (timestamps, values) arrays for the last `seconds` seconds of a GPS field"""
+        return self.history.window(field, seconds, time.time())
+    
     def get_gps_data(self):
         """Get all GPS data"""
         return self.gps_data.copy()
@@ -6,11 +6,13 @@ import logging
 import threading
 from .config import RevvyConfig
 from .ai.engine import AIEngine
+from .ai.admission import AIAdmission
 from .obd.manager import OBDManager
 from .voice.system import VoiceSystem
 from .gps.tracker import GPSTracker
 from .api.server import APIServer
 from .voice.command_handler import CommandHandler
+from .telemetry.trip_recorder import TripRecorder
 from .mocks import MockOBDManager, MockAIEngine, MockVoiceSystem, MockGPSTracker, MockAPIServer
 
 # Set up logger
@@ -18,6 +20,35 @@ logger = logging.getLogger("RevvyCore")
 
 # Add to the RevvyCore class:
 
+def _create_components(self):
+    """Create the components (call from __init__), each falls back to its mock when it can't be set up"""
+    self.component_status = {}
+    self.obd = self._create_component('obd', lambda: OBDManager(self.config), lambda: MockOBDManager(self.config))
+    self.gps = self._create_component('gps', lambda: GPSTracker(self.config), lambda: MockGPSTracker(self.config))
+    engine = self._create_component('ai', lambda: AIEngine(self.config), lambda: MockAIEngine(self.config))
+    
+    # Every AI query goes through admission control: rate limits, one bounded queue, a concurrency limit.
+    # Wrapped before any component gets the engine, so none of them can go around it.
+    self.ai = AIAdmission(engine, self.config)
+    
+    # Commands are matched by pattern and meaning before a query goes to the AI
+    self.command_handler = CommandHandler(self)
+    self.voice = self._create_component('voice', lambda: VoiceSystem(self.config, self.ai, self.command_handler),
+                                        lambda: MockVoiceSystem(self.config))
+    self.api = self._create_component('api', lambda: APIServer(self.config, self),
+                                      lambda: MockAPIServer(self.config, self))
+
+def _create_component(self, name, create, fallback):
+    """Create one component, or its mock if that fails"""
+    try:
+        component = create()
+        self.component_status[name] = {'available': True, 'mock': False}
+    except Exception as e:
+        logger.error(f"Failed to create {name} component, using mock: {e}")
+        component = fallback()
+        self.component_status[name] = {'available': True, 'mock': True}
+    return component
+
 def start(self):
     """Start the Revvy AI Companion system"""
     if self.running:
@@ -34,6 +65,11 @@ def start(self):
         except Exception as e:
             logger.error(f"Failed to connect to OBD: {e}")
     
+    # The model loads in the background, component_status['ai'] follows it until it is ready
+    if self.ai is not None and hasattr(self.ai, 'add_status_listener'):
+        self.ai.add_status_listener(lambda status: self.component_status['ai'].update(
+            status, available=status['state'] == 'ready'))
+    
     # Start each component with error handling
     for component_name, component in [
         ('obd', self.obd), 
@@ -49,6 +85,22 @@ def start(self):
             logger.error(f"Failed to start {component_name} component: {e}")
             logger.debug(traceback.format_exc())
     
+    # Record OBD and GPS samples to disk so trips survive a restart
+    self.trip_recorder = None
+    self.trip_listeners = []
+    if self.config.get("telemetry", "trip_recording", True):
+        try:
+            self.trip_recorder = TripRecorder(self.config)
+            self.trip_recorder.start()
+            for prefix, component in [("", self.obd), ("gps.", self.gps)]:
+                if getattr(component, "history", None) is not None:
+                    listener = self.trip_recorder.listener(prefix)
+                    component.history.add_listener(listener)
+                    self.trip_listeners.append((component.history, listener))
+        except Exception as e:
+            logger.error(f"Failed to start trip recorder: {e}")
+            self.trip_recorder = None
+    
     # Start main loop in a separate thread
     self.main_thread = threading.Thread(target=self.main_loop)
     self.main_thread.daemon = True
@@ -67,6 +119,12 @@ def stop(self):
     logger.info("Stopping Revvy AI Companion...")
     self.running = False
     
+    # Finish the trip file before the sources go away
+    if getattr(self, 'trip_recorder', None):
+        for history, listener in self.trip_listeners:
+            history.remove_listener(listener)
+        self.trip_recorder.stop()
+    
     # Stop each component with error handling
     for component_name, component in [
         ('api', self.api), 
@@ -262,8 +320,8 @@ def get_vehicle_data(self):
     if not self.obd or not self.obd.is_connected():
         return None
     
-    # Get raw vehicle data
-    vehicle_data = self.obd.get_vehicle_data()
+    # Get raw vehicle data (copied, the published snapshot is read-only)
+    vehicle_data = dict(self.obd.get_vehicle_data())
     
     # Get unit system preference
     unit_system = self.config.get("display", "unit_system", "metric")
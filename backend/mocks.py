@@ -3,10 +3,16 @@ Revvy AI Companion - Mock Components
 Provides fallback implementations when real hardware is unavailable
 """
 
+import re
 import logging
 import time
-import random
-import threading
+import itertools
+from concurrent.futures import Future
+import numpy as np
+from .obd.snapshot import VehicleSnapshot
+from .telemetry.history import TelemetryHistory
+from .ai.results import QueryResults
+from .simulation.simulator import get_shared_simulator
 
 logger = logging.getLogger("MockComponents")
 
@@ -17,7 +23,6 @@ class MockOBDManager:
         self.config = config
         self.connected = False
         self.running = False
-        self.thread = None
         
         # Simulated vehicle data
         self.vehicle_data = {
@@ -36,22 +41,31 @@ class MockOBDManager:
             "has_turbo": False,
             "last_updated": time.time()
         }
+        self._snapshot = VehicleSnapshot(0, dict(self.vehicle_data), {})
+        self.snapshot_listeners = []
+        self.history = TelemetryHistory(
+            history_seconds=self.config.get("telemetry", "history_seconds", 600),
+            max_rate_hz=self.config.get("telemetry", "max_rate_hz", 10.0)
+        )
+        
+        # Vehicle data comes from the drive simulator (shared with MockGPSTracker)
+        self.simulator = get_shared_simulator(config)
+        self.vehicle_data["has_turbo"] = self.simulator.vehicle.params["turbo"]
         
         logger.info("Mock OBD Manager initialized")
     
     def start(self):
         """Start mock OBD"""
         self.running = True
-        self.thread = threading.Thread(target=self._simulate_data)
-        self.thread.daemon = True
-        self.thread.start()
+        self.simulator.add_listener(self._on_simulation_step)
+        self.simulator.start()
         logger.info("Mock OBD Manager started")
     
     def stop(self):
         """Stop mock OBD"""
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=1.0)
+        self.simulator.remove_listener(self._on_simulation_step)
+        self.simulator.stop()
         logger.info("Mock OBD Manager stopped")
     
     def connect(self):
@@ -60,26 +74,64 @@ class MockOBDManager:
         logger.info("Mock OBD connected")
         return True
     
-    def _simulate_data(self):
-        """Simulate vehicle data"""
-        while self.running:
-            # Simulate some basic vehicle data
-            if self.connected:
-                self.vehicle_data["rpm"] = 800 + random.randint(-50, 50)
-                self.vehicle_data["speed"] = 0
-                self.vehicle_data["throttle_pos"] = 5 + random.randint(-2, 2)
-                self.vehicle_data["coolant_temp"] = 80 + random.randint(-5, 5)
-                self.vehicle_data["last_updated"] = time.time()
-            
-            time.sleep(1.0)
+    def _on_simulation_step(self, obd_values, gps_values, timestamp):
+        """Publish each simulator step as vehicle data"""
+        if not self.connected:
+            return
+        
+        self.vehicle_data.update(obd_values)
+        self.vehicle_data["last_updated"] = timestamp
+        self._publish_snapshot()
+    
+    def _publish_snapshot(self):
+        """Publish simulated data as a new snapshot"""
+        now = self.vehicle_data["last_updated"]
+        self._snapshot = VehicleSnapshot(
+            self._snapshot.seq + 1,
+            dict(self.vehicle_data),
+            {name: now for name in self.vehicle_data},
+            now
+        )
+        self.history.record(self.vehicle_data, now)
+        
+        for listener in self.snapshot_listeners:
+            try:
+                listener(self._snapshot)
+            except Exception as e:
+                logger.error(f"Error in snapshot listener: {e}")
+    
+    def get_snapshot(self):
+        """Get the latest simulated snapshot"""
+        return self._snapshot
+    
+    def add_snapshot_listener(self, listener):
+        """Call listener(snapshot) whenever a new snapshot is published"""
+        self.snapshot_listeners = self.snapshot_listeners + [listener]
+    
+    def remove_snapshot_listener(self, listener):
+        """Stop calling a snapshot listener"""
+        self.snapshot_listeners = [l for l in self.snapshot_listeners if l is not listener]
     
     def get_vehicle_data(self):
         """Get simulated vehicle data"""
-        return self.vehicle_data.copy()
+        return self._snapshot.data
+    
+    def get_vehicle_data_with_units(self):
+        """Get simulated vehicle data (metric units)"""
+        data = self._snapshot.to_dict()
+        data["speed_unit"] = "km/h"
+        for temp_field in ["coolant_temp", "intake_temp", "oil_temp"]:
+            data[f"{temp_field}_unit"] = "C"
+        data["boost_pressure_unit"] = "kPa"
+        return data
+    
+    def get_history(self, metric_name, seconds):
+        """Get (timestamps, values) arrays for the last `seconds` seconds of a metric"""
+        return self.history.window(metric_name, seconds, time.time())
     
     def get_metric(self, metric_name):
         """Get a specific metric"""
-        return self.vehicle_data.get(metric_name)
+        return self._snapshot.data.get(metric_name)
     
     def get_rpm(self):
         """Get simulated RPM"""
@@ -113,12 +165,34 @@ class MockOBDManager:
         """Clear simulated DTC codes"""
         self.vehicle_data["dtc_codes"] = []
         self.vehicle_data["is_check_engine_on"] = False
+        self._publish_snapshot()
         return True
     
     def is_connected(self):
         """Check if mock OBD is connected"""
         return self.connected
     
+    def get_polling_stats(self):
+        """Mock polling stats"""
+        return {}
+    
+    def get_broker_stats(self):
+        """Mock OBD request queue stats"""
+        return {}
+    
+    def submit_query(self, name, max_age=None):
+        """Read a simulated PID, returns a completed Future"""
+        if name not in self.vehicle_data:
+            raise ValueError(f"Unknown PID: {name}")
+        
+        future = Future()
+        future.set_result({"name": name, "value": self.get_metric(name), "timestamp": time.time(), "cached": True})
+        return future
+    
+    def query_pid(self, name, max_age=None):
+        """Read a simulated PID"""
+        return self.submit_query(name, max_age).result()
+    
     def has_turbo(self):
         """Check if mock vehicle has turbo"""
         return self.vehicle_data.get("has_turbo")
@@ -130,7 +204,6 @@ class MockGPSTracker:
     def __init__(self, config):
         self.config = config
         self.running = False
-        self.thread = None
         self.active = False
         
         # Default location (can be set in config)
@@ -148,6 +221,16 @@ class MockGPSTracker:
             "fix": False,
             "last_updated": time.time()
         }
+        self.history = TelemetryHistory(
+            history_seconds=self.config.get("telemetry", "history_seconds", 600),
+            max_rate_hz=self.config.get("telemetry", "gps_rate_hz", 10.0),
+            dtype=np.float64
+        )
+        
+        # Fixes follow the drive simulator (shared with MockOBDManager) at the GPS rate
+        self.simulator = get_shared_simulator(config)
+        self.fix_interval = 1.0 / self.config.get("telemetry", "gps_rate_hz", 10.0)
+        self.last_fix = 0
         
         logger.info("Mock GPS Tracker initialized")
     
@@ -155,17 +238,16 @@ class MockGPSTracker:
         """Start mock GPS"""
         self.running = True
         self.active = True
-        self.thread = threading.Thread(target=self._simulate_data)
-        self.thread.daemon = True
-        self.thread.start()
+        self.simulator.add_listener(self._on_simulation_step)
+        self.simulator.start()
         logger.info("Mock GPS Tracker started")
     
     def stop(self):
         """Stop mock GPS"""
         self.running = False
         self.active = False
-        if self.thread:
-            self.thread.join(timeout=1.0)
+        self.simulator.remove_listener(self._on_simulation_step)
+        self.simulator.stop()
         logger.info("Mock GPS Tracker stopped")
     
     def restart(self):
@@ -173,15 +255,17 @@ class MockGPSTracker:
         self.stop()
         self.start()
     
-    def _simulate_data(self):
-        """Simulate GPS data"""
-        while self.running:
-            # Just update the timestamp, keep position fixed
-            self.gps_data["last_updated"] = time.time()
-            self.gps_data["satellites"] = 8  # Fake a good satellite count
-            self.gps_data["fix"] = True      # Fake having a position fix
-            
-            time.sleep(1.0)
+    def _on_simulation_step(self, obd_values, gps_values, timestamp):
+        """Turn simulator steps into GPS fixes at the GPS rate"""
+        if timestamp - self.last_fix < self.fix_interval:
+            return
+        self.last_fix = timestamp
+        
+        self.gps_data.update(gps_values)
+        self.gps_data["last_updated"] = timestamp
+        self.gps_data["satellites"] = 8  # Fake a good satellite count
+        self.gps_data["fix"] = True      # Fake having a position fix
+        self.history.record(gps_values, timestamp)
     
     def get_location(self):
         """Get simulated location"""
@@ -190,6 +274,10 @@ class MockGPSTracker:
             "longitude": self.gps_data["longitude"]
         }
     
+    def get_history(self, field, seconds):
+        """Get (timestamps, values) arrays for the last `seconds` seconds of a GPS field"""
+        return self.history.window(field, seconds, time.time())
+    
     def get_gps_data(self):
         """Get all simulated GPS data"""
         return self.gps_data.copy()
@@ -221,6 +309,13 @@ class MockAIEngine:
             "default": "I'm running in fallback mode with limited capabilities. I can't process complex requests right now."
         }
         
+        # Answers by query_id for clients that can't take a callback
+        self.results = QueryResults(
+            ttl=self.config.get("ai", "result_ttl", 300),
+            max_entries=self.config.get("ai", "max_results", 256)
+        )
+        self.query_counter = itertools.count(1)
+        
         logger.info("Mock AI Engine initialized")
     
     def start(self):
@@ -233,9 +328,10 @@ class MockAIEngine:
         self.running = False
         logger.info("Mock AI Engine stopped")
     
-    def query(self, query_text, context=None, callback=None):
+    def query(self, query_text, context=None, callback=None, query_id=None, on_token=None):
         """Handle a query with fallback responses"""
-        query_id = f"q{int(time.time() * 1000)}"
+        query_id = query_id or f"q{int(time.time() * 1000)}-{next(self.query_counter)}"
+        self.results.start(query_id, query_text)
         
         # Simple keyword matching for fallback responses
         response = self.fallback_responses.get("default")
@@ -244,6 +340,13 @@ class MockAIEngine:
                 response = resp
                 break
         
+        # Streamed a word at a time, like the real engine's tokens
+        if on_token:
+            for index, word in enumerate(re.findall(r"\S+\s*", response)):
+                on_token(query_id, word, index)
+        
+        self.results.finish(query_id, response)
+        
         # Call callback if provided
         if callback:
             callback(query_id, response)
@@ -0,0 +1,171 @@
+"""
+Revvy AI Companion - OBD Command Broker
+Owns the OBD serial connection and runs every query on a single thread, in priority order.
+"""
+
+import time
+import queue
+import logging
+import itertools
+import threading
+import traceback
+from concurrent.futures import Future
+
+logger = logging.getLogger("OBDBroker")
+
+# Request priorities (lower runs first)
+PRIORITY_ON_DEMAND = 0   # User actions: clear DTC, ad-hoc PID reads
+PRIORITY_DIAGNOSTIC = 1  # Periodic DTC checks
+PRIORITY_POLL = 2        # Background polling batches and (re)connects
+PRIORITY_BACKGROUND = 3  # Housekeeping that can wait (profile revalidation)
+
+_STOP = object()
+
+
+class OBDRequest:
+    """A unit of work that needs the OBD connection"""
+    
+    def __init__(self, func, priority, description):
+        self.func = func
+        self.priority = priority
+        self.description = description
+        self.future = Future()
+        self.submitted = time.time()
+
+
+class OBDBroker:
+    """Serializes all access to the OBD connection through one worker thread"""
+    
+    def __init__(self, cache_ttl=0.5):
+        self.cache_ttl = cache_ttl
+        self.running = False
+        self.thread = None
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        
+        # Held while a request is using the connection
+        self.port_lock = threading.RLock()
+        
+        # Short-lived results: name -> (value, timestamp)
+        self.cache = {}
+        self.cache_lock = threading.Lock()
+        
+        # Stats per priority: (requests, total wait, max wait)
+        self.stats = {}
+        self.cache_hits = 0
+    
+    def start(self):
+        """Start the broker thread"""
+        if self.running:
+            return
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._worker_loop, name="OBDBroker")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info("OBD Broker started")
+    
+    def stop(self):
+        """Stop the broker thread, failing any queued requests"""
+        if not self.running:
+            return
+        
+        self.running = False
+        self.queue.put((-1, next(self.counter), _STOP))
+        
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        
+        # Fail whatever was still waiting
+        while True:
+            try:
+                _, _, request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not _STOP and not request.future.done():
+                request.future.set_exception(RuntimeError("OBD broker stopped"))
+        
+        logger.info("OBD Broker stopped")
+    
+    def submit(self, func, priority=PRIORITY_ON_DEMAND, description=""):
+        """Queue a function that needs the connection, returns a Future"""
+        request = OBDRequest(func, priority, description)
+        
+        # Not running (e.g. connecting before start) or called from a request: run it here
+        if not self.running or threading.current_thread() is self.thread:
+            self._execute(request)
+            return request.future
+        
+        self.queue.put((priority, next(self.counter), request))
+        return request.future
+    
+    def call(self, func, priority=PRIORITY_ON_DEMAND, description="", timeout=None):
+        """Run a function on the broker thread and wait for its result"""
+        return self.submit(func, priority, description).result(timeout=timeout)
+    
+    def get_cached(self, name, max_age=None):
+        """Get a recent result for a name, or None if there isn't a fresh one"""
+        if max_age is None:
+            max_age = self.cache_ttl
+        
+        with self.cache_lock:
+            entry = self.cache.get(name)
+        
+        if entry is None or time.time() - entry[1] > max_age:
+            return None
+        
+        self.cache_hits += 1
+        return entry
+    
+    def cache_result(self, name, value, timestamp=None):
+        """Remember a result so repeated requests don't hit the bus"""
+        with self.cache_lock:
+            self.cache[name] = (value, timestamp if timestamp is not None else time.time())
+    
+    def clear_cache(self):
+        """Forget all cached results (e.g. after clearing DTCs or reconnecting)"""
+        with self.cache_lock:
+            self.cache.clear()
+    
+    def get_stats(self):
+        """Get queue depth and wait times per priority"""
+        priorities = {}
+        for priority, (count, total_wait, max_wait) in list(self.stats.items()):
+            priorities[priority] = {
+                "requests": count,
+                "avg_wait_ms": round(total_wait / count * 1000, 1) if count else 0,
+                "max_wait_ms": round(max_wait * 1000, 1)
+            }
+        
+        return {
+            "queue_depth": self.queue.qsize(),
+            "cache_hits": self.cache_hits,
+            "priorities": priorities
+        }
+    
+    def _worker_loop(self):
+        """Run queued requests one at a time"""
+        while self.running:
+            _, _, request = self.queue.get()
+            if request is _STOP:
+                break
+            
+            self._execute(request)
+    
+    def _execute(self, request):
+        """Run a single request while holding the connection"""
+        if not request.future.set_running_or_notify_cancel():
+            return
+        
+        wait = time.time() - request.submitted
+        count, total_wait, max_wait = self.stats.get(request.priority, (0, 0.0, 0.0))
+        self.stats[request.priority] = (count + 1, total_wait + wait, max(max_wait, wait))
+        
+        try:
+            with self.port_lock:
+                result = request.func()
+            request.future.set_result(result)
+        except Exception as e:
+            logger.debug(f"OBD request failed ({request.description}): {e}")
+            logger.debug(traceback.format_exc())
+            request.future.set_exception(e)
@@ -0,0 +1,619 @@
+"""
+Revvy AI Companion - ELM327 Emulator
+Serves an emulated ELM327 adapter on a pseudo-terminal so the real OBDManager
+(python-OBD, batching, timeouts, reconnects) can run without a car.
+
+    python -m backend.obd.emulator                     # serve until Ctrl+C
+    python -m backend.obd.emulator --bench 30          # connect/reconnect/polling benchmark
+    python -m backend.obd.emulator --trace trip.rtrip --quirk no_multi_pid --dropout 0.02
+    python -m backend.obd.emulator --cycle aggressive --bench 30
+"""
+
+import os
+import sys
+import tty
+import json
+import math
+import time
+import random
+import select
+import logging
+import argparse
+import threading
+import numpy as np
+
+logger = logging.getLogger("ELM327Emulator")
+
+ELM_VERSION = "ELM327 v1.5"
+
+# Mode 01 PIDs the emulator can answer: pid -> (signal, bytes, scale, offset)
+# raw = (value + offset) * scale, matching the python-OBD decoders
+MODE01_PIDS = {
+    0x04: ("engine_load", 1, 255 / 100, 0),
+    0x05: ("coolant_temp", 1, 1, 40),
+    0x0B: ("boost_pressure", 1, 1, 0),
+    0x0C: ("rpm", 2, 4, 0),
+    0x0D: ("speed", 1, 1, 0),
+    0x0F: ("intake_temp", 1, 1, 40),
+    0x11: ("throttle_pos", 1, 255 / 100, 0),
+    0x2F: ("fuel_level", 1, 255 / 100, 0),
+    0x42: ("battery_voltage", 2, 1000, 0),
+    0x5C: ("oil_temp", 1, 1, 40),
+}
+
+# Default response times in seconds, roughly a clone adapter on 500 kbps CAN
+DEFAULT_LATENCY = {
+    "AT": 0.002,
+    "01": 0.035,
+    "03": 0.060,
+    "04": 0.080,
+    "09": 0.060,
+    "extra_pid": 0.004,   # Added per PID after the first in a multi-PID request
+    "frame": 0.002,       # Added per consecutive frame of a multi-frame response
+    "reset": 0.2,         # ATZ
+    "search": 1.5,        # First request after ATSP0 while the protocol is detected
+}
+
+# Protocol quirks seen in real adapters and ECUs
+QUIRKS = {
+    "no_multi_pid",   # Only the first PID of a multi-PID request is answered
+    "searching",      # Prints "SEARCHING..." before the first response in auto mode
+    "echo_stuck",     # ATE0 is acknowledged but echo stays on
+    "no_vin",         # Mode 09 is not supported
+}
+
+# Emulated bus protocols: ELM protocol number -> CAN header bits
+CAN_PROTOCOLS = {"6": 11, "7": 29, "8": 11, "9": 29}
+
+
+def encode_dtc(code):
+    """Encode a DTC string ("P0301") as its two bytes"""
+    letter = "PCBU".index(code[0].upper())
+    value = (letter << 14) | int(code[1:5], 16)
+    return [value >> 8, value & 0xFF]
+
+
+class SyntheticTrace:
+    """Repeating idle / accelerate / cruise / brake cycle with a warming engine"""
+    
+    def __init__(self, cycle_seconds=120.0, seed=None):
+        self.cycle_seconds = cycle_seconds
+        self.random = random.Random(seed)
+    
+    def sample(self, t):
+        """Get {signal: value} at t seconds since the emulator started"""
+        phase = (t % self.cycle_seconds) / self.cycle_seconds
+        
+        if phase < 0.15:       # Idle
+            speed, throttle = 0.0, 0.0
+        elif phase < 0.35:     # Accelerate
+            p = (phase - 0.15) / 0.2
+            speed, throttle = 100.0 * p, 60.0 - 30.0 * p
+        elif phase < 0.75:     # Cruise
+            speed, throttle = 100.0 + 5.0 * math.sin(t / 7.0), 22.0
+        else:                  # Brake to a stop
+            p = (phase - 0.75) / 0.25
+            speed, throttle = 100.0 * (1 - p), 0.0
+        
+        gear_ratio = 45.0 if speed < 20 else 30.0 if speed < 50 else 22.0
+        rpm = max(800.0, speed * gear_ratio) + self.random.uniform(-15, 15)
+        load = min(100.0, 15.0 + throttle * 1.2)
+        
+        # Coolant and oil warm up over the first few minutes
+        coolant = 90.0 - 70.0 * math.exp(-t / 240.0)
+        oil = 95.0 - 75.0 * math.exp(-t / 400.0)
+        
+        return {
+            "rpm": rpm,
+            "speed": speed,
+            "throttle_pos": throttle,
+            "engine_load": load,
+            "coolant_temp": coolant,
+            "oil_temp": oil,
+            "intake_temp": 25.0 + throttle * 0.2,
+            "boost_pressure": 100.0 + throttle * 1.1,
+            "fuel_level": max(5.0, 75.0 - t / 300.0),
+            "battery_voltage": 14.1 + self.random.uniform(-0.05, 0.05)
+        }
+
+
+class RecordedTrace:
+    """Replays recorded signals with linear interpolation, looping at the end"""
+    
+    def __init__(self, signals, loop=True):
+        # signals: name -> (timestamps, values)
+        self.loop = loop
+        self.signals = {}
+        self.duration = 0.0
+        
+        start = min((times[0] for times, _ in signals.values() if len(times)), default=0.0)
+        for name, (times, values) in signals.items():
+            if len(times) == 0:
+                continue
+            times = np.asarray(times, dtype=np.float64) - start
+            self.signals[name] = (times, np.asarray(values, dtype=np.float64))
+            self.duration = max(self.duration, float(times[-1]))
+    
+    @classmethod
+    def from_csv(cls, path, time_column="time", loop=True):
+        """Load a CSV with a time column (seconds) and one column per signal"""
+        data = np.genfromtxt(path, delimiter=",", names=True)
+        columns = [name for name in data.dtype.names if name != time_column]
+        
+        return cls({name: (data[time_column], data[name]) for name in columns}, loop)
+    
+    @classmethod
+    def from_trip(cls, path, loop=True):
+        """Load the OBD signals of a recorded trip file"""
+        from telemetry.trip_recorder import TripFile
+        
+        with TripFile(path) as trip:
+            signals = {}
+            for name in trip.signals:
+                if not name.startswith("gps."):
+                    times, values = trip.read(name)
+                    signals[name] = (np.array(times), np.array(values))
+        
+        return cls(signals, loop)
+    
+    def sample(self, t):
+        """Get {signal: value} at t seconds since the emulator started"""
+        if self.loop and self.duration > 0:
+            t = t % self.duration
+        
+        return {
+            name: float(np.interp(t, times, values))
+            for name, (times, values) in self.signals.items()
+        }
+
+
+class ELM327Emulator:
+    """Emulated ELM327 on a CAN vehicle, served over a pty"""
+    
+    def __init__(self, trace=None, protocol="6", latency=None, jitter=0.0,
+                 dropout_rate=0.0, stall_rate=0.0, quirks=(), dtcs=(), vin="1REVVY00000000001", seed=None):
+        unknown = set(quirks) - QUIRKS
+        if unknown:
+            raise ValueError(f"Unknown quirks: {', '.join(sorted(unknown))}")
+        if protocol not in CAN_PROTOCOLS:
+            raise ValueError(f"Unsupported protocol {protocol}, expected one of {', '.join(CAN_PROTOCOLS)}")
+        
+        self.trace = trace or SyntheticTrace(seed=seed)
+        self.bus_protocol = protocol
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.jitter = jitter
+        self.dropout_rate = dropout_rate  # Chance of answering "NO DATA"
+        self.stall_rate = stall_rate      # Chance of not answering at all (client times out)
+        self.quirks = set(quirks)
+        self.dtcs = list(dtcs)
+        self.vin = vin
+        self.random = random.Random(seed)
+        
+        # Ignition off: the adapter answers AT commands but the ECU is silent
+        self.ignition = True
+        
+        self.running = False
+        self.thread = None
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+        self.started = 0
+        
+        self.stats = {"requests": 0, "pids": 0, "no_data": 0, "stalls": 0, "at_commands": 0}
+        self._reset()
+    
+    def _reset(self):
+        """Adapter state after power-up or ATZ"""
+        self.echo = True
+        self.headers = False
+        self.spaces = True
+        self.linefeeds = False
+        self.protocol = "0"     # Auto
+        self.searched = False
+        self.last_command = ""
+    
+    def start(self):
+        """Open the pty and start answering requests, returns the port path"""
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        
+        self.started = time.time()
+        self.running = True
+        self.thread = threading.Thread(target=self._serve_loop, name="ELM327Emulator")
+        self.thread.daemon = True
+        self.thread.start()
+        
+        logger.info(f"ELM327 emulator listening on {self.port}")
+        return self.port
+    
+    def stop(self):
+        """Stop answering and close the pty"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        
+        self.master_fd = None
+        self.slave_fd = None
+        logger.info("ELM327 emulator stopped")
+    
+    def _serve_loop(self):
+        """Read CR-terminated commands and write responses"""
+        buffer = b""
+        
+        while self.running:
+            try:
+                readable, _, _ = select.select([self.master_fd], [], [], 0.1)
+                if not readable:
+                    continue
+                data = os.read(self.master_fd, 1024)
+            except OSError:
+                break
+            
+            buffer += data
+            while b"\r" in buffer:
+                line, buffer = buffer.split(b"\r", 1)
+                response = self.handle(line.decode("ascii", "ignore"))
+                if response is not None:
+                    try:
+                        os.write(self.master_fd, response.encode("ascii"))
+                    except OSError:
+                        return
+    
+    def handle(self, line):
+        """Answer one command line, returns the text to send (None to stay silent)"""
+        command = line.replace(" ", "").upper()
+        
+        # A bare CR repeats the previous command
+        if command == "" and self.last_command:
+            command = self.last_command
+        
+        echo = line + "\r" if self.echo else ""
+        
+        if command.startswith("AT"):
+            self.stats["at_commands"] += 1
+            lines, delay = self._handle_at(command[2:])
+        else:
+            self.last_command = command
+            self.stats["requests"] += 1
+            lines, delay = self._handle_obd(command)
+        
+        if lines is None:
+            self.stats["stalls"] += 1
+            return None
+        
+        if self.jitter:
+            delay += self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        
+        newline = "\r\n" if self.linefeeds else "\r"
+        return echo + newline.join(lines) + newline + newline + ">"
+    
+    def _handle_at(self, command):
+        """Answer an AT command"""
+        delay = self.latency["AT"]
+        
+        if command == "Z":
+            self._reset()
+            return ["", "", ELM_VERSION], self.latency["reset"]
+        if command == "I":
+            return [ELM_VERSION], delay
+        if command == "@1":
+            return ["Revvy ELM327 Emulator"], delay
+        if command == "RV":
+            return [f"{14.1 if self.ignition else 12.4:.1f}V"], delay
+        if command == "DPN":
+            return [("A" if self.protocol == "0" else "") + self._active_protocol()], delay
+        if command == "DP":
+            return [f"ISO 15765-4 (CAN {CAN_PROTOCOLS[self.bus_protocol]}/500)"], delay
+        if command in ("E0", "E1"):
+            if "echo_stuck" not in self.quirks:
+                self.echo = command == "E1"
+            return ["OK"], delay
+        if command in ("H0", "H1"):
+            self.headers = command == "H1"
+            return ["OK"], delay
+        if command in ("S0", "S1"):
+            self.spaces = command == "S1"
+            return ["OK"], delay
+        if command in ("L0", "L1"):
+            self.linefeeds = command == "L1"
+            return ["OK"], delay
+        if command.startswith("SP") or command.startswith("TP"):
+            protocol = command[2:].lstrip("A") or "0"
+            self.protocol = protocol
+            self.searched = protocol != "0"
+            return ["OK"], delay
+        if command in ("D", "WS", "CAF0", "CAF1", "AT0", "AT1", "AT2", "M0", "M1") or command.startswith("ST"):
+            return ["OK"], delay
+        
+        return ["?"], delay
+    
+    def _active_protocol(self):
+        """Protocol the adapter is using (detected in auto mode)"""
+        return self.bus_protocol if self.protocol == "0" else self.protocol
+    
+    def _handle_obd(self, command):
+        """Answer an OBD request (hex mode + PIDs, optional trailing response count)"""
+        if len(command) % 2:
+            command = command[:-1]
+        
+        try:
+            request = bytes.fromhex(command)
+        except ValueError:
+            return ["?"], self.latency["AT"]
+        
+        if not request:
+            return ["?"], self.latency["AT"]
+        
+        prefix = []
+        mode = request[0]
+        delay = self.latency.get(f"{mode:02X}", self.latency["01"])
+        
+        # Wrong protocol selected (e.g. a stale cached profile)
+        if self._active_protocol() != self.bus_protocol:
+            return ["UNABLE TO CONNECT"], self.latency["search"]
+        
+        # Ignition off: nothing to find while searching, silence once connected
+        if not self.ignition:
+            if not self.searched:
+                return ["SEARCHING...", "UNABLE TO CONNECT"], self.latency["search"]
+            return ["NO DATA"], delay
+        
+        if not self.searched:
+            self.searched = True
+            delay += self.latency["search"]
+            if "searching" in self.quirks:
+                prefix = ["SEARCHING..."]
+        
+        if self.stall_rate and self.random.random() < self.stall_rate:
+            return None, 0
+        
+        if self.dropout_rate and self.random.random() < self.dropout_rate:
+            self.stats["no_data"] += 1
+            return prefix + ["NO DATA"], delay
+        
+        if mode == 0x01:
+            pids = list(request[1:7])
+            if "no_multi_pid" in self.quirks:
+                pids = pids[:1]
+            payload = self._mode01(pids)
+            delay += self.latency["extra_pid"] * (len(pids) - 1)
+        elif mode == 0x03:
+            codes = [b for code in self.dtcs for b in encode_dtc(code)]
+            payload = [0x43, len(self.dtcs)] + codes
+        elif mode == 0x04:
+            self.dtcs = []
+            payload = [0x44]
+        elif mode == 0x09 and request[1:2] == b"\x02" and "no_vin" not in self.quirks:
+            payload = [0x49, 0x02, 0x01] + list(self.vin.encode("ascii"))
+        else:
+            payload = None
+        
+        if payload is None:
+            self.stats["no_data"] += 1
+            return prefix + ["NO DATA"], delay
+        
+        frames = self._frames(payload)
+        delay += self.latency["frame"] * (len(frames) - 1)
+        return prefix + frames, delay
+    
+    def _mode01(self, pids):
+        """Build the Mode 01 response payload, None if no PID is supported"""
+        values = self.trace.sample(time.time() - self.started)
+        payload = [0x41]
+        
+        for pid in pids:
+            data = self._pid_data(pid, values)
+            if data is not None:
+                payload += [pid] + data
+                self.stats["pids"] += 1
+        
+        return payload if len(payload) > 1 else None
+    
+    def _pid_data(self, pid, values):
+        """Encode one Mode 01 PID"""
+        if pid % 0x20 == 0:
+            return self._support_bitmap(pid)
+        
+        if pid == 0x01:
+            # MIL and DTC count, all monitors complete
+            return [(0x80 if self.dtcs else 0) | min(len(self.dtcs), 0x7F), 0x07, 0xFF, 0x00]
+        
+        spec = MODE01_PIDS.get(pid)
+        if spec is None:
+            return None
+        
+        signal, size, scale, offset = spec
+        value = values.get(signal)
+        if value is None:
+            return None
+        
+        raw = int(round((value + offset) * scale))
+        raw = max(0, min(raw, (1 << (8 * size)) - 1))
+        return list(raw.to_bytes(size, "big"))
+    
+    def _support_bitmap(self, base):
+        """Supported-PID bitmap for PIDs base+1 .. base+0x20"""
+        supported = set(MODE01_PIDS) | {0x01}
+        if base > max(supported):
+            return None
+        
+        bitmap = 0
+        for i in range(1, 0x21):
+            pid = base + i
+            if pid in supported or (i == 0x20 and pid <= max(supported)):
+                bitmap |= 1 << (32 - i)
+        
+        return list(bitmap.to_bytes(4, "big"))
+    
+    def _frames(self, payload):
+        """Split a response into ISO-TP frames, formatted as the ELM prints them"""
+        if CAN_PROTOCOLS[self.bus_protocol] == 11:
+            header = ["7E8"]
+        else:
+            header = ["18", "DA", "F1", "10"]
+        
+        if len(payload) <= 7:
+            frames = [[len(payload)] + payload]
+        else:
+            frames = [[0x10 | (len(payload) >> 8), len(payload) & 0xFF] + payload[:6]]
+            rest = payload[6:]
+            seq = 1
+            while rest:
+                frames.append([0x20 | seq] + rest[:7])
+                rest = rest[7:]
+                seq = (seq + 1) % 16
+        
+        separator = " " if self.spaces else ""
+        lines = []
+        for frame in frames:
+            frame = frame + [0x00] * (8 - len(frame))
+            data = [f"{b:02X}" for b in frame]
+            if self.headers:
+                lines.append(separator.join(header + data))
+            else:
+                # Without headers the ELM drops the PCI byte of single frames
+                lines.append(separator.join(data[1:] if len(frames) == 1 else data))
+        
+        return lines
+    
+    def get_stats(self):
+        """Get request counters"""
+        return dict(self.stats)
+
+
+def simulated_trace(cycle, seed=None):
+    """Trace that runs the drive simulator along a drive cycle"""
+    from simulation.simulator import DriveSimulator, SimulatedTrace
+    
+    class CycleConfig:
+        def get(self, section, key, default=None):
+            if section == "simulation" and key == "drive_cycle":
+                return cycle
+            if section == "simulation" and key == "seed" and seed is not None:
+                return seed
+            return default
+    
+    return SimulatedTrace(DriveSimulator(CycleConfig()))
+
+
+def run_benchmark(emulator, seconds):
+    """Measure full connect, fast reconnect and polling throughput of the real OBDManager"""
+    import tempfile
+    
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [os.path.dirname(backend_dir), backend_dir]
+    from backend.config import RevvyConfig
+    from backend.obd.manager import OBDManager
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        config = RevvyConfig(os.path.join(tmp, "config.json"))
+        config.config["obd"].update({
+            "port": emulator.port,
+            "baudrate": None,
+            "profile_cache_path": os.path.join(tmp, "obd_profiles.json")
+        })
+        
+        manager = OBDManager(config)
+        
+        started = time.time()
+        connected = manager.connect()
+        results["full_connect_s"] = round(time.time() - started, 3)
+        if not connected:
+            results["error"] = "full connect failed"
+            return results
+        
+        manager.connection.close()
+        manager.connected = False
+        
+        started = time.time()
+        manager.connect()
+        results["fast_reconnect_s"] = round(time.time() - started, 3)
+        
+        before = emulator.get_stats()
+        manager.start()
+        time.sleep(seconds)
+        after = emulator.get_stats()
+        polling = manager.get_polling_stats()
+        manager.stop()
+    
+    results["duration_s"] = seconds
+    results["requests_per_s"] = round((after["requests"] - before["requests"]) / seconds, 1)
+    results["pids_per_s"] = round((after["pids"] - before["pids"]) / seconds, 1)
+    results["batching"] = manager.batch_supported
+    results["achieved_hz"] = {name: stats["achieved_hz"] for name, stats in polling.items()}
+    results["emulator"] = after
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulated ELM327 adapter on a pseudo-terminal")
+    parser.add_argument("--trace", help="Recorded trace to replay (.csv or .rtrip)")
+    parser.add_argument("--cycle", help="Drive the drive simulator along a cycle (ftp75, wltp, calm, aggressive)")
+    parser.add_argument("--protocol", default="6", choices=sorted(CAN_PROTOCOLS))
+    parser.add_argument("--latency", type=float, help="Base Mode 01 response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter in seconds")
+    parser.add_argument("--dropout", type=float, default=0.0, help="Chance of answering NO DATA")
+    parser.add_argument("--stall", type=float, default=0.0, help="Chance of not answering at all")
+    parser.add_argument("--quirk", action="append", default=[], choices=sorted(QUIRKS))
+    parser.add_argument("--dtc", action="append", default=[], help="Stored trouble code, e.g. P0301")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--bench", type=float, metavar="SECONDS", help="Run the OBDManager benchmark and exit")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend_dir)
+    
+    trace = None
+    if args.trace:
+        if args.trace.endswith(".csv"):
+            trace = RecordedTrace.from_csv(args.trace)
+        else:
+            trace = RecordedTrace.from_trip(args.trace)
+    elif args.cycle:
+        trace = simulated_trace(args.cycle, args.seed)
+    
+    emulator = ELM327Emulator(
+        trace=trace,
+        protocol=args.protocol,
+        latency={"01": args.latency} if args.latency is not None else None,
+        jitter=args.jitter,
+        dropout_rate=args.dropout,
+        stall_rate=args.stall,
+        quirks=args.quirk,
+        dtcs=args.dtc,
+        seed=args.seed
+    )
+    emulator.start()
+    
+    try:
+        if args.bench:
+            print(json.dumps(run_benchmark(emulator, args.bench), indent=2))
+        else:
+            print(f"ELM327 emulator on {emulator.port} (Ctrl+C to stop)")
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
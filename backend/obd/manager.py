@@ -3,16 +3,34 @@ Revvy AI Companion - OBD Manager
 Handles communication with the vehicle through the OBD-II interface.
 """
 
+import re
 import time
 import logging
 import threading
 import traceback
+from concurrent.futures import Future
 import obd
-from obd import OBDStatus
+from obd import OBDStatus, OBDCommand, ECU
+from obd.decoders import raw_string
 from utils.unit_converter import UnitConverter
+from telemetry.history import TelemetryHistory
+from .scheduler import PollScheduler
+from .snapshot import VehicleSnapshot
+from .broker import OBDBroker, PRIORITY_ON_DEMAND, PRIORITY_DIAGNOSTIC, PRIORITY_POLL, PRIORITY_BACKGROUND
+from .profiles import VehicleProfileCache, supported_pid_bitmap, ecu_fingerprint
+from .pids import PIDCatalog
 
 logger = logging.getLogger("OBDManager")
 
+# ELM327 adapters accept at most six PIDs in a single Mode 01 request
+MAX_PIDS_PER_REQUEST = 6
+
+# Protocol IDs (as reported by ATDPN) that support multi-PID requests (CAN only)
+MULTI_PID_PROTOCOLS = ["6", "7", "8", "9", "A", "B", "C"]
+
+# A VIN is 17 characters, I, O and Q are never used
+VIN_PATTERN = re.compile(r"^[A-HJ-NPR-Z0-9]{17}$")
+
 class OBDManager:
     """Manages OBD connection and vehicle data"""
     
@@ -24,7 +42,7 @@ class OBDManager:
         self.thread = None
         self.data_lock = threading.Lock()
         
-        # Vehicle data cache
+        # Working copy of vehicle data, only written by the OBD thread (under data_lock)
         self.vehicle_data = {
             "rpm": 0,
             "speed": 0,
@@ -41,6 +59,17 @@ class OBDManager:
             "has_turbo": False,
             "last_updated": time.time()
         }
+        self.field_timestamps = {}
+        
+        # Published read-only snapshot, swapped atomically after each poll
+        self._snapshot = VehicleSnapshot(0, dict(self.vehicle_data), {})
+        self.snapshot_listeners = []
+        
+        # Recent history of every polled metric at full poll rate
+        self.history = TelemetryHistory(
+            history_seconds=self.config.get("telemetry", "history_seconds", 600),
+            max_rate_hz=self.config.get("telemetry", "max_rate_hz", 10.0)
+        )
         
         # Command mappings
         self.commands = {
@@ -58,12 +87,52 @@ class OBDManager:
             "dtc": obd.commands.GET_DTC
         }
         
+        # Compiled decoders for the polled PIDs, samples skip python-OBD's pint Quantities
+        self.catalog = PIDCatalog(self.config.get("obd", "extended_pids", []))
+        self.pid_specs = {}
+        for name, cmd in self.commands.items():
+            spec = self.catalog.get(cmd.mode, cmd.pid) if cmd.pid is not None else None
+            if spec is not None:
+                self.pid_specs[name] = spec
+        
+        # Vehicle specific extended PIDs (e.g. Mode 22) are polled like the standard ones
+        for spec in self.catalog.extended():
+            self.pid_specs[spec.name.lower()] = spec
+        
+        self.raw_commands = {name: spec.obd_command() for name, spec in self.pid_specs.items()}
+        for name, spec in self.pid_specs.items():
+            if spec.mode != 0x01:
+                self.commands[name] = self.raw_commands[name]
+        
         # Available commands for this vehicle
         self.available_commands = []
         
+        # Multi-PID batching (None = not yet probed, True/False = probe result)
+        self.batch_enabled = self.config.get("obd", "batch_queries", True)
+        self.batch_supported = None
+        
+        # Per-PID polling schedule (polling_interval is the rate for PIDs without one)
+        polling_interval = self.config.get("obd", "polling_interval", 1.0)
+        self.scheduler = PollScheduler(
+            rates=self.config.get("obd", "poll_rates", None),
+            default_rate=1.0 / polling_interval
+        )
+        
+        # Single owner of the serial connection, every query goes through it
+        self.broker = OBDBroker(cache_ttl=self.config.get("obd", "query_cache_ttl", 0.5))
+        self.on_demand_timeout = self.config.get("obd", "on_demand_timeout", 10.0)
+        
+        # Per-vehicle connection profiles for fast reconnects
+        self.fast_reconnect = self.config.get("obd", "fast_reconnect", True)
+        self.profiles = VehicleProfileCache(
+            self.config.get("obd", "profile_cache_path", "./data/obd_profiles.json")
+        )
+        self.profile = None
+    
     def start(self):
         """Start OBD connection and monitoring thread"""
         self.running = True
+        self.broker.start()
         self.thread = threading.Thread(target=self._monitor_loop)
         self.thread.daemon = True
         self.thread.start()
@@ -76,8 +145,10 @@ class OBDManager:
             self.thread.join(timeout=2.0)
         
         if self.connection:
-            self.connection.close()
+            self.broker.call(self.connection.close, PRIORITY_ON_DEMAND, "close")
             self.connected = False
+        
+        self.broker.stop()
             
         logger.info("OBD Manager stopped")
     
@@ -94,7 +165,26 @@ class OBDManager:
     
     def connect(self):
         """Establish connection to the OBD adapter"""
+        return self.broker.call(self._connect, PRIORITY_POLL, "connect")
+    
+    def _connect(self):
+        """Open the connection (runs on the broker thread)"""
+        self.broker.clear_cache()
         port = self.config.get("obd", "port")
+        
+        # Nothing is known about the vehicle on the other end until this connection says so
+        self.profile = None
+        
+        # Known vehicle on this adapter: skip protocol detection and discovery
+        if self.fast_reconnect:
+            profile = self.profiles.get_last(port)
+            if profile and self._connect_fast(port, profile):
+                return True
+        
+        return self._connect_full(port)
+    
+    def _connect_full(self, port):
+        """Connect with protocol auto-detection and full command discovery"""
         baudrate = self.config.get("obd", "baudrate")
         timeout = self.config.get("obd", "timeout")
         
@@ -117,9 +207,16 @@ class OBDManager:
                 # Get available commands
                 self._discover_available_commands()
                 
+                # Re-probe multi-PID support for this connection
+                self.batch_supported = None
+                
                 # Check if vehicle has turbo
                 self._detect_turbo()
                 
+                # Remember this vehicle for next time, VIN lookup can wait
+                self._save_profile(port, self._read_profile(port))
+                self.broker.submit(lambda: self._revalidate_profile(port), PRIORITY_BACKGROUND, "read vin")
+                
                 return True
             else:
                 logger.warning(f"OBD connection failed: {self.connection.status()}")
@@ -131,6 +228,121 @@ class OBDManager:
             self.connected = False
             return False
     
+    def _connect_fast(self, port, profile):
+        """Reconnect using a cached profile (known protocol and baud rate, fast mode)"""
+        timeout = self.config.get("obd", "fast_connect_timeout", 2.0)
+        started = time.time()
+        
+        try:
+            logger.info(f"Fast reconnect to {profile['key']} on {port} (protocol {profile['protocol']})")
+            
+            self.connection = obd.OBD(
+                portstr=port,
+                baudrate=profile["baudrate"],
+                protocol=profile["protocol"],
+                timeout=timeout,
+                fast=True
+            )
+            
+            if self.connection.status() != OBDStatus.CAR_CONNECTED:
+                logger.info(f"Fast reconnect failed ({self.connection.status()}), falling back to full connect")
+                self.connection.close()
+                self.profile = None
+                return False
+            
+            self.connected = True
+            self.profile = profile
+            
+            # Restore what discovery would have found
+            self.available_commands = [name for name in profile["available_commands"] if name in self.commands]
+            self.scheduler.set_commands([name for name in self.available_commands if name not in ["dtc", "status"]])
+            self.batch_supported = profile.get("batch_supported")
+            self._store_values({"has_turbo": profile.get("has_turbo", False)})
+            
+            logger.info(f"Fast reconnect completed in {time.time() - started:.1f}s")
+            
+            # Check the profile still matches the vehicle once polling is running
+            self.broker.submit(lambda: self._revalidate_profile(port), PRIORITY_BACKGROUND, "revalidate profile")
+            return True
+            
+        except Exception as e:
+            logger.info(f"Fast reconnect failed ({e}), falling back to full connect")
+            self.profile = None
+            return False
+    
+    def _read_profile(self, port, vin=None):
+        """Describe the connected vehicle as a cacheable profile, vin only as read on this connection"""
+        protocol = self.connection.protocol_id()
+        bitmap = supported_pid_bitmap(self.connection.supported_commands)
+        
+        # python-OBD doesn't expose the baud rate it detected, an auto-detected one is
+        # detected again on the fast reconnect (the protocol is still skipped)
+        baudrate = self.config.get("obd", "baudrate")
+        
+        return {
+            "protocol": protocol,
+            "baudrate": baudrate,
+            "supported_pids": bitmap,
+            "available_commands": list(self.available_commands),
+            "has_turbo": bool(self.get_metric("has_turbo")),
+            "batch_supported": self.batch_supported,
+            "vin": vin
+        }
+    
+    def _save_profile(self, port, profile):
+        """Store a profile under the VIN if known, else the ECU fingerprint"""
+        key = profile.get("vin") or ecu_fingerprint(profile["protocol"], profile["supported_pids"])
+        self.profiles.put(port, key, profile)
+        self.profile = self.profiles.get(key)
+    
+    def _read_vin(self):
+        """Read the VIN (Mode 09), or None if the vehicle doesn't report it"""
+        if not obd.commands.has_name("VIN"):
+            return None
+        
+        response = self.connection.query(obd.commands.VIN, force=True)
+        if response.is_null() or not response.messages:
+            return None
+        
+        # python-OBD's decoder strips leading and trailing 0, 1, 2 and x, which VINs
+        # contain, so decode the raw message: 49 02 header, then the characters with
+        # frame counters and padding in between
+        data = bytes(response.messages[0].data[2:])
+        vin = "".join(chr(b) for b in data if chr(b).isascii() and chr(b).isalnum())[-17:]
+        
+        if not VIN_PATTERN.match(vin):
+            logger.info(f"Ignoring invalid VIN {data!r}")
+            return None
+        return vin
+    
+    def _revalidate_profile(self, port):
+        """Check the cached profile against the vehicle (runs on the broker thread, low priority)"""
+        if not self.connection or not self.connected:
+            return
+        
+        try:
+            vin = self._read_vin()
+            bitmap = supported_pid_bitmap(self.connection.supported_commands)
+            known_vin = self.profile.get("vin") if self.profile else None
+            
+            if vin and known_vin and vin != known_vin:
+                # Adapter moved to another vehicle
+                logger.info(f"Vehicle changed ({known_vin} -> {vin}), refreshing profile")
+            elif self.profile and self.profile.get("supported_pids") == bitmap:
+                # Same vehicle, just record the VIN or batching result if newly learned
+                if (vin and not known_vin) or self.profile.get("batch_supported") != self.batch_supported:
+                    self._save_profile(port, self._read_profile(port, vin))
+                return
+            
+            logger.info("Vehicle profile out of date, rediscovering commands")
+            self._discover_available_commands()
+            self._detect_turbo()
+            
+            self._save_profile(port, self._read_profile(port, vin))
+            
+        except Exception as e:
+            logger.error(f"Error revalidating vehicle profile: {e}")
+    
     def _discover_available_commands(self):
         """Discover available OBD commands for this vehicle"""
         if not self.connection:
@@ -142,27 +354,32 @@ class OBDManager:
             if cmd in self.connection.supported_commands:
                 self.available_commands.append(name)
                 logger.debug(f"Command available: {name}")
+            elif self.pid_specs.get(name) and self.pid_specs[name].mode != 0x01 and self._query_value(name) is not None:
+                # Extended PIDs aren't in the supported-PID bitmaps, probe them
+                self.available_commands.append(name)
+                logger.debug(f"Extended PID available: {name}")
             else:
                 logger.debug(f"Command not supported: {name}")
                 
         logger.info(f"Discovered {len(self.available_commands)} available OBD commands")
     
+        # Schedule the polled metrics (special commands run on their own interval)
+        self.scheduler.set_commands([name for name in self.available_commands if name not in ["dtc", "status"]])
+    
     def _detect_turbo(self):
         """Detect if vehicle has a turbo/supercharger by checking for boost pressure"""
         if "boost_pressure" in self.available_commands:
             try:
-                response = self.connection.query(self.commands["boost_pressure"])
-                if response.is_null():
-                    self.vehicle_data["has_turbo"] = False
-                else:
-                    # If the sensor is present, assume it may have a turbo
-                    self.vehicle_data["has_turbo"] = True
+                present = self._query_value("boost_pressure") is not None
+                # If the sensor is present, assume it may have a turbo
+                self._store_values({"has_turbo": present})
+                if present:
                     logger.info("Turbo/supercharger detected (boost pressure sensor present)")
             except Exception as e:
                 logger.error(f"Error detecting turbo: {e}")
         else:
             logger.info("No boost pressure sensor detected, assuming naturally aspirated")
-            self.vehicle_data["has_turbo"] = False
+            self._store_values({"has_turbo": False})
     
     def _monitor_loop(self):
         """Main monitoring loop that continuously polls vehicle data"""
@@ -199,7 +416,7 @@ class OBDManager:
                         # Check DTCs periodically (not on every cycle to reduce overhead)
                         current_time = time.time()
                         if current_time - last_dtc_check > dtc_check_interval:
-                            self._check_dtc_codes()
+                            self.broker.call(self._check_dtc_codes, PRIORITY_DIAGNOSTIC, "dtc check")
                             last_dtc_check = current_time
                         
                         # Reset reconnect counter on successful poll
@@ -214,8 +431,11 @@ class OBDManager:
                             self.connected = False
                         reconnect_attempts += 1
                 
-                # Sleep for polling interval
-                time.sleep(polling_interval)
+                # Sleep until the next PID is due, or the polling interval while disconnected
+                if self.connected:
+                    time.sleep(self.scheduler.time_until_next())
+                else:
+                    time.sleep(polling_interval)
                 
             except Exception as e:
                 logger.error(f"Unexpected error in OBD monitor loop: {e}")
@@ -228,62 +448,232 @@ class OBDManager:
         if not self.connection or not self.connected:
             return
             
+        # Metrics that are due this cycle, most urgent first
+        names = self.scheduler.next_batch(time.time(), MAX_PIDS_PER_REQUEST)
+        if not names:
+            return
+        
+        # Query on the broker thread (on-demand requests can slot in between batches)
+        # without holding the lock, readers use the published snapshot
+        values = self.broker.call(lambda: self._poll(names), PRIORITY_POLL, "poll")
+        
+        self._store_values(values)
+        self.scheduler.complete(names, values)
+    
+    def _poll(self, names):
+        """Query a batch of metrics (runs on the broker thread)"""
+        if self._can_batch():
+            values = self._query_batched(names)
+        else:
+            values = self._query_single(names)
+        
+        # Recent poll results also answer ad-hoc queries for the same PID
+        now = time.time()
+        for name, value in values.items():
+            self.broker.cache_result(name, value, now)
+        
+        return values
+    
+    def _store_values(self, values):
+        """Merge new values into the working data and publish a new snapshot"""
+        now = time.time()
+        
         with self.data_lock:
-            # Update each available metric
-            for name in self.available_commands:
-                try:
-                    if name in ["dtc", "status"]:  # Skip special commands
-                        continue
-                        
-                    cmd = self.commands[name]
-                    response = self.connection.query(cmd)
-                    
-                    if not response.is_null():
-                        # Store the value
-                        self.vehicle_data[name] = response.value.magnitude
-                    
-                except Exception as e:
-                    logger.debug(f"Error updating {name}: {e}")
+            self.vehicle_data.update(values)
+            self.vehicle_data["last_updated"] = now
+            
+            for name in values:
+                self.field_timestamps[name] = now
+            
+            # Build the new snapshot from fresh dicts, then swap the reference
+            self._snapshot = VehicleSnapshot(
+                self._snapshot.seq + 1,
+                dict(self.vehicle_data),
+                dict(self.field_timestamps),
+                now
+            )
+        
+        self.history.record(values, now)
+        self._notify_snapshot(self._snapshot)
+    
+    def _notify_snapshot(self, snapshot):
+        """Hand a newly published snapshot to the listeners (called on the OBD thread)"""
+        for listener in self.snapshot_listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Error in snapshot listener: {e}")
+    
+    def _can_batch(self):
+        """Check if multi-PID requests can be used on this connection"""
+        if not self.batch_enabled or self.batch_supported is False:
+            return False
+        
+        if self.batch_supported is None:
+            try:
+                protocol_id = self.connection.protocol_id()
+            except Exception:
+                protocol_id = None
+            
+            if protocol_id not in MULTI_PID_PROTOCOLS:
+                logger.info(f"Protocol {protocol_id} does not support multi-PID requests, using single-PID queries")
+                self.batch_supported = False
+                return False
+        
+        return True
+    
+    def _query_value(self, name):
+        """Query one metric and decode it, None if the vehicle didn't answer"""
+        spec = self.pid_specs.get(name)
+        
+        if spec is None:
+            response = self.connection.query(self.commands[name])
+            return None if response.is_null() else response.value.magnitude
+        
+        # Raw response decoded by the catalog (extended PIDs aren't in python-OBD's supported list)
+        response = self.connection.query(self.raw_commands[name], force=spec.mode != 0x01)
+        return None if response.is_null() else spec.decode_messages(response.messages)
+    
+    def _query_single(self, names):
+        """Query each metric with its own request"""
+        values = {}
+        
+        for name in names:
+            try:
+                value = self._query_value(name)
+                
+                if value is not None:
+                    values[name] = value
+                
+            except Exception as e:
+                logger.debug(f"Error updating {name}: {e}")
+        
+        return values
+    
+    def _query_batched(self, names):
+        """Query metrics in groups of up to six Mode 01 PIDs per request"""
+        values = {}
+        
+        # Only Mode 01 PIDs with a known size can be packed together
+        batchable = [name for name in names if name in self.pid_specs and self.pid_specs[name].mode == 0x01]
+        others = [name for name in names if name not in batchable]
+        
+        for i in range(0, len(batchable), MAX_PIDS_PER_REQUEST):
+            group = batchable[i:i + MAX_PIDS_PER_REQUEST]
+            
+            try:
+                group_values = self._query_pid_group(group)
+            except Exception as e:
+                logger.debug(f"Error in multi-PID request {group}: {e}")
+                group_values = {}
+            
+            if self.batch_supported is None and len(group) > 1:
+                # The first batch decides: some ECUs answer nothing, or only the first PID of a request
+                if len(group_values) <= 1:
+                    logger.info(f"ECU answered {len(group_values)} of {len(group)} PIDs in a multi-PID request, "
+                                f"falling back to single-PID queries")
+                    self.batch_supported = False
+                    return self._query_single(names)
+                logger.info("ECU accepts multi-PID requests, batching enabled")
+                self.batch_supported = True
+            
+            values.update(group_values)
+            
+            # Re-query anything the ECU left out of the combined response
+            missing = [name for name in group if name not in group_values]
+            if missing:
+                values.update(self._query_single(missing))
+        
+        values.update(self._query_single(others))
+        return values
+    
+    def _query_pid_group(self, names):
+        """Send one multi-PID request and split the response into metric values"""
+        commands_by_pid = {self.pid_specs[name].pid: name for name in names}
+        
+        request = b"01" + b"".join(b"%02X" % pid for pid in commands_by_pid)
+        batch_cmd = OBDCommand("BATCH", "Multi-PID request", request, 0, raw_string, ECU.ALL, True)
+        
+        response = self.connection.query(batch_cmd, force=True)
+        if response.is_null():
+            return {}
+        
+        values = {}
+        
+        for message in response.messages:
+            data = message.data
+            
+            # Expect a positive Mode 01 response (0x41) followed by [PID, data...] groups
+            if len(data) < 2 or data[0] != 0x41:
+                continue
             
-            # Update timestamp
-            self.vehicle_data["last_updated"] = time.time()
+            i = 1
+            while i < len(data):
+                pid = data[i]
+                name = commands_by_pid.get(pid)
+                if name is None:
+                    # Unknown PID, the rest of the payload can't be aligned
+                    break
+                
+                spec = self.pid_specs[name]
+                end = i + 1 + spec.size
+                if end > len(data):
+                    break
+                
+                values[name] = spec.decode(data, i + 1)
+                i = end
+        
+        return values
     
     def _check_dtc_codes(self):
-        """Check for Diagnostic Trouble Codes"""
+        """Check for Diagnostic Trouble Codes (runs on the broker thread)"""
         if not self.connection or not self.connected:
             return
             
         try:
+            values = {}
+            
             # Check engine status
             status_response = self.connection.query(self.commands["status"])
             if not status_response.is_null():
-                self.vehicle_data["is_check_engine_on"] = status_response.value.MIL
+                values["is_check_engine_on"] = status_response.value.MIL
             
             # Get DTCs if check engine light is on
-            if self.vehicle_data["is_check_engine_on"]:
+            if values.get("is_check_engine_on", self.get_metric("is_check_engine_on")):
                 dtc_response = self.connection.query(self.commands["dtc"])
                 if not dtc_response.is_null():
-                    with self.data_lock:
-                        self.vehicle_data["dtc_codes"] = dtc_response.value
+                    values["dtc_codes"] = list(dtc_response.value)
                     
                     # Log DTCs
                     if dtc_response.value:
                         logger.warning(f"DTCs detected: {dtc_response.value}")
             else:
-                with self.data_lock:
-                    self.vehicle_data["dtc_codes"] = []
+                values["dtc_codes"] = []
+            
+            self._store_values(values)
                 
         except Exception as e:
             logger.error(f"Error checking DTCs: {e}")
     
+    def get_snapshot(self):
+        """Get the latest published vehicle data snapshot"""
+        return self._snapshot
+    
+    def add_snapshot_listener(self, listener):
+        """Call listener(snapshot) whenever a new snapshot is published, keep it quick"""
+        self.snapshot_listeners = self.snapshot_listeners + [listener]
+    
+    def remove_snapshot_listener(self, listener):
+        """Stop calling a snapshot listener"""
+        self.snapshot_listeners = [l for l in self.snapshot_listeners if l is not listener]
+    
     def get_vehicle_data(self):
-        """Get all vehicle data"""
-        with self.data_lock:
-            return self.vehicle_data.copy()
+        """Get all vehicle data (read-only mapping, don't modify)"""
+        return self._snapshot.data
     
     def get_vehicle_data_with_units(self):
         """Get vehicle data converted to user's preferred units"""
-        data = self.get_vehicle_data()
+        data = self._snapshot.to_dict()
         unit_system = self.config.get("display", "unit_system")
         
         if unit_system == "imperial":
@@ -318,8 +708,7 @@ class OBDManager:
     
     def get_metric(self, metric_name):
         """Get a specific vehicle metric"""
-        with self.data_lock:
-            return self.vehicle_data.get(metric_name)
+        return self._snapshot.data.get(metric_name)
     
     def get_speed_with_unit(self):
         """Get speed in user's preferred unit with unit label"""
@@ -366,21 +755,95 @@ class OBDManager:
             return False
             
         try:
-            self.connection.query(obd.commands.CLEAR_DTC)
-            logger.info("DTC codes cleared")
-            
-            # Recheck DTCs after clearing
-            self._check_dtc_codes()
-            return True
-            
+            return self.broker.call(self._clear_dtc_codes, PRIORITY_ON_DEMAND, "clear dtc",
+                                    timeout=self.on_demand_timeout)
         except Exception as e:
             logger.error(f"Error clearing DTCs: {e}")
             return False
     
+    def _clear_dtc_codes(self):
+        """Clear DTC codes (runs on the broker thread)"""
+        self.connection.query(obd.commands.CLEAR_DTC)
+        logger.info("DTC codes cleared")
+        self.broker.clear_cache()
+        
+        # Recheck DTCs after clearing
+        self._check_dtc_codes()
+        return True
+    
+    def submit_query(self, name, max_age=None):
+        """Read a single PID on demand, returns a Future with the result
+        
+        name is either a metric name from self.commands (e.g. "rpm"), a
+        python-OBD command name (e.g. "FUEL_PRESSURE") or a PID catalog name
+        (e.g. "ODOMETER"). Results younger than max_age seconds (default
+        obd.query_cache_ttl) are served from cache.
+        """
+        cmd = self.commands.get(name)
+        if cmd is None and obd.commands.has_name(name.upper()):
+            cmd = obd.commands[name.upper()]
+        if cmd is None and self.catalog.find(name):
+            cmd = self.catalog.find(name).obd_command()
+        
+        if cmd is None or name in ["dtc", "status"]:
+            raise ValueError(f"Unknown PID: {name}")
+        
+        cached = self.broker.get_cached(name, max_age)
+        if cached is not None:
+            future = Future()
+            future.set_result({"name": name, "value": cached[0], "timestamp": cached[1], "cached": True})
+            return future
+        
+        return self.broker.submit(lambda: self._query_pid(name, cmd), PRIORITY_ON_DEMAND, f"query {name}")
+    
+    def query_pid(self, name, max_age=None):
+        """Read a single PID on demand and wait for the result"""
+        return self.submit_query(name, max_age).result(timeout=self.on_demand_timeout)
+    
+    def _query_pid(self, name, cmd):
+        """Query one PID (runs on the broker thread)"""
+        if not self.connection or not self.connected:
+            raise ConnectionError("OBD not connected")
+        
+        spec = self.pid_specs.get(name) or self.catalog.find(name)
+        if spec is None and cmd.mode == 1 and cmd.pid is not None:
+            spec = self.catalog.get(cmd.mode, cmd.pid)
+        
+        if spec is not None:
+            # Catalog PIDs decode from raw bytes, python-OBD handles the rest (bitfields, strings)
+            # PIDs python-OBD doesn't know can't pass its supported check, send them anyway
+            force = spec.mode != 0x01 or not obd.commands.has_name(spec.name)
+            response = self.connection.query(self.raw_commands.get(name) or spec.obd_command(), force=force)
+            value = None if response.is_null() else spec.decode_messages(response.messages)
+        else:
+            response = self.connection.query(cmd)
+            value = None if response.is_null() else response.value
+            value = value.magnitude if hasattr(value, "magnitude") else value
+        now = time.time()
+        
+        if value is None:
+            return {"name": name, "value": None, "timestamp": now, "cached": False}
+        
+        self.broker.cache_result(name, value, now)
+        
+        return {"name": name, "value": value, "timestamp": now, "cached": False}
+    
     def is_connected(self):
         """Check if connected to vehicle"""
         return self.connected
     
+    def get_history(self, metric_name, seconds):
+        """Get (timestamps, values) arrays for the last `seconds` seconds of a metric"""
+        return self.history.window(metric_name, seconds, time.time())
+    
+    def get_polling_stats(self):
+        """Get target and achieved polling rate for each PID"""
+        return self.scheduler.get_stats()
+    
+    def get_broker_stats(self):
+        """Get OBD request queue stats"""
+        return self.broker.get_stats()
+    
     def has_turbo(self):
         """Check if vehicle has turbo/supercharger"""
         return self.get_metric("has_turbo")
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Revvy AI Companion - PID Catalog
+Declarative table of OBD PIDs whose formulas are compiled into plain Python
+decoders, turning raw response bytes into floats in canonical units without
+going through python-OBD's pint Quantities. It covers the single-value numeric
+Mode 01 PIDs, not all of Mode 01: every PID without an entry is queried and
+decoded by python-OBD as before.
+
+    python -m backend.obd.pids          # decode cost per sample vs python-OBD
+"""
+
+import re
+import time
+import logging
+from obd import OBDCommand, ECU
+from obd.decoders import raw_string
+
+logger = logging.getLogger("PIDCatalog")
+
+# Standard Mode 01 PIDs with a single numeric value: pid -> (name, data bytes, formula, unit)
+# Formulas use A, B, C, D for the data bytes as in SAE J1979. This is every numeric
+# PID python-OBD decodes (0x00-0x5F) plus a few common later ones. Bitfield and enum
+# PIDs (status, monitors, fuel system, O2 sensor maps, fuel type) and the multi-value
+# PIDs from 0x64 on (sensor pairs, torque points, NOx, DPF) fall back to python-OBD.
+MODE01 = {
+    0x04: ("ENGINE_LOAD", 1, "A * 100 / 255", "%"),
+    0x05: ("COOLANT_TEMP", 1, "A - 40", "degC"),
+    0x06: ("SHORT_FUEL_TRIM_1", 1, "(A - 128) * 100 / 128", "%"),
+    0x07: ("LONG_FUEL_TRIM_1", 1, "(A - 128) * 100 / 128", "%"),
+    0x08: ("SHORT_FUEL_TRIM_2", 1, "(A - 128) * 100 / 128", "%"),
+    0x09: ("LONG_FUEL_TRIM_2", 1, "(A - 128) * 100 / 128", "%"),
+    0x0A: ("FUEL_PRESSURE", 1, "A * 3", "kPa"),
+    0x0B: ("INTAKE_PRESSURE", 1, "A", "kPa"),
+    0x0C: ("RPM", 2, "(256 * A + B) / 4", "rpm"),
+    0x0D: ("SPEED", 1, "A", "km/h"),
+    0x0E: ("TIMING_ADVANCE", 1, "A / 2 - 64", "deg"),
+    0x0F: ("INTAKE_TEMP", 1, "A - 40", "degC"),
+    0x10: ("MAF", 2, "(256 * A + B) / 100", "g/s"),
+    0x11: ("THROTTLE_POS", 1, "A * 100 / 255", "%"),
+    0x14: ("O2_B1S1", 2, "A / 200", "V"),
+    0x15: ("O2_B1S2", 2, "A / 200", "V"),
+    0x16: ("O2_B1S3", 2, "A / 200", "V"),
+    0x17: ("O2_B1S4", 2, "A / 200", "V"),
+    0x18: ("O2_B2S1", 2, "A / 200", "V"),
+    0x19: ("O2_B2S2", 2, "A / 200", "V"),
+    0x1A: ("O2_B2S3", 2, "A / 200", "V"),
+    0x1B: ("O2_B2S4", 2, "A / 200", "V"),
+    0x1F: ("RUN_TIME", 2, "256 * A + B", "s"),
+    0x21: ("DISTANCE_W_MIL", 2, "256 * A + B", "km"),
+    0x22: ("FUEL_RAIL_PRESSURE_VAC", 2, "(256 * A + B) * 0.079", "kPa"),
+    0x23: ("FUEL_RAIL_PRESSURE_DIRECT", 2, "(256 * A + B) * 10", "kPa"),
+    0x24: ("O2_S1_WR_VOLTAGE", 4, "(256 * C + D) * 8 / 65536", "V"),
+    0x25: ("O2_S2_WR_VOLTAGE", 4, "(256 * C + D) * 8 / 65536", "V"),
+    0x26: ("O2_S3_WR_VOLTAGE", 4, "(256 * C + D) * 8 / 65536", "V"),
+    0x27: ("O2_S4_WR_VOLTAGE", 4, "(256 * C + D) * 8 / 65536", "V"),
+    0x28: ("O2_S5_WR_VOLTAGE", 4, "(256 * C + D) * 8 / 65536", "V"),
+    0x29: ("O2_S6_WR_VOLTAGE", 4, "(256 * C + D) * 8 / 65536", "V"),
+    0x2A: ("O2_S7_WR_VOLTAGE", 4, "(256 * C + D) * 8 / 65536", "V"),
+    0x2B: ("O2_S8_WR_VOLTAGE", 4, "(256 * C + D) * 8 / 65536", "V"),
+    0x2C: ("COMMANDED_EGR", 1, "A * 100 / 255", "%"),
+    0x2D: ("EGR_ERROR", 1, "(A - 128) * 100 / 128", "%"),
+    0x2E: ("EVAPORATIVE_PURGE", 1, "A * 100 / 255", "%"),
+    0x2F: ("FUEL_LEVEL", 1, "A * 100 / 255", "%"),
+    0x30: ("WARMUPS_SINCE_DTC_CLEAR", 1, "A", "count"),
+    0x31: ("DISTANCE_SINCE_DTC_CLEAR", 2, "256 * A + B", "km"),
+    # Signed 16 bit as in J1979, python-OBD sign-extends A and B separately
+    0x32: ("EVAP_VAPOR_PRESSURE", 2, "s16(256 * A + B) / 4", "Pa"),
+    0x33: ("BAROMETRIC_PRESSURE", 1, "A", "kPa"),
+    0x34: ("O2_S1_WR_CURRENT", 4, "(256 * C + D) / 256 - 128", "mA"),
+    0x35: ("O2_S2_WR_CURRENT", 4, "(256 * C + D) / 256 - 128", "mA"),
+    0x36: ("O2_S3_WR_CURRENT", 4, "(256 * C + D) / 256 - 128", "mA"),
+    0x37: ("O2_S4_WR_CURRENT", 4, "(256 * C + D) / 256 - 128", "mA"),
+    0x38: ("O2_S5_WR_CURRENT", 4, "(256 * C + D) / 256 - 128", "mA"),
+    0x39: ("O2_S6_WR_CURRENT", 4, "(256 * C + D) / 256 - 128", "mA"),
+    0x3A: ("O2_S7_WR_CURRENT", 4, "(256 * C + D) / 256 - 128", "mA"),
+    0x3B: ("O2_S8_WR_CURRENT", 4, "(256 * C + D) / 256 - 128", "mA"),
+    0x3C: ("CATALYST_TEMP_B1S1", 2, "(256 * A + B) / 10 - 40", "degC"),
+    0x3D: ("CATALYST_TEMP_B2S1", 2, "(256 * A + B) / 10 - 40", "degC"),
+    0x3E: ("CATALYST_TEMP_B1S2", 2, "(256 * A + B) / 10 - 40", "degC"),
+    0x3F: ("CATALYST_TEMP_B2S2", 2, "(256 * A + B) / 10 - 40", "degC"),
+    0x42: ("CONTROL_MODULE_VOLTAGE", 2, "(256 * A + B) / 1000", "V"),
+    0x43: ("ABSOLUTE_LOAD", 2, "(256 * A + B) * 100 / 255", "%"),
+    0x44: ("COMMANDED_EQUIV_RATIO", 2, "(256 * A + B) * 2 / 65536", "ratio"),
+    0x45: ("RELATIVE_THROTTLE_POS", 1, "A * 100 / 255", "%"),
+    0x46: ("AMBIANT_AIR_TEMP", 1, "A - 40", "degC"),
+    0x47: ("THROTTLE_POS_B", 1, "A * 100 / 255", "%"),
+    0x48: ("THROTTLE_POS_C", 1, "A * 100 / 255", "%"),
+    0x49: ("ACCELERATOR_POS_D", 1, "A * 100 / 255", "%"),
+    0x4A: ("ACCELERATOR_POS_E", 1, "A * 100 / 255", "%"),
+    0x4B: ("ACCELERATOR_POS_F", 1, "A * 100 / 255", "%"),
+    0x4C: ("THROTTLE_ACTUATOR", 1, "A * 100 / 255", "%"),
+    0x4D: ("RUN_TIME_MIL", 2, "256 * A + B", "min"),
+    0x4E: ("TIME_SINCE_DTC_CLEARED", 2, "256 * A + B", "min"),
+    0x50: ("MAX_MAF", 4, "A * 10", "g/s"),
+    0x52: ("ETHANOL_PERCENT", 1, "A * 100 / 255", "%"),
+    0x53: ("EVAP_VAPOR_PRESSURE_ABS", 2, "(256 * A + B) / 200", "kPa"),
+    0x54: ("EVAP_VAPOR_PRESSURE_ALT", 2, "256 * A + B - 32767", "Pa"),
+    0x55: ("SHORT_O2_TRIM_B1", 2, "(A - 128) * 100 / 128", "%"),
+    0x56: ("LONG_O2_TRIM_B1", 2, "(A - 128) * 100 / 128", "%"),
+    0x57: ("SHORT_O2_TRIM_B2", 2, "(A - 128) * 100 / 128", "%"),
+    0x58: ("LONG_O2_TRIM_B2", 2, "(A - 128) * 100 / 128", "%"),
+    0x59: ("FUEL_RAIL_PRESSURE_ABS", 2, "(256 * A + B) * 10", "kPa"),
+    0x5A: ("RELATIVE_ACCEL_POS", 1, "A * 100 / 255", "%"),
+    0x5B: ("HYBRID_BATTERY_REMAINING", 1, "A * 100 / 255", "%"),
+    0x5C: ("OIL_TEMP", 1, "A - 40", "degC"),
+    0x5D: ("FUEL_INJECT_TIMING", 2, "(256 * A + B - 26880) / 128", "deg"),
+    0x5E: ("FUEL_RATE", 2, "(256 * A + B) / 20", "L/h"),
+    0x61: ("DRIVER_DEMAND_TORQUE", 1, "A - 125", "%"),
+    0x62: ("ACTUAL_ENGINE_TORQUE", 1, "A - 125", "%"),
+    0x63: ("REFERENCE_TORQUE", 2, "256 * A + B", "Nm"),
+    0x8E: ("ENGINE_FRICTION_TORQUE", 1, "A - 125", "%"),
+    0xA6: ("ODOMETER", 4, "(16777216 * A + 65536 * B + 256 * C + D) / 10", "km"),
+}
+
+_DATA_BYTE = re.compile(r"\b([A-D])\b")
+
+
+def _s16(value):
+    """Interpret a 16-bit value as signed"""
+    return value - 0x10000 if value & 0x8000 else value
+
+
+def compile_decoder(formula, size):
+    """Compile a formula into decode(data, offset) -> float"""
+    letters = "ABCD"[:size]
+    
+    def byte_ref(match):
+        letter = match.group(1)
+        if letter not in letters:
+            raise ValueError(f"Formula '{formula}' uses {letter} but the PID only has {size} bytes")
+        return f"data[offset + {letters.index(letter)}]"
+    
+    source = f"lambda data, offset: float({_DATA_BYTE.sub(byte_ref, formula)})"
+    return eval(compile(source, f"<pid: {formula}>", "eval"), {"__builtins__": {}, "float": float, "s16": _s16})
+
+
+class PIDSpec:
+    """One PID: how to request it and how to decode its data bytes"""
+    
+    __slots__ = ("mode", "pid", "name", "size", "formula", "unit", "header", "request", "decode")
+    
+    def __init__(self, mode, pid, name, size, formula, unit, header=None):
+        self.mode = mode
+        self.pid = pid
+        self.name = name
+        self.size = size
+        self.formula = formula
+        self.unit = unit
+        self.header = header
+        
+        # Mode 01 PIDs are one byte, Mode 22 (manufacturer) identifiers two
+        pid_width = 2 if mode == 0x01 else 4
+        self.request = b"%02X%0*X" % (mode, pid_width, pid)
+        self.decode = compile_decoder(formula, size)
+    
+    @property
+    def pid_bytes(self):
+        """Length of the PID in the response"""
+        return 1 if self.mode == 0x01 else 2
+    
+    def obd_command(self):
+        """python-OBD command that returns the raw response instead of a pint Quantity"""
+        kwargs = {"header": self.header.encode()} if self.header else {}
+        return OBDCommand(
+            self.name, f"{self.name} (raw)", self.request,
+            1 + self.pid_bytes + self.size, raw_string, ECU.ENGINE, True, **kwargs
+        )
+    
+    def decode_messages(self, messages):
+        """Decode the first positive response in python-OBD messages, None if there isn't one"""
+        start = 1 + self.pid_bytes
+        for message in messages:
+            data = message.data
+            if len(data) >= start + self.size and data[0] == self.mode + 0x40 \
+                    and int.from_bytes(data[1:start], "big") == self.pid:
+                return self.decode(data, start)
+        
+        return None
+
+
+class PIDCatalog:
+    """Numeric Mode 01 PIDs plus registered extended (e.g. Mode 22) PIDs"""
+    
+    def __init__(self, extended=None):
+        self.specs = {}
+        self.by_name = {}
+        
+        for pid, (name, size, formula, unit) in MODE01.items():
+            self.register(0x01, pid, name, size, formula, unit)
+        
+        for entry in extended or []:
+            try:
+                self.register(
+                    int(str(entry.get("mode", "22")), 16),
+                    int(str(entry["pid"]), 16),
+                    entry["name"],
+                    entry["bytes"],
+                    entry["formula"],
+                    entry.get("unit", ""),
+                    entry.get("header")
+                )
+            except Exception as e:
+                logger.error(f"Invalid extended PID {entry}: {e}")
+    
+    def register(self, mode, pid, name, size, formula, unit="", header=None):
+        """Add a PID (extended PIDs are vehicle specific, e.g. from config)"""
+        spec = PIDSpec(mode, pid, name, size, formula, unit, header)
+        self.specs[(mode, pid)] = spec
+        self.by_name[name.upper()] = spec
+        return spec
+    
+    def get(self, mode, pid):
+        """Get a PID by mode and number, or None"""
+        return self.specs.get((mode, pid))
+    
+    def find(self, name):
+        """Get a PID by name, or None"""
+        return self.by_name.get(name.upper())
+    
+    def extended(self):
+        """Get the registered non-Mode 01 PIDs"""
+        return [spec for spec in self.specs.values() if spec.mode != 0x01]
+
+
+def run_benchmark(iterations=20000):
+    """Compare decoding a sample with python-OBD (pint) and with the catalog"""
+    import obd
+    from obd.protocols.protocol import Message
+    
+    catalog = PIDCatalog()
+    samples = {
+        "RPM": [0x1A, 0xF8], "SPEED": [0x32], "COOLANT_TEMP": [0x7B], "INTAKE_TEMP": [0x46],
+        "THROTTLE_POS": [0x40], "ENGINE_LOAD": [0x80], "FUEL_LEVEL": [0xC0],
+        "CONTROL_MODULE_VOLTAGE": [0x37, 0x14], "INTAKE_PRESSURE": [0x96], "OIL_TEMP": [0x82],
+    }
+    
+    results = {}
+    for name, payload in samples.items():
+        cmd = obd.commands[name]
+        spec = catalog.find(name)
+        message = Message([])
+        message.ecu = ECU.ENGINE
+        message.data = bytearray([0x41, cmd.pid] + payload)
+        
+        started = time.perf_counter()
+        for _ in range(iterations):
+            pint_value = cmd([message]).value.magnitude
+        pint_us = (time.perf_counter() - started) / iterations * 1e6
+        
+        started = time.perf_counter()
+        for _ in range(iterations):
+            value = spec.decode_messages([message])
+        catalog_us = (time.perf_counter() - started) / iterations * 1e6
+        
+        if abs(float(pint_value) - value) > 1e-6:
+            logger.warning(f"{name}: python-OBD {pint_value} != catalog {value}")
+        
+        results[name] = (pint_us, catalog_us)
+    
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    results = run_benchmark()
+    print(f"{'PID':<24}{'python-OBD':>14}{'catalog':>12}{'speedup':>10}")
+    for name, (pint_us, catalog_us) in results.items():
+        print(f"{name:<24}{pint_us:>11.2f} us{catalog_us:>9.2f} us{pint_us / catalog_us:>9.1f}x")
+    
+    total_pint = sum(r[0] for r in results.values())
+    total_catalog = sum(r[1] for r in results.values())
+    print(f"{'10 PIDs per poll':<24}{total_pint:>11.2f} us{total_catalog:>9.2f} us{total_pint / total_catalog:>9.1f}x")
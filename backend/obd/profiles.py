@@ -0,0 +1,91 @@
+"""
+Revvy AI Companion - Vehicle Profile Cache
+Remembers what was learned about each vehicle (protocol, baud rate, supported PIDs)
+so reconnects can skip protocol detection and command discovery.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger("VehicleProfiles")
+
+
+def supported_pid_bitmap(supported_commands):
+    """Build a Mode 01 supported-PID bitmap (as hex) from python-OBD commands"""
+    bitmap = 0
+    for cmd in supported_commands:
+        if cmd.mode == 1 and cmd.pid is not None:
+            bitmap |= 1 << cmd.pid
+    
+    return format(bitmap, "x")
+
+
+def ecu_fingerprint(protocol_id, bitmap):
+    """Identify a vehicle by its protocol and supported PIDs when the VIN isn't available"""
+    return f"ecu-{protocol_id}-{bitmap}"
+
+
+class VehicleProfileCache:
+    """Persists per-vehicle connection profiles keyed by VIN or ECU fingerprint"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"profiles": {}, "last_by_port": {}}
+        self.load()
+    
+    def load(self):
+        """Load profiles from disk"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                self.data["profiles"] = data.get("profiles", {})
+                self.data["last_by_port"] = data.get("last_by_port", {})
+                logger.info(f"Loaded {len(self.data['profiles'])} vehicle profiles")
+        except Exception as e:
+            logger.error(f"Error loading vehicle profiles: {e}")
+    
+    def save(self):
+        """Write profiles to disk (atomically, so a power cut can't corrupt the file)"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            with self.lock:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.data, f, indent=2)
+                os.replace(tmp_path, self.path)
+        
+        except Exception as e:
+            logger.error(f"Error saving vehicle profiles: {e}")
+    
+    def get(self, key):
+        """Get the profile for a VIN or fingerprint"""
+        with self.lock:
+            profile = self.data["profiles"].get(key)
+            return dict(profile) if profile else None
+    
+    def get_last(self, port):
+        """Get the profile of the vehicle last connected through this adapter port"""
+        with self.lock:
+            key = self.data["last_by_port"].get(port)
+        
+        return self.get(key) if key else None
+    
+    def put(self, port, key, profile):
+        """Store a profile and remember it as the last one seen on this port"""
+        profile = dict(profile)
+        profile["key"] = key
+        profile["updated"] = time.time()
+        
+        with self.lock:
+            self.data["profiles"][key] = profile
+            self.data["last_by_port"][port] = key
+        
+        self.save()
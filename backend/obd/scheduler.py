@@ -0,0 +1,172 @@
+"""
+Revvy AI Companion - OBD Poll Scheduler
+Decides which PIDs to poll next based on per-PID target rates and priorities.
+"""
+
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger("PollScheduler")
+
+# How early a PID may be pulled into a partly filled batch (seconds)
+TOP_UP_WINDOW = 0.25
+
+# Minimum window over which achieved rates are measured (seconds)
+RATE_WINDOW = 10.0
+
+# Target polling rates in Hz for each metric
+DEFAULT_POLL_RATES = {
+    "rpm": 10.0,
+    "speed": 10.0,
+    "throttle_pos": 10.0,
+    "engine_load": 5.0,
+    "boost_pressure": 5.0,
+    "intake_temp": 1.0,
+    "coolant_temp": 0.5,
+    "battery_voltage": 0.5,
+    "oil_temp": 0.2,
+    "fuel_level": 0.05
+}
+
+# Lower number = more important when several PIDs are due at once
+DEFAULT_PRIORITIES = {
+    "rpm": 0,
+    "speed": 0,
+    "throttle_pos": 0,
+    "engine_load": 1,
+    "boost_pressure": 1,
+    "intake_temp": 2,
+    "coolant_temp": 2,
+    "battery_voltage": 2,
+    "oil_temp": 3,
+    "fuel_level": 3
+}
+
+
+class PollEntry:
+    """Scheduling state for a single PID"""
+    
+    def __init__(self, name, rate, priority, now):
+        self.name = name
+        self.rate = rate
+        self.interval = 1.0 / rate
+        self.priority = priority
+        self.next_due = now
+        self.started = now
+        self.window = max(RATE_WINDOW, 4 * self.interval)
+        self.samples = deque()
+        self.failures = 0
+    
+    def add_sample(self, now):
+        """Record a successful poll"""
+        self.samples.append(now)
+        while self.samples and self.samples[0] < now - self.window:
+            self.samples.popleft()
+    
+    def achieved_rate(self, now):
+        """Rate at which samples were actually collected over the last window"""
+        while self.samples and self.samples[0] < now - self.window:
+            self.samples.popleft()
+        
+        # Don't extrapolate from less than one interval right after start
+        span = max(min(self.window, now - self.started), self.interval)
+        
+        return len(self.samples) / span
+
+
+class PollScheduler:
+    """Shares OBD bus time between PIDs by deadline and priority"""
+    
+    def __init__(self, rates=None, priorities=None, default_rate=1.0):
+        self.rates = dict(DEFAULT_POLL_RATES)
+        if rates:
+            self.rates.update(rates)
+        
+        self.priorities = dict(DEFAULT_PRIORITIES)
+        if priorities:
+            self.priorities.update(priorities)
+        
+        self.default_rate = default_rate
+        self.entries = {}
+    
+    def set_commands(self, names):
+        """Reset the schedule for the given set of PIDs"""
+        self.entries = {}
+        now = time.time()
+        
+        for name in names:
+            rate = self.rates.get(name, self.default_rate)
+            if not rate or rate <= 0:
+                logger.debug(f"Polling disabled for {name}")
+                continue
+            
+            priority = self.priorities.get(name, max(self.priorities.values(), default=0) + 1)
+            self.entries[name] = PollEntry(name, rate, priority, now)
+        
+        logger.info(f"Scheduling {len(self.entries)} PIDs: " +
+                    ", ".join(f"{e.name}@{e.rate:g}Hz" for e in self.entries.values()))
+    
+    def next_batch(self, now=None, max_size=6):
+        """Get the PIDs to poll next, most urgent first"""
+        if now is None:
+            now = time.time()
+        
+        due = [e for e in self.entries.values() if e.next_due <= now]
+        due.sort(key=lambda e: (e.priority, e.next_due))
+        batch = due[:max_size]
+        
+        # Top up a partly filled batch with PIDs that are due soon, since an extra
+        # PID in a request costs far less than a request of its own
+        if len(batch) < max_size:
+            upcoming = [e for e in self.entries.values()
+                        if e.next_due > now and e.next_due - now <= min(e.interval * 0.5, TOP_UP_WINDOW)]
+            upcoming.sort(key=lambda e: e.next_due)
+            batch.extend(upcoming[:max_size - len(batch)])
+        
+        return [e.name for e in batch]
+    
+    def complete(self, names, received, now=None):
+        """Record the outcome of a poll and schedule the next deadlines"""
+        if now is None:
+            now = time.time()
+        
+        for name in names:
+            entry = self.entries.get(name)
+            if entry is None:
+                continue
+            
+            if name in received:
+                entry.add_sample(now)
+                entry.failures = 0
+            else:
+                entry.failures += 1
+            
+            # Keep the cadence when on time, but don't try to catch up a backlog
+            entry.next_due = max(entry.next_due + entry.interval, now)
+    
+    def time_until_next(self, now=None):
+        """Seconds until the next PID is due"""
+        if not self.entries:
+            return 1.0 / self.default_rate
+        
+        if now is None:
+            now = time.time()
+        
+        next_due = min(e.next_due for e in self.entries.values())
+        return max(0.0, next_due - now)
+    
+    def get_stats(self, now=None):
+        """Get target and achieved polling rates for each PID"""
+        if now is None:
+            now = time.time()
+        
+        return {
+            name: {
+                "target_hz": entry.rate,
+                "achieved_hz": round(entry.achieved_rate(now), 2),
+                "priority": entry.priority,
+                "failures": entry.failures
+            }
+            for name, entry in self.entries.items()
+        }
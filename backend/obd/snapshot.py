@@ -0,0 +1,48 @@
+"""
+Revvy AI Companion - Vehicle Data Snapshots
+Immutable, versioned views of vehicle data that can be shared between threads without locking.
+"""
+
+import time
+from types import MappingProxyType
+
+
+class VehicleSnapshot:
+    """Read-only vehicle data published by the OBD thread after each poll"""
+    
+    __slots__ = ("seq", "timestamp", "data", "field_timestamps")
+    
+    def __init__(self, seq, data, field_timestamps, timestamp=None):
+        # The publisher hands over freshly built dicts, so wrapping them is enough
+        object.__setattr__(self, "seq", seq)
+        object.__setattr__(self, "timestamp", timestamp if timestamp is not None else time.time())
+        object.__setattr__(self, "data", MappingProxyType(data))
+        object.__setattr__(self, "field_timestamps", MappingProxyType(field_timestamps))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("VehicleSnapshot is immutable")
+    
+    def __getitem__(self, name):
+        return self.data[name]
+    
+    def __contains__(self, name):
+        return name in self.data
+    
+    def get(self, name, default=None):
+        """Get a single field"""
+        return self.data.get(name, default)
+    
+    def age(self, name, now=None):
+        """Seconds since a field was last updated, or None if it never was"""
+        updated = self.field_timestamps.get(name)
+        if updated is None:
+            return None
+        
+        return (now if now is not None else time.time()) - updated
+    
+    def to_dict(self):
+        """Get a mutable copy of the data (e.g. for serialization)"""
+        return dict(self.data)
+    
+    def __repr__(self):
+        return f"VehicleSnapshot(seq={self.seq}, fields={len(self.data)})"
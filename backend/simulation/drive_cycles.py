@@ -0,0 +1,135 @@
+"""
+Revvy AI Companion - Drive Cycles
+Target speed traces for the simulator: standard test cycles and synthetic driving styles.
+
+The built-in FTP-75 and WLTP traces are micro-trip approximations that match
+each phase's duration, top speed and stop pattern, not the official
+second-by-second tables. Load the official tables with DriveCycle.from_csv
+when exact figures matter.
+"""
+
+import random
+import numpy as np
+
+# Driver behaviour per style: controller gains, shift points and how hard the pedals are used
+DRIVER_STYLES = {
+    "calm": {"kp": 0.25, "ki": 0.03, "brake_gain": 0.15, "max_throttle": 0.55, "shift_up_rpm": 2300, "shift_down_rpm": 1200},
+    "normal": {"kp": 0.4, "ki": 0.05, "brake_gain": 0.25, "max_throttle": 0.8, "shift_up_rpm": 2800, "shift_down_rpm": 1300},
+    "aggressive": {"kp": 0.9, "ki": 0.08, "brake_gain": 0.5, "max_throttle": 1.0, "shift_up_rpm": 5800, "shift_down_rpm": 2500},
+}
+
+
+def _micro_trips(trips, start=0.0):
+    """Build (time, km/h) waypoints from (idle s, accel s, peak km/h, cruise s, decel s) trips"""
+    points = [(start, 0.0)]
+    t = start
+    
+    for idle, accel, peak, cruise, decel in trips:
+        t += idle
+        points.append((t, 0.0))
+        t += accel
+        points.append((t, peak))
+        if cruise:
+            t += cruise
+            points.append((t, peak))
+        t += decel
+        points.append((t, 0.0))
+    
+    return points
+
+
+# FTP-75: cold transient (505 s), stabilized (864 s), hot transient (505 s, same as the first)
+_FTP75_TRANSIENT = [
+    (20, 15, 32, 10, 10), (10, 30, 91, 90, 35), (15, 12, 40, 20, 13), (12, 12, 35, 25, 10),
+    (10, 15, 50, 25, 15), (10, 12, 45, 20, 14), (25, 10, 30, 0, 10),
+]
+_FTP75_STABILIZED = [
+    (15, 12, 40, 20, 12), (10, 15, 48, 40, 14), (15, 10, 35, 15, 10), (12, 12, 40, 30, 12),
+    (10, 15, 55, 35, 15), (12, 10, 30, 20, 10), (10, 12, 42, 30, 12), (12, 10, 35, 20, 10),
+    (10, 12, 45, 30, 12), (12, 10, 32, 20, 10), (10, 12, 40, 20, 12), (15, 12, 40, 100, 12),
+    (32, 8, 25, 10, 8),
+]
+
+# WLTP class 3b: low (589 s), medium (433 s), high (455 s) and extra high (323 s) phases
+_WLTP_LOW = [(12, 15, 45, 40, 15), (20, 12, 35, 30, 12), (25, 18, 56, 70, 18), (20, 12, 40, 40, 12), (30, 15, 50, 50, 15),
+             (25, 12, 30, 55, 16)]
+_WLTP_MEDIUM = [(10, 20, 70, 90, 20), (15, 18, 60, 60, 18), (12, 22, 77, 80, 22), (20, 8, 30, 10, 8)]
+_WLTP_HIGH = [(10, 30, 97, 140, 30), (8, 25, 85, 100, 25), (15, 20, 70, 35, 17)]
+_WLTP_EXTRA_HIGH = [(15, 15, 100, 10, 18), (5, 45, 131, 170, 45)]
+
+
+class DriveCycle:
+    """Target speed over time, interpolated between waypoints"""
+    
+    def __init__(self, name, points, style="normal"):
+        self.name = name
+        self.style = style
+        self.times = np.array([t for t, _ in points], dtype=np.float64)
+        self.speeds = np.array([v for _, v in points], dtype=np.float64)
+    
+    @property
+    def duration(self):
+        return float(self.times[-1])
+    
+    @classmethod
+    def from_csv(cls, path, style="normal"):
+        """Load a cycle from a CSV of time (s), speed (km/h) rows, e.g. an official table"""
+        data = np.genfromtxt(path, delimiter=",", skip_header=1)
+        name = path.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        return cls(name, list(zip(data[:, 0], data[:, 1])), style)
+    
+    def speed_at(self, t):
+        """Target speed in km/h at t seconds into the cycle"""
+        return float(np.interp(t, self.times, self.speeds))
+
+
+def ftp75():
+    """FTP-75 (US urban) approximation, 1874 s"""
+    points = _micro_trips(_FTP75_TRANSIENT)
+    points = points + _micro_trips(_FTP75_STABILIZED, start=points[-1][0])[1:]
+    points = points + _micro_trips(_FTP75_TRANSIENT, start=points[-1][0])[1:]
+    return DriveCycle("ftp75", points)
+
+
+def wltp():
+    """WLTP class 3b approximation, 1800 s"""
+    points = [(0.0, 0.0)]
+    for phase in (_WLTP_LOW, _WLTP_MEDIUM, _WLTP_HIGH, _WLTP_EXTRA_HIGH):
+        points = points + _micro_trips(phase, start=points[-1][0])[1:]
+    return DriveCycle("wltp", points)
+
+
+def synthetic(style, duration=1800.0, seed=None):
+    """Random stop-and-go driving in a calm or aggressive style"""
+    rng = random.Random(seed)
+    aggressive = style == "aggressive"
+    trips = []
+    t = 0.0
+    
+    while t < duration:
+        peak = rng.uniform(50, 140) if aggressive else rng.uniform(30, 90)
+        accel = peak / 3.6 / (rng.uniform(2.5, 4.0) if aggressive else rng.uniform(0.6, 1.0))
+        decel = peak / 3.6 / (rng.uniform(4.0, 7.0) if aggressive else rng.uniform(0.8, 1.5))
+        cruise = rng.uniform(5, 40) if aggressive else rng.uniform(30, 180)
+        idle = rng.uniform(2, 10) if aggressive else rng.uniform(10, 40)
+        
+        trips.append((idle, accel, peak, cruise, decel))
+        t += idle + accel + cruise + decel
+    
+    return DriveCycle(style, _micro_trips(trips), style)
+
+
+def load_drive_cycle(name, seed=None):
+    """Get a built-in cycle by name (ftp75, wltp, calm, aggressive, idle) or load a CSV path"""
+    if name.endswith(".csv"):
+        return DriveCycle.from_csv(name)
+    if name == "ftp75":
+        return ftp75()
+    if name == "wltp":
+        return wltp()
+    if name in ("calm", "aggressive"):
+        return synthetic(name, seed=seed)
+    if name == "idle":
+        return DriveCycle("idle", [(0.0, 0.0), (60.0, 0.0)], "calm")
+    
+    raise ValueError(f"Unknown drive cycle: {name}")
@@ -0,0 +1,227 @@
+"""
+Revvy AI Companion - Drive Simulator
+Drives the vehicle model along a drive cycle and publishes matching OBD and GPS
+data, so the mock components produce realistic, repeatable load.
+"""
+
+import math
+import time
+import logging
+import weakref
+import threading
+from .vehicle import VehicleModel
+from .drive_cycles import DRIVER_STYLES, load_drive_cycle
+
+logger = logging.getLogger("DriveSimulator")
+
+MAX_RATE_HZ = 100.0
+METERS_PER_DEGREE = 111320.0
+
+# Config -> its simulator, dropped with the config (the simulator doesn't keep the config alive)
+_shared = weakref.WeakKeyDictionary()
+_shared_lock = threading.Lock()
+
+
+def get_shared_simulator(config):
+    """Get the simulator shared by the mock components built from a config"""
+    with _shared_lock:
+        simulator = _shared.get(config)
+        if simulator is None:
+            simulator = DriveSimulator(config)
+            _shared[config] = simulator
+        return simulator
+
+
+class Driver:
+    """Follows a target speed with a PI controller on throttle and brake"""
+    
+    def __init__(self, style="normal"):
+        self.style = dict(DRIVER_STYLES.get(style, DRIVER_STYLES["normal"]))
+        self.integral = 0.0
+    
+    def control(self, target_kmh, speed_kmh, dt):
+        """Get (throttle, brake) for the current speed error"""
+        s = self.style
+        error = (target_kmh - speed_kmh) / 3.6
+        
+        # Hold the car at standstill instead of creeping
+        if target_kmh < 0.5 and speed_kmh < 2:
+            self.integral = 0.0
+            return 0.0, 0.3
+        
+        if error < -0.5:
+            self.integral = 0.0
+            return 0.0, min(1.0, -error * s["brake_gain"])
+        
+        self.integral = min(max(self.integral + error * dt, -5.0), 10.0)
+        feed_forward = 0.08 + 0.004 * target_kmh
+        throttle = feed_forward + s["kp"] * error + s["ki"] * self.integral
+        return min(max(throttle, 0.0), s["max_throttle"]), 0.0
+
+
+class DriveSimulator:
+    """Runs the vehicle model in real time and feeds listeners at up to 100 Hz"""
+    
+    def __init__(self, config):
+        self.rate_hz = min(max(config.get("simulation", "rate_hz", 10.0), 1.0), MAX_RATE_HZ)
+        self.time_scale = config.get("simulation", "time_scale", 1.0)
+        self.loop = config.get("simulation", "loop", True)
+        self.seed = config.get("simulation", "seed", 42)
+        
+        self.cycle = load_drive_cycle(config.get("simulation", "drive_cycle", "wltp"), self.seed)
+        style = config.get("simulation", "driver_style") or self.cycle.style
+        self.driver = Driver(style)
+        self.vehicle = VehicleModel(config.get("simulation", "vehicle"))
+        
+        # Route: start at the configured location, curve gently with distance
+        self.start_lat = config.get("gps", "default_latitude", 37.7749)
+        self.start_lon = config.get("gps", "default_longitude", -122.4194)
+        self.reset()
+        
+        self.listeners = []
+        self.users = 0
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        
+        logger.info(f"Drive simulator: {self.cycle.name} cycle ({self.cycle.duration:.0f} s, {style} driver) at {self.rate_hz:g} Hz")
+    
+    def reset(self):
+        """Go back to the start of the cycle"""
+        self.sim_time = 0.0
+        self.latitude = self.start_lat
+        self.longitude = self.start_lon
+        self.altitude = 10.0
+        self.heading = 0.0
+    
+    def add_listener(self, listener):
+        """Call listener(obd_values, gps_values, timestamp) after every step"""
+        self.listeners = self.listeners + [listener]
+    
+    def remove_listener(self, listener):
+        """Stop calling a listener"""
+        self.listeners = [l for l in self.listeners if l is not listener]
+    
+    def start(self):
+        """Start stepping in real time (shared: runs until the last user stops)"""
+        with self.lock:
+            self.users += 1
+            if self.running:
+                return
+            
+            self.running = True
+            self.thread = threading.Thread(target=self._run_loop, name="DriveSimulator")
+            self.thread.daemon = True
+            self.thread.start()
+        
+        logger.info("Drive simulator started")
+    
+    def stop(self):
+        """Stop stepping once no component uses the simulator"""
+        with self.lock:
+            self.users = max(0, self.users - 1)
+            if self.users or not self.running:
+                return
+            self.running = False
+        
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        logger.info("Drive simulator stopped")
+    
+    def step(self, dt):
+        """Advance the simulation by dt seconds, returns (obd_values, gps_values)"""
+        if self.sim_time >= self.cycle.duration:
+            if not self.loop:
+                dt = 0.0
+            else:
+                self.sim_time = 0.0
+        
+        target = self.cycle.speed_at(self.sim_time)
+        throttle, brake = self.driver.control(target, self.vehicle.speed * 3.6, dt)
+        self.vehicle.step(
+            dt, throttle, brake,
+            self.driver.style["shift_up_rpm"], self.driver.style["shift_down_rpm"]
+        )
+        self.sim_time += dt
+        
+        self._move(dt)
+        return self.vehicle.obd_values(), self.gps_values()
+    
+    def _move(self, dt):
+        """Integrate position along the route"""
+        distance = self.vehicle.distance
+        speed = self.vehicle.speed
+        
+        # Turn rate varies smoothly with distance so the route has bends and straights
+        if speed > 0.5:
+            self.heading = (self.heading + 4.0 * math.sin(distance / 400.0) * speed / 15.0 * dt) % 360.0
+        
+        step = speed * dt
+        rad = math.radians(self.heading)
+        self.latitude += step * math.cos(rad) / METERS_PER_DEGREE
+        self.longitude += step * math.sin(rad) / (METERS_PER_DEGREE * math.cos(math.radians(self.latitude)))
+        self.altitude = 10.0 + 15.0 * math.sin(distance / 2000.0)
+    
+    def gps_values(self):
+        """Current position as GPSTracker data"""
+        return {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "altitude": round(self.altitude, 1),
+            "speed": round(self.vehicle.speed * 3.6, 1),
+            "heading": round(self.heading, 1)
+        }
+    
+    def run_for(self, seconds, rate_hz=None):
+        """Step through `seconds` of simulated time as fast as possible (for benchmarks)"""
+        dt = 1.0 / (rate_hz or self.rate_hz)
+        steps = int(seconds / dt)
+        now = time.time()
+        
+        for i in range(steps):
+            obd_values, gps_values = self.step(dt)
+            for listener in self.listeners:
+                listener(obd_values, gps_values, now + i * dt)
+        
+        return steps
+    
+    def _run_loop(self):
+        """Step at rate_hz against a deadline so the rate doesn't drift"""
+        interval = 1.0 / self.rate_hz
+        next_step = time.time()
+        
+        while self.running:
+            now = time.time()
+            if now < next_step:
+                time.sleep(next_step - now)
+                continue
+            
+            try:
+                obd_values, gps_values = self.step(interval * self.time_scale)
+                for listener in self.listeners:
+                    listener(obd_values, gps_values, now)
+            except Exception as e:
+                logger.error(f"Error in drive simulator: {e}")
+            
+            # Skip missed steps instead of bursting to catch up
+            next_step += interval
+            if next_step < now:
+                next_step = now + interval
+
+
+class SimulatedTrace:
+    """Drive simulator as an ELM327 emulator trace (values at emulator time t)"""
+    
+    def __init__(self, simulator, rate_hz=20.0):
+        self.simulator = simulator
+        self.dt = 1.0 / rate_hz
+        self.t = 0.0
+        self.values, _ = simulator.step(0.0)
+    
+    def sample(self, t):
+        """Step the simulation up to t and return its OBD values"""
+        while self.t + self.dt <= t:
+            self.values, _ = self.simulator.step(self.dt)
+            self.t += self.dt
+        
+        return self.values
@@ -0,0 +1,175 @@
+"""
+Revvy AI Companion - Vehicle Model
+Longitudinal model of a small turbocharged petrol car: gearbox, engine torque,
+turbo spool, coolant and oil warm-up, and fuel burn.
+"""
+
+import math
+
+AIR_DENSITY = 1.2        # kg/m^3
+GRAVITY = 9.81           # m/s^2
+ATMOSPHERIC_KPA = 101.3
+FUEL_DENSITY = 745.0     # g/L, petrol
+
+DEFAULT_VEHICLE = {
+    "mass_kg": 1450,
+    "wheel_radius_m": 0.31,
+    "drag_area_m2": 0.68,           # Cd * frontal area
+    "rolling_resistance": 0.012,
+    "gear_ratios": [3.58, 2.02, 1.35, 1.03, 0.84, 0.68],
+    "final_drive": 3.9,
+    "drivetrain_efficiency": 0.9,
+    "idle_rpm": 800,
+    "redline_rpm": 6500,
+    "peak_torque_nm": 180,          # Without boost
+    "turbo": True,
+    "max_boost_kpa": 90,            # Above atmospheric
+    "turbo_spool_rpm": 1800,        # The turbo barely builds boost below this
+    "turbo_time_constant_s": 0.8,
+    "max_brake_decel": 8.0,         # m/s^2 at full brake
+    "ambient_temp_c": 20.0,
+    "thermostat_temp_c": 90.0,
+    "tank_liters": 50.0,
+    "fuel_level_pct": 75.0,
+    "bsfc_g_per_kwh": 270,          # Brake specific fuel consumption
+    "idle_fuel_lph": 0.8,
+}
+
+
+class VehicleModel:
+    """Integrates vehicle state from throttle and brake inputs"""
+    
+    def __init__(self, params=None):
+        self.params = dict(DEFAULT_VEHICLE, **(params or {}))
+        p = self.params
+        
+        self.speed = 0.0           # m/s
+        self.distance = 0.0        # m
+        self.rpm = float(p["idle_rpm"])
+        self.gear = 0              # Index into gear_ratios
+        self.throttle = 0.0        # 0..1
+        self.torque = 0.0          # Nm at the crank
+        self.boost = 0.0           # kPa above atmospheric
+        self.map_kpa = 30.0        # Intake manifold absolute pressure
+        self.load = 0.0            # % calculated load
+        self.coolant_temp = p["ambient_temp_c"]
+        self.oil_temp = p["ambient_temp_c"]
+        self.intake_temp = p["ambient_temp_c"]
+        self.fuel_liters = p["tank_liters"] * p["fuel_level_pct"] / 100
+        self.fuel_rate_lph = 0.0
+    
+    def _torque_curve(self, rpm):
+        """Fraction of peak torque available at an engine speed"""
+        p = self.params
+        x = (rpm - p["idle_rpm"]) / (p["redline_rpm"] - p["idle_rpm"])
+        return 0.7 + 0.3 * math.sin(math.pi * min(max(x, 0.0), 1.0))
+    
+    def _spool(self, rpm):
+        """How much of the target boost the turbo can make at an engine speed"""
+        spool_rpm = self.params["turbo_spool_rpm"]
+        return min(max((rpm - 0.6 * spool_rpm) / (0.8 * spool_rpm), 0.0), 1.0)
+    
+    def _gear_rpm(self, speed, gear):
+        """Engine speed for a road speed in a gear, with the clutch engaged"""
+        p = self.params
+        wheel_rpm = speed / (2 * math.pi * p["wheel_radius_m"]) * 60
+        return wheel_rpm * p["gear_ratios"][gear] * p["final_drive"]
+    
+    def step(self, dt, throttle, brake, shift_up_rpm=2800, shift_down_rpm=1300):
+        """Advance the model by dt seconds"""
+        p = self.params
+        throttle = min(max(throttle, 0.0), 1.0)
+        brake = min(max(brake, 0.0), 1.0)
+        self.throttle = throttle
+        
+        # Gear selection
+        top = len(p["gear_ratios"]) - 1
+        if self.speed < 1.5:
+            self.gear = 0
+        elif self.gear < top and self._gear_rpm(self.speed, self.gear) > shift_up_rpm:
+            self.gear += 1
+        elif self.gear > 0 and self._gear_rpm(self.speed, self.gear) < shift_down_rpm:
+            self.gear -= 1
+        
+        # Engine speed: clutch slips below idle (pulling away), otherwise locked to the wheels
+        gear_rpm = self._gear_rpm(self.speed, self.gear)
+        if gear_rpm < p["idle_rpm"]:
+            target_rpm = p["idle_rpm"] + throttle * 1800
+            self.rpm += (target_rpm - self.rpm) * min(1.0, dt / 0.3)
+        else:
+            self.rpm = gear_rpm
+        self.rpm = min(self.rpm, p["redline_rpm"])
+        
+        # Turbo spools towards a throttle-dependent target with a lag
+        if p["turbo"]:
+            target_boost = p["max_boost_kpa"] * max(throttle - 0.3, 0.0) / 0.7 * self._spool(self.rpm)
+            self.boost += (target_boost - self.boost) * (1 - math.exp(-dt / p["turbo_time_constant_s"]))
+        
+        # Manifold pressure: vacuum at closed throttle, boost above atmospheric
+        self.map_kpa = 30.0 + (ATMOSPHERIC_KPA - 30.0) * throttle + self.boost
+        
+        # Torque scales with throttle and charge pressure, engine braking when closed
+        pressure_ratio = 1 + self.boost / ATMOSPHERIC_KPA
+        if throttle > 0.02:
+            self.torque = p["peak_torque_nm"] * self._torque_curve(self.rpm) * throttle * pressure_ratio
+        else:
+            self.torque = -0.08 * p["peak_torque_nm"] * self.rpm / p["redline_rpm"]
+        
+        # Longitudinal forces
+        clutch = min(1.0, gear_rpm / p["idle_rpm"]) if throttle > 0.02 else 1.0
+        ratio = p["gear_ratios"][self.gear] * p["final_drive"]
+        drive = self.torque * ratio * p["drivetrain_efficiency"] / p["wheel_radius_m"]
+        if gear_rpm < p["idle_rpm"] and self.torque < 0:
+            drive = 0.0
+        elif throttle > 0.02:
+            drive *= max(clutch, 0.35)
+        
+        resist = 0.5 * AIR_DENSITY * p["drag_area_m2"] * self.speed ** 2
+        if self.speed > 0:
+            resist += p["rolling_resistance"] * p["mass_kg"] * GRAVITY
+        braking = brake * p["max_brake_decel"] * p["mass_kg"]
+        
+        accel = (drive - resist - braking) / p["mass_kg"]
+        self.speed = max(0.0, self.speed + accel * dt)
+        self.distance += self.speed * dt
+        
+        # Calculated load follows airflow relative to wide open throttle without boost
+        self.load = min(100.0, 100.0 * self.map_kpa / ATMOSPHERIC_KPA * 0.9)
+        
+        # Fuel burn from brake power, idle flow when coasting
+        power_kw = max(self.torque, 0.0) * self.rpm * 2 * math.pi / 60 / 1000
+        fuel_gps = p["bsfc_g_per_kwh"] * power_kw / 3600
+        self.fuel_rate_lph = max(fuel_gps / FUEL_DENSITY * 3600, p["idle_fuel_lph"] if throttle > 0.02 or self.speed < 1 else 0.0)
+        self.fuel_liters = max(0.0, self.fuel_liters - self.fuel_rate_lph / 3600 * dt)
+        
+        # Coolant warms with load until the thermostat opens, the radiator holds it there
+        load_frac = self.load / 100
+        thermostat = p["thermostat_temp_c"]
+        if self.coolant_temp < thermostat:
+            self.coolant_temp += (0.08 + 0.35 * load_frac * self.rpm / 3000) * dt
+        else:
+            target = thermostat + 6 * load_frac - 3 * min(self.speed / 30, 1.0)
+            self.coolant_temp += (target - self.coolant_temp) * min(1.0, dt / 20)
+        
+        # Oil lags the coolant
+        self.oil_temp += (self.coolant_temp + 8 * load_frac - self.oil_temp) * min(1.0, dt / 240)
+        
+        # Intake air heats with boost and heat soak when slow
+        target_iat = p["ambient_temp_c"] + 0.3 * self.boost + 10 * math.exp(-self.speed / 5)
+        self.intake_temp += (target_iat - self.intake_temp) * min(1.0, dt / 10)
+    
+    def obd_values(self):
+        """Current state as OBDManager vehicle data (metric units)"""
+        p = self.params
+        return {
+            "rpm": round(self.rpm),
+            "speed": round(self.speed * 3.6, 1),
+            "coolant_temp": round(self.coolant_temp, 1),
+            "intake_temp": round(self.intake_temp, 1),
+            "throttle_pos": round(self.throttle * 100, 1),
+            "engine_load": round(self.load, 1),
+            "fuel_level": round(self.fuel_liters / p["tank_liters"] * 100, 2),
+            "battery_voltage": 14.1 if self.rpm > 0 else 12.6,
+            "boost_pressure": round(self.map_kpa, 1),
+            "oil_temp": round(self.oil_temp, 1)
+        }
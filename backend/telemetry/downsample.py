@@ -0,0 +1,86 @@
+"""
+Revvy AI Companion - Downsampling
+Reduce a series to a few hundred points for drawing, keeping its visual shape.
+
+    lttb      Largest-Triangle-Three-Buckets: one representative point per bucket
+    minmax    The minimum and maximum of each time bucket, so spikes are never lost
+"""
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(x, y, n):
+    """Indices of the n points LTTB keeps from an ordered series (any 2D polyline works)"""
+    count = len(x)
+    if n >= count:
+        return np.arange(count)
+    if n < 3:
+        return np.array([0, count - 1][:max(n, 0)], dtype=np.int64)
+    
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    
+    # First and last points are always kept, the rest is split into n - 2 buckets
+    edges = np.linspace(1, count - 1, n - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    
+    # Average of every bucket in one pass, the next bucket's average is each triangle's third corner
+    avg_x = np.add.reduceat(x[1:count - 1], edges[:-1] - 1) / sizes
+    avg_y = np.add.reduceat(y[1:count - 1], edges[:-1] - 1) / sizes
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+    
+    selected = np.empty(n, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    a = 0
+    
+    # Each bucket depends on the point picked in the previous one, the work inside a bucket is vectorized
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        areas = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    
+    return selected
+
+
+def lttb(times, values, n):
+    """Downsample (times, values) to n points with LTTB"""
+    indices = lttb_indices(times, values, n)
+    return times[indices], values[indices]
+
+
+def minmax(times, values, n):
+    """Downsample (times, values) to at most n points: min and max of n / 2 equal time buckets"""
+    count = len(times)
+    if n >= count or count == 0:
+        return times, values
+    
+    # Times are sorted, so each bucket is a contiguous run of samples (empty buckets are skipped)
+    edges = np.linspace(times[0], times[-1], max(1, n // 2) + 1)
+    starts = np.unique(np.searchsorted(times, edges[:-1], side="left"))
+    starts = starts[starts < count]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, count]))
+    
+    # Per-bucket extremes, then the first sample of each bucket that hits them
+    indices = []
+    for reduce in (np.minimum, np.maximum):
+        hits = np.flatnonzero(values == reduce.reduceat(values, starts)[bucket])
+        _, first = np.unique(bucket[hits], return_index=True)
+        indices.append(hits[first])
+    
+    indices = np.unique(np.concatenate(indices))
+    return times[indices], values[indices]
+
+
+def downsample(times, values, n, method="lttb"):
+    """Downsample with a named method"""
+    if method == "lttb":
+        return lttb(times, values, n)
+    if method == "minmax":
+        return minmax(times, values, n)
+    raise ValueError(f"Unknown downsampling method: {method}")
@@ -0,0 +1,166 @@
+"""
+Revvy AI Companion - Telemetry History
+Fixed-memory, NumPy-backed ring buffers holding recent samples of each signal.
+"""
+
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("TelemetryHistory")
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of (timestamp, value) samples
+    
+    Every sample is written twice, at i and i + capacity, so the most recent
+    n samples are always one contiguous slice of the backing arrays. That
+    makes windowed reads zero-copy views instead of concatenated copies.
+    Views are live: the writer will eventually overwrite them, so copy the
+    result if it has to outlive the current request.
+    """
+    
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity, dtype=np.float64)
+        self._values = np.zeros(2 * capacity, dtype=dtype)
+        self._head = 0   # Next write position in [0, capacity)
+        self._count = 0
+    
+    def __len__(self):
+        return self._count
+    
+    @property
+    def nbytes(self):
+        """Memory used by the backing arrays"""
+        return self._times.nbytes + self._values.nbytes
+    
+    def append(self, timestamp, value):
+        """Add a sample, overwriting the oldest one when full (O(1))"""
+        i = self._head
+        mirror = i + self.capacity
+        
+        # Values before timestamps, so a concurrent reader never sees a new time with an old value
+        self._values[i] = value
+        self._values[mirror] = value
+        self._times[i] = timestamp
+        self._times[mirror] = timestamp
+        
+        self._head = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+    
+    def latest(self, n=None):
+        """Get views of the last n samples (all of them by default)"""
+        count = self._count
+        end = self._head + self.capacity
+        n = count if n is None else min(n, count)
+        
+        return self._times[end - n:end], self._values[end - n:end]
+    
+    def window(self, seconds, now=None):
+        """Get views of the samples from the last `seconds` seconds"""
+        times, values = self.latest()
+        if len(times) == 0:
+            return times, values
+        
+        if now is None:
+            now = times[-1]
+        
+        start = np.searchsorted(times, now - seconds, side="left")
+        return times[start:], values[start:]
+    
+    def between(self, start_time, end_time):
+        """Get views of the samples with start_time <= t <= end_time"""
+        times, values = self.latest()
+        start = np.searchsorted(times, start_time, side="left")
+        end = np.searchsorted(times, end_time, side="right")
+        
+        return times[start:end], values[start:end]
+    
+    def last(self):
+        """Get the most recent (timestamp, value), or None if empty"""
+        if self._count == 0:
+            return None
+        
+        i = self._head + self.capacity - 1
+        return float(self._times[i]), float(self._values[i])
+
+
+class TelemetryHistory:
+    """Ring buffers for a set of numeric signals, all with the same capacity"""
+    
+    def __init__(self, history_seconds=600, max_rate_hz=10.0, max_signals=32, dtype=np.float32):
+        self.capacity = max(1, int(history_seconds * max_rate_hz))
+        self.max_signals = max_signals
+        self.dtype = dtype
+        self.buffers = {}
+        self.lock = threading.Lock()
+        self.listeners = []
+        
+        logger.debug(f"Telemetry history: {self.capacity} samples per signal")
+    
+    def _buffer(self, name):
+        """Get (or create) the buffer for a signal"""
+        buffer = self.buffers.get(name)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.get(name)
+                if buffer is None:
+                    # Cap the number of signals so memory use stays bounded
+                    if len(self.buffers) >= self.max_signals:
+                        return None
+                    buffer = RingBuffer(self.capacity, self.dtype)
+                    self.buffers[name] = buffer
+        
+        return buffer
+    
+    def record(self, values, timestamp):
+        """Append one sample per numeric value in a {signal: value} dict"""
+        for name, value in values.items():
+            if isinstance(value, bool):
+                value = float(value)
+            elif not isinstance(value, (int, float)):
+                continue
+            
+            buffer = self._buffer(name)
+            if buffer is not None:
+                buffer.append(timestamp, value)
+        
+        for listener in self.listeners:
+            try:
+                listener(values, timestamp)
+            except Exception as e:
+                logger.error(f"Error in telemetry listener: {e}")
+    
+    def add_listener(self, listener):
+        """Call listener(values, timestamp) for every recorded sample (e.g. to persist it)"""
+        self.listeners = self.listeners + [listener]
+    
+    def remove_listener(self, listener):
+        """Stop calling a listener"""
+        self.listeners = [l for l in self.listeners if l is not listener]
+    
+    def signals(self):
+        """Get the names of all recorded signals"""
+        return list(self.buffers.keys())
+    
+    def window(self, name, seconds, now=None):
+        """Get (timestamps, values) views for the last `seconds` seconds of a signal"""
+        buffer = self.buffers.get(name)
+        if buffer is None:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float32)
+        
+        return buffer.window(seconds, now)
+    
+    def between(self, name, start_time, end_time):
+        """Get (timestamps, values) views for a time range of a signal"""
+        buffer = self.buffers.get(name)
+        if buffer is None:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float32)
+        
+        return buffer.between(start_time, end_time)
+    
+    def memory_bytes(self):
+        """Memory used by all buffers"""
+        return sum(buffer.nbytes for buffer in self.buffers.values())
@@ -0,0 +1,76 @@
+"""
+Revvy AI Companion - Telemetry Queries
+Signals of one source over any time range, downsampled for drawing: recent samples
+come from the in-memory history, older ones from the trip files.
+"""
+
+import logging
+import numpy as np
+from .downsample import downsample, lttb_indices
+
+logger = logging.getLogger("TelemetryQuery")
+
+
+class HistoryQuery:
+    """Reads the signals of one source (OBD or GPS) from its history and the trip archive"""
+    
+    def __init__(self, history, archive=None, prefix=""):
+        self.history = history
+        self.archive = archive
+        self.prefix = prefix    # Signal name prefix in the trip files ("gps." for GPS)
+    
+    def read(self, signal, start_time, end_time):
+        """Get (timestamps, values) copies of a signal with start_time <= t <= end_time"""
+        times, values = self.history.between(signal, start_time, end_time)
+        # Copy out of the ring buffer, it keeps being written while we work
+        times, values = np.array(times), np.array(values, dtype=np.float64)
+        
+        buffer = self.history.buffers.get(signal)
+        oldest = buffer.latest()[0][0] if buffer is not None and len(buffer) else None
+        if self.archive is None or (oldest is not None and start_time >= oldest):
+            return times, values
+        
+        # The range starts before the buffer does: the rest comes from the trip files
+        archive_end = end_time if oldest is None else min(end_time, oldest)
+        try:
+            old_times, old_values = self.archive.read(self.prefix + signal, start_time, archive_end)
+        except Exception as e:
+            logger.error(f"Error reading {self.prefix + signal} from trips: {e}")
+            return times, values
+        
+        if oldest is not None:
+            keep = old_times < oldest
+            old_times, old_values = old_times[keep], old_values[keep]
+        
+        return np.concatenate([old_times, times]), np.concatenate([old_values.astype(np.float64), values])
+    
+    def series(self, signal, start_time, end_time, points, method="lttb"):
+        """Get a signal downsampled to about `points` points as (timestamps, values, raw sample count)"""
+        times, values = self.read(signal, start_time, end_time)
+        sampled_times, sampled_values = downsample(times, values, points, method)
+        return sampled_times, sampled_values, len(times)
+    
+    def track(self, start_time, end_time, points):
+        """Get the GPS track downsampled to about `points` positions, keeping its shape"""
+        times, latitudes = self.read("latitude", start_time, end_time)
+        lon_times, longitudes = self.read("longitude", start_time, end_time)
+        if len(times) == 0 or len(lon_times) == 0:
+            times, latitudes, longitudes = times[:0], latitudes[:0], longitudes[:0]
+            return {"t": times, "latitude": latitudes, "longitude": longitudes}, 0
+        
+        # Latitude and longitude come from the same fix, but don't rely on it
+        if len(lon_times) != len(times) or not np.array_equal(lon_times, times):
+            longitudes = np.interp(times, lon_times, longitudes)
+        
+        # LTTB over the (longitude, latitude) polyline keeps turns and drops straight runs
+        indices = lttb_indices(longitudes, latitudes, points)
+        selected = times[indices]
+        track = {"t": selected, "latitude": latitudes[indices], "longitude": longitudes[indices]}
+        
+        # Speed and altitude are sampled at their own times, take them at the kept positions
+        for signal in ("speed", "altitude"):
+            signal_times, signal_values = self.read(signal, start_time, end_time)
+            if len(signal_times):
+                track[signal] = np.interp(selected, signal_times, signal_values)
+        
+        return track, len(times)
@@ -0,0 +1,296 @@
+"""
+Revvy AI Companion - System Monitor
+Samples host and process health on a background thread at a fixed cadence: CPU per
+core, memory, disk, SoC temperature and Raspberry Pi throttling, CPU per thread of
+this process and the API event loop's lag. Readers only ever get the cached sample
+and its trends, no syscalls happen on their thread. Without psutil the metrics are
+reported as unavailable.
+"""
+
+import time
+import shutil
+import logging
+import threading
+import subprocess
+import numpy as np
+from .history import TelemetryHistory
+
+logger = logging.getLogger("SystemMonitor")
+
+# Optional: the API server must still run without it
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Raspberry Pi firmware throttling flags (vcgencmd get_throttled)
+THROTTLE_FLAGS = {
+    0x1: "under_voltage",
+    0x2: "frequency_capped",
+    0x4: "throttled",
+    0x8: "soft_temperature_limit",
+}
+THROTTLE_OCCURRED_SHIFT = 16   # The same flags, set if it happened since boot
+
+THROTTLED_PATH = "/sys/devices/platform/soc/soc:firmware/get_throttled"
+THERMAL_ZONE_PATH = "/sys/class/thermal/thermal_zone0/temp"
+TEMPERATURE_SENSORS = ("cpu_thermal", "coretemp", "k10temp", "soc_thermal")
+
+# Signals summarized as trends in the status
+TREND_SIGNALS = ("cpu_percent", "memory_percent", "disk_percent", "temperature", "loop_lag_ms", "process_cpu_percent")
+
+
+class SystemMonitor:
+    """Background sampler of system metrics with a short history"""
+    
+    def __init__(self, config):
+        self.config = config
+        self.interval = self.config.get("system", "metrics_interval", 2.0)
+        self.trend_seconds = self.config.get("system", "metrics_trend_seconds", 60)
+        self.disk_path = self.config.get("system", "metrics_disk_path", "/")
+        
+        self.history = TelemetryHistory(
+            history_seconds=self.config.get("system", "metrics_history_seconds", 600),
+            max_rate_hz=1.0 / self.interval,
+            max_signals=64,
+            dtype=np.float32
+        )
+        
+        self.running = False
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.process = psutil.Process() if psutil else None
+        self.boot_time = psutil.boot_time() if psutil else None
+        self.status = {} if psutil else {"available": False, "error": "psutil is not installed"}
+        
+        # CPU times per thread id at the previous sample
+        self.thread_times = {}
+        self.last_sample = None
+        
+        # Event loop probe: a callback posted to the loop, its delay is the lag
+        self.loop = None
+        self.probe_sent = None
+        self.loop_lag = None
+        self.max_loop_lag = 0.0
+        
+        self.throttle_command = shutil.which("vcgencmd")
+    
+    def start(self):
+        """Start sampling"""
+        if self.running:
+            return
+        
+        if psutil is None:
+            logger.warning("psutil is not installed, system metrics are unavailable")
+            return
+        
+        # Prime the delta based counters so the first sample isn't 0 or since-boot
+        psutil.cpu_percent(percpu=True)
+        self.process.cpu_percent()
+        
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._sample_loop, name="SystemMonitor")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"System monitor sampling every {self.interval:g} s")
+    
+    def stop(self):
+        """Stop sampling"""
+        self.running = False
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5.0)
+            self.thread = None
+    
+    def watch_loop(self, loop):
+        """Measure the lag of an asyncio loop (None to stop)"""
+        self.loop = loop
+        self.probe_sent = None
+        self.loop_lag = None
+    
+    def get_status(self):
+        """Get the latest sample and trends (cached, cheap to call from any thread)"""
+        return self.status
+    
+    def get_history(self, signal, seconds):
+        """Get (timestamps, values) of a metric over the last `seconds` seconds"""
+        return self.history.window(signal, seconds, time.time())
+    
+    def _sample_loop(self):
+        while self.running:
+            started = time.monotonic()
+            try:
+                self._sample()
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {e}")
+            
+            # Fixed cadence, however long the sample took
+            self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+    
+    def _sample(self):
+        now = time.time()
+        cores = psutil.cpu_percent(percpu=True)
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        frequency = psutil.cpu_freq()
+        
+        with self.process.oneshot():
+            process_cpu = self.process.cpu_percent()
+            rss = self.process.memory_info().rss
+            threads = self._thread_usage(now)
+        
+        temperature = self._read_temperature()
+        throttling = self._read_throttling()
+        loop_lag = self._probe_loop()
+        
+        values = {
+            "cpu_percent": sum(cores) / len(cores) if cores else 0.0,
+            "memory_percent": memory.percent,
+            "swap_percent": swap.percent,
+            "disk_percent": disk.percent,
+            "process_cpu_percent": process_cpu,
+            "process_rss_mb": rss / 1048576,
+            "cpu_frequency_mhz": frequency.current if frequency else None,
+            "temperature": temperature,
+            "loop_lag_ms": loop_lag * 1000 if loop_lag is not None else None,
+            "throttled": float(bool(throttling and throttling["now"])) if throttling else None,
+        }
+        values.update({f"cpu_core_{i}": usage for i, usage in enumerate(cores)})
+        self.history.record({name: value for name, value in values.items() if value is not None}, now)
+        
+        # Readers get a new dict each time, never one being filled in
+        self.status = {
+            "timestamp": now,
+            "interval": self.interval,
+            "cpu_usage": round(values["cpu_percent"], 1),
+            "cpu_cores": cores,
+            "cpu_frequency_mhz": values["cpu_frequency_mhz"],
+            "memory_usage": memory.percent,
+            "memory_available_mb": round(memory.available / 1048576, 1),
+            "swap_usage": swap.percent,
+            "disk_usage": disk.percent,
+            "disk_free_mb": round(disk.free / 1048576, 1),
+            "temperature": temperature,
+            "throttling": throttling,
+            "uptime": now - self.boot_time,
+            "process": {
+                "cpu_percent": process_cpu,
+                "rss_mb": round(values["process_rss_mb"], 1),
+                "threads": threads
+            },
+            "loop_lag_ms": round(values["loop_lag_ms"], 2) if loop_lag is not None else None,
+            "max_loop_lag_ms": round(self.max_loop_lag * 1000, 2),
+            "trends": self._trends(now)
+        }
+    
+    def _thread_usage(self, now):
+        """CPU percent of each thread of this process since the previous sample, busiest first"""
+        names = {thread.native_id: thread.name for thread in threading.enumerate()}
+        elapsed = now - self.last_sample if self.last_sample else None
+        self.last_sample = now
+        
+        usage = []
+        times = {}
+        for thread in self.process.threads():
+            total = thread.user_time + thread.system_time
+            times[thread.id] = total
+            previous = self.thread_times.get(thread.id)
+            if elapsed and previous is not None:
+                usage.append({
+                    "name": names.get(thread.id, str(thread.id)),
+                    "cpu_percent": round(max(0.0, total - previous) / elapsed * 100, 1)
+                })
+        
+        self.thread_times = times
+        usage.sort(key=lambda t: t["cpu_percent"], reverse=True)
+        return usage
+    
+    def _read_temperature(self):
+        """SoC temperature in Celsius, None if there is no sensor"""
+        sensors = psutil.sensors_temperatures() if hasattr(psutil, "sensors_temperatures") else {}
+        for name in TEMPERATURE_SENSORS:
+            if sensors.get(name):
+                return sensors[name][0].current
+        
+        try:
+            with open(THERMAL_ZONE_PATH) as f:
+                return int(f.read().strip()) / 1000.0
+        except (OSError, ValueError):
+            return None
+    
+    def _read_throttling(self):
+        """Raspberry Pi throttling flags, now and since boot, None elsewhere"""
+        raw = None
+        try:
+            with open(THROTTLED_PATH) as f:
+                raw = int(f.read().strip(), 16)
+        except (OSError, ValueError):
+            if self.throttle_command:
+                try:
+                    output = subprocess.run([self.throttle_command, "get_throttled"], capture_output=True,
+                                            text=True, timeout=1.0).stdout
+                    raw = int(output.strip().split("=")[-1], 16)
+                except (OSError, ValueError, subprocess.SubprocessError):
+                    # Not a Pi after all, don't try again
+                    self.throttle_command = None
+        
+        if raw is None:
+            return None
+        
+        return {
+            "raw": hex(raw),
+            "now": [name for bit, name in THROTTLE_FLAGS.items() if raw & bit],
+            "since_boot": [name for bit, name in THROTTLE_FLAGS.items() if raw & (bit << THROTTLE_OCCURRED_SHIFT)]
+        }
+    
+    def _probe_loop(self):
+        """Post a probe to the watched loop, get the lag of the previous one in seconds"""
+        loop = self.loop
+        if loop is None:
+            return None
+        
+        if self.probe_sent is not None:
+            # The last probe still hasn't run: the loop is blocked at least this long
+            return time.monotonic() - self.probe_sent
+        
+        lag = self.loop_lag
+        self.probe_sent = time.monotonic()
+        try:
+            loop.call_soon_threadsafe(self._on_probe, self.probe_sent)
+        except RuntimeError:
+            # Loop closed
+            self.probe_sent = None
+        return lag
+    
+    def _on_probe(self, sent):
+        """Runs on the watched loop"""
+        self.loop_lag = time.monotonic() - sent
+        self.max_loop_lag = max(self.max_loop_lag, self.loop_lag)
+        self.probe_sent = None
+    
+    def _trends(self, now):
+        """Latest, min, max, mean and slope per minute of the main metrics over the trend window"""
+        trends = {}
+        for signal in TREND_SIGNALS:
+            times, values = self.history.window(signal, self.trend_seconds, now)
+            if len(values) == 0:
+                continue
+            
+            values = values.astype(np.float64)
+            slope = 0.0
+            if len(values) > 1:
+                t = times - times.mean()
+                spread = np.dot(t, t)
+                if spread > 0:
+                    slope = float(np.dot(t, values - values.mean()) / spread) * 60
+            
+            trends[signal] = {
+                "latest": round(float(values[-1]), 2),
+                "min": round(float(values.min()), 2),
+                "max": round(float(values.max()), 2),
+                "mean": round(float(values.mean()), 2),
+                "per_minute": round(slope, 3)
+            }
+        return trends
@@ -0,0 +1,407 @@
+"""
+Revvy AI Companion - Trip Recorder
+Streams OBD and GPS samples to compact, append-only trip files and reads them back via mmap.
+
+File layout (little endian):
+    header   b"RVTRIP01", uint32 length, JSON {"version", "started"}
+    chunk*   b"CHNK", chunk header struct, JSON list of signals first seen in
+             this chunk, then three zlib-compressed columns:
+             time (uint32 ms since chunk start), signal id (uint16), value (float64)
+    footer   JSON {"signals", "chunks", "started", "ended"}
+    trailer  uint64 footer offset, b"RVTRIPFT"
+
+A file without a trailer (power cut while driving) is still readable, the
+reader rebuilds the index by walking the chunk headers.
+"""
+
+import os
+import json
+import mmap
+import time
+import zlib
+import queue
+import struct
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger("TripRecorder")
+
+FILE_MAGIC = b"RVTRIP01"
+CHUNK_MAGIC = b"CHNK"
+TRAILER_MAGIC = b"RVTRIPFT"
+FILE_EXTENSION = ".rtrip"
+
+# n records, t0 (s), t_min, t_max, new-signals JSON length, time/sid/value column lengths
+CHUNK_HEADER = struct.Struct("<4sIdddIIII")
+TRAILER = struct.Struct("<Q8s")
+
+TIME_DTYPE = np.dtype("<u4")
+SIGNAL_DTYPE = np.dtype("<u2")
+VALUE_DTYPE = np.dtype("<f8")
+
+
+class TripRecorder:
+    """Buffers samples in memory and writes them as compressed columnar chunks"""
+    
+    def __init__(self, config):
+        self.config = config
+        self.directory = self.config.get("telemetry", "trip_directory", "./data/trips")
+        self.chunk_records = self.config.get("telemetry", "trip_chunk_records", 8192)
+        self.chunk_seconds = self.config.get("telemetry", "trip_chunk_seconds", 60)
+        self.compression_level = self.config.get("telemetry", "trip_compression_level", 6)
+        
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self.write_queue = queue.Queue()
+        
+        self.file = None
+        self.path = None
+        self.started = 0
+        self.signals = {}       # name -> id
+        self.new_signals = []   # names first seen in the current chunk
+        self.chunks = []        # [offset, size, n, t_min, t_max]
+        self._reset_buffer()
+    
+    def _reset_buffer(self):
+        """Allocate arrays for the next chunk"""
+        self.buf_times = np.empty(self.chunk_records, dtype=np.float64)
+        self.buf_signals = np.empty(self.chunk_records, dtype=SIGNAL_DTYPE)
+        self.buf_values = np.empty(self.chunk_records, dtype=VALUE_DTYPE)
+        self.buf_count = 0
+        self.buf_started = None
+    
+    def start(self):
+        """Open a new trip file and start the writer thread"""
+        os.makedirs(self.directory, exist_ok=True)
+        
+        self.started = time.time()
+        name = datetime.fromtimestamp(self.started).strftime("trip-%Y%m%d-%H%M%S") + FILE_EXTENSION
+        self.path = os.path.join(self.directory, name)
+        
+        self.file = open(self.path, "wb")
+        header = json.dumps({"version": 1, "started": self.started}).encode()
+        self.file.write(FILE_MAGIC + struct.pack("<I", len(header)) + header)
+        
+        self.signals = {}
+        self.new_signals = []
+        self.chunks = []
+        self._reset_buffer()
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._writer_loop, name="TripRecorder")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"Recording trip to {self.path}")
+    
+    def stop(self):
+        """Flush buffered samples, write the index footer and close the file"""
+        if not self.running:
+            return
+        
+        with self.lock:
+            self._flush_locked()
+            self.running = False
+        
+        self.write_queue.put(None)
+        if self.thread:
+            self.thread.join(timeout=10.0)
+            
+            # Still writing: a footer now would interleave with its chunk, readers rebuild the index instead
+            if self.thread.is_alive():
+                logger.warning("Trip writer is still busy, leaving the trip without a footer")
+                return
+        
+        try:
+            self._write_footer()
+        except Exception as e:
+            logger.error(f"Error finalizing trip file: {e}")
+        
+        logger.info(f"Trip recording stopped ({len(self.chunks)} chunks)")
+    
+    def listener(self, prefix=""):
+        """Get a TelemetryHistory listener that records samples under a name prefix"""
+        def record(values, timestamp):
+            self.record(values, timestamp, prefix)
+        return record
+    
+    def record(self, values, timestamp, prefix=""):
+        """Add the numeric values of a {signal: value} dict sampled at timestamp"""
+        if not self.running:
+            return
+        
+        with self.lock:
+            for name, value in values.items():
+                if isinstance(value, bool):
+                    value = float(value)
+                elif not isinstance(value, (int, float)):
+                    continue
+                
+                key = prefix + name
+                sid = self.signals.get(key)
+                if sid is None:
+                    sid = len(self.signals)
+                    self.signals[key] = sid
+                    self.new_signals.append(key)
+                
+                i = self.buf_count
+                if i == 0:
+                    self.buf_started = timestamp
+                self.buf_times[i] = timestamp
+                self.buf_signals[i] = sid
+                self.buf_values[i] = value
+                self.buf_count += 1
+                
+                if self.buf_count == self.chunk_records:
+                    self._flush_locked()
+            
+            # Bound how much is lost if power goes, without writing small chunks often
+            if self.buf_count and timestamp - self.buf_started >= self.chunk_seconds:
+                self._flush_locked()
+    
+    def _flush_locked(self):
+        """Hand the current buffer to the writer thread (lock held)"""
+        if self.buf_count == 0:
+            return
+        
+        n = self.buf_count
+        self.write_queue.put((
+            self.buf_times[:n], self.buf_signals[:n], self.buf_values[:n], self.new_signals
+        ))
+        self.new_signals = []
+        self._reset_buffer()
+    
+    def _writer_loop(self):
+        """Compress and write chunks off the telemetry threads"""
+        unwritten = []  # Names introduced by chunks that failed to write, signal ids follow their order
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+            
+            times, signals, values, new_signals = item
+            try:
+                self._write_chunk(times, signals, values, unwritten + new_signals)
+                unwritten = []
+            except Exception as e:
+                logger.error(f"Error writing trip chunk: {e}")
+                unwritten = unwritten + new_signals
+    
+    def _write_chunk(self, times, signals, values, new_signals):
+        """Write one compressed columnar chunk"""
+        t0 = float(times.min())
+        offsets = np.round((times - t0) * 1000).astype(TIME_DTYPE)
+        
+        level = self.compression_level
+        time_col = zlib.compress(offsets.tobytes(), level)
+        signal_col = zlib.compress(signals.tobytes(), level)
+        value_col = zlib.compress(values.tobytes(), level)
+        names = json.dumps(new_signals).encode()
+        
+        header = CHUNK_HEADER.pack(
+            CHUNK_MAGIC, len(times), t0, t0, float(times.max()),
+            len(names), len(time_col), len(signal_col), len(value_col)
+        )
+        
+        offset = self.file.tell()
+        try:
+            self.file.write(header + names + time_col + signal_col + value_col)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except OSError:
+            # Cut a partly written chunk, the next one has to follow the last good one
+            self.file.seek(offset)
+            self.file.truncate()
+            raise
+        
+        self.chunks.append([offset, self.file.tell() - offset, len(times), t0, float(times.max())])
+    
+    def _write_footer(self):
+        """Write the chunk index and close the file"""
+        if not self.file:
+            return
+        
+        footer = json.dumps({
+            "signals": sorted(self.signals, key=self.signals.get),
+            "chunks": self.chunks,
+            "started": min([self.started] + [chunk[3] for chunk in self.chunks]),
+            "ended": max([self.started] + [chunk[4] for chunk in self.chunks])
+        }).encode()
+        
+        offset = self.file.tell()
+        self.file.write(footer + TRAILER.pack(offset, TRAILER_MAGIC))
+        self.file.close()
+        self.file = None
+
+
+class TripFile:
+    """Read-only, memory-mapped view of a recorded trip"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if self._map[:len(FILE_MAGIC)] != FILE_MAGIC:
+            self.close()
+            raise ValueError(f"Not a trip file: {path}")
+        
+        header_len = struct.unpack_from("<I", self._map, len(FILE_MAGIC))[0]
+        self._data_start = len(FILE_MAGIC) + 4 + header_len
+        header = json.loads(self._map[len(FILE_MAGIC) + 4:self._data_start])
+        
+        if not self._load_footer():
+            self._scan_chunks(header)
+    
+    def _load_footer(self):
+        """Read the index from the footer, False if the trip wasn't closed cleanly"""
+        if len(self._map) < self._data_start + TRAILER.size:
+            return False
+        
+        offset, magic = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+        if magic != TRAILER_MAGIC:
+            return False
+        
+        footer = json.loads(self._map[offset:len(self._map) - TRAILER.size])
+        self.signals = footer["signals"]
+        self.chunks = footer["chunks"]
+        self.started = footer["started"]
+        self.ended = footer["ended"]
+        return True
+    
+    def _scan_chunks(self, header):
+        """Rebuild the index by walking chunk headers"""
+        self.signals = []
+        self.chunks = []
+        self.started = header.get("started", 0)
+        
+        offset = self._data_start
+        while offset + CHUNK_HEADER.size <= len(self._map):
+            magic, n, _, t_min, t_max, names_len, t_len, s_len, v_len = CHUNK_HEADER.unpack_from(self._map, offset)
+            size = CHUNK_HEADER.size + names_len + t_len + s_len + v_len
+            if magic != CHUNK_MAGIC or offset + size > len(self._map):
+                break
+            
+            names_start = offset + CHUNK_HEADER.size
+            self.signals.extend(json.loads(self._map[names_start:names_start + names_len]))
+            self.chunks.append([offset, size, n, t_min, t_max])
+            offset += size
+        
+        if self.chunks:
+            self.started = min(self.started, min(chunk[3] for chunk in self.chunks))
+        self.ended = max([self.started] + [chunk[4] for chunk in self.chunks])
+        logger.info(f"Recovered {len(self.chunks)} chunks from unfinished trip {self.path}")
+    
+    def close(self):
+        """Release the mapping"""
+        self._map.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+    
+    @property
+    def sample_count(self):
+        return sum(chunk[2] for chunk in self.chunks)
+    
+    def _read_chunk(self, chunk):
+        """Decompress one chunk into (times, signal ids, values)"""
+        offset = chunk[0]
+        _, n, t0, _, _, names_len, t_len, s_len, v_len = CHUNK_HEADER.unpack_from(self._map, offset)
+        
+        pos = offset + CHUNK_HEADER.size + names_len
+        view = memoryview(self._map)
+        try:
+            offsets = np.frombuffer(zlib.decompress(view[pos:pos + t_len]), dtype=TIME_DTYPE)
+            pos += t_len
+            signals = np.frombuffer(zlib.decompress(view[pos:pos + s_len]), dtype=SIGNAL_DTYPE)
+            pos += s_len
+            values = np.frombuffer(zlib.decompress(view[pos:pos + v_len]), dtype=VALUE_DTYPE)
+        finally:
+            view.release()
+        
+        return t0 + offsets / 1000.0, signals, values
+    
+    def read(self, signal, start_time=None, end_time=None):
+        """Get (timestamps, values) of one signal, only decompressing chunks in range"""
+        if signal not in self.signals:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=VALUE_DTYPE)
+        
+        sid = self.signals.index(signal)
+        start_time = self.started if start_time is None else start_time
+        end_time = self.ended if end_time is None else end_time
+        
+        times_parts = []
+        values_parts = []
+        for chunk in self.chunks:
+            if chunk[4] < start_time or chunk[3] > end_time:
+                continue
+            
+            times, signals, values = self._read_chunk(chunk)
+            mask = (signals == sid) & (times >= start_time) & (times <= end_time)
+            times_parts.append(times[mask])
+            values_parts.append(values[mask])
+        
+        if not times_parts:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=VALUE_DTYPE)
+        
+        times = np.concatenate(times_parts)
+        values = np.concatenate(values_parts)
+        
+        # Chunks are written in order, but samples from different threads may interleave
+        order = np.argsort(times, kind="stable")
+        return times[order], values[order]
+
+
+class TripArchive:
+    """All recorded trips in a directory, opened lazily"""
+    
+    def __init__(self, directory):
+        self.directory = directory
+    
+    def paths(self):
+        """Get trip file paths, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(FILE_EXTENSION))
+        return [os.path.join(self.directory, n) for n in names]
+    
+    def open_between(self, start_time, end_time):
+        """Open the trips that overlap a time range (only footers are read)"""
+        trips = []
+        for path in self.paths():
+            try:
+                trip = TripFile(path)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable trip {path}: {e}")
+                continue
+            
+            if trip.ended >= start_time and trip.started <= end_time:
+                trips.append(trip)
+            else:
+                trip.close()
+        
+        return trips
+    
+    def read(self, signal, start_time, end_time):
+        """Get (timestamps, values) of a signal across all trips in a time range"""
+        times_parts = []
+        values_parts = []
+        
+        for trip in self.open_between(start_time, end_time):
+            with trip:
+                times, values = trip.read(signal, start_time, end_time)
+                # Copy out of the decompressed chunks before the mapping closes
+                times_parts.append(np.array(times))
+                values_parts.append(np.array(values))
+        
+        if not times_parts:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=VALUE_DTYPE)
+        
+        return np.concatenate(times_parts), np.concatenate(values_parts)
@@ -0,0 +1,73 @@
+"""
+Revvy AI Companion - Test Configuration
+Makes the backend importable the way the app runs it: modules by their top-level
+name (telemetry, ai, voice) and the OBD package as backend.obd, so it doesn't clash
+with python-OBD. Provides OBD managers connected to the ELM327 emulator and a stub
+config for components that only read settings.
+"""
+
+import os
+import sys
+import json
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.dirname(BACKEND_DIR), BACKEND_DIR]
+
+
+class StubConfig:
+    """Settings by (section, key), anything else is the caller's default"""
+    
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+    
+    def get(self, section, key, default=None):
+        return self.values.get((section, key), default)
+    
+    def set(self, section, key, value):
+        self.values[(section, key)] = value
+        return True
+
+
+@pytest.fixture
+def stub_config():
+    """Make a stub config from {(section, key): value}"""
+    return StubConfig
+
+
+@pytest.fixture
+def connect(tmp_path):
+    """Start an emulator with the given quirks and connect a manager to it, last_profile
+    is the cached profile of the vehicle previously seen on the adapter"""
+    from backend.config import RevvyConfig
+    from backend.obd.emulator import ELM327Emulator
+    from backend.obd.manager import OBDManager
+    
+    started = []
+    profile_path = tmp_path / "obd_profiles.json"
+    
+    def connect(*quirks, last_profile=None):
+        emulator = ELM327Emulator(quirks=quirks, latency={"01": 0.0}, seed=1)
+        emulator.start()
+        started.append(emulator)
+        
+        if last_profile:
+            key = last_profile["key"]
+            profile_path.write_text(json.dumps({"profiles": {key: last_profile},
+                                                "last_by_port": {emulator.port: key}}))
+        
+        config = RevvyConfig(str(tmp_path / "config.json"))
+        config.config["obd"].update({
+            "port": emulator.port,
+            "baudrate": None,
+            "profile_cache_path": str(profile_path)
+        })
+        manager = OBDManager(config)
+        assert manager.connect()
+        started.append(manager)
+        return emulator, manager
+    
+    yield connect
+    
+    for component in reversed(started):
+        component.stop()
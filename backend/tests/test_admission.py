@@ -0,0 +1,284 @@
+"""
+AI admission control: queue order, merging identical queries, rate limits and the
+queue cap, in front of an engine that answers when a test lets it.
+"""
+
+import time
+import threading
+import pytest
+from ai.admission import AIAdmission, AdmissionRejected, PRIORITY_DRIVER, DRIVER_CLIENT, \
+    REASON_RATE_LIMITED, REASON_QUEUE_FULL
+
+TIMEOUT = 5.0
+
+
+class GatedEngine:
+    """Streams the first half of an answer, then waits for release() to finish it"""
+    
+    def __init__(self):
+        self.ran = []
+        self.running = threading.Semaphore(0)
+        self.gate = threading.Semaphore(0)
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+    
+    def run_query(self, text, context=None, callback=None, query_id=None, on_token=None, **kwargs):
+        self.ran.append(text)
+        on_token(query_id, "Ans", 0)
+        self.running.release()
+        assert self.gate.acquire(timeout=TIMEOUT)
+        on_token(query_id, "wer", 1)
+        callback(query_id, f"Answer to {text}")
+    
+    def wait_running(self):
+        assert self.running.acquire(timeout=TIMEOUT)
+    
+    def release(self, count=1):
+        for _ in range(count):
+            self.gate.release()
+
+
+@pytest.fixture
+def admission(stub_config):
+    started = []
+    
+    def admission(**values):
+        engine = GatedEngine()
+        result = AIAdmission(engine, stub_config({("ai", key): value for key, value in values.items()}))
+        result.start()
+        started.append(result)
+        return engine, result
+    
+    yield admission
+    
+    for result in started:
+        result.engine.release(100)
+        result.stop()
+
+
+def wait_idle(admission):
+    deadline = time.monotonic() + TIMEOUT
+    while time.monotonic() < deadline:
+        stats = admission.get_stats()
+        if not stats["running"] and not stats["queued"]:
+            return
+        time.sleep(0.01)
+    raise AssertionError("AI queries did not finish")
+
+
+def test_driver_first_then_clients_take_turns(admission):
+    engine, ai = admission(client_query_burst=10)
+    ai.submit("first", client="a")
+    engine.wait_running()
+    
+    a1 = ai.submit("a one", client="a")
+    a2 = ai.submit("a two", client="a")
+    b1 = ai.submit("b one", client="b")
+    driver = ai.submit("driver", client=DRIVER_CLIENT, priority=PRIORITY_DRIVER)
+    
+    assert [ai.position(job["query_id"]) for job in (driver, a1, b1, a2)] == [1, 2, 3, 4]
+    
+    for _ in range(4):
+        engine.release()
+        engine.wait_running()
+    engine.release()
+    wait_idle(ai)
+    
+    assert engine.ran == ["first", "driver", "a one", "b one", "a two"]
+    assert ai.position(driver["query_id"]) is None
+
+
+def test_identical_queries_are_merged(admission):
+    engine, ai = admission()
+    answers = []
+    early, late = [], []
+    
+    first = ai.submit("Is my engine OK?", callback=lambda qid, response: answers.append((qid, response)),
+                      on_token=lambda qid, text, index: early.append((index, text)))
+    engine.wait_running()
+    merged = ai.submit("is my engine ok", client="other", callback=lambda qid, response: answers.append((qid, response)),
+                       on_token=lambda qid, text, index: late.append((index, text)))
+    
+    assert merged == {"query_id": first["query_id"], "position": 0, "merged": True}
+    
+    engine.release()
+    wait_idle(ai)
+    
+    # One generation, both got the whole answer, the late one had the start replayed
+    assert engine.ran == ["Is my engine OK?"]
+    assert answers == [(first["query_id"], "Answer to Is my engine OK?")] * 2
+    assert early == late == [(0, "Ans"), (1, "wer")]
+    assert ai.get_stats()["merged"] == 1
+    
+    # Finished queries are not merged into
+    assert ai.submit("is my engine ok")["merged"] is False
+
+
+def test_driver_merge_moves_the_query_ahead(admission):
+    engine, ai = admission(client_query_burst=10)
+    ai.submit("first", client="a")
+    engine.wait_running()
+    
+    a1 = ai.submit("a one", client="a")
+    b1 = ai.submit("b one", client="b")
+    b2 = ai.submit("b two", client="b")
+    
+    # The driver asks what b is waiting for: it runs next, for both of them
+    driver = ai.submit("B two", client=DRIVER_CLIENT, priority=PRIORITY_DRIVER)
+    assert driver == {"query_id": b2["query_id"], "position": 1, "merged": True}
+    assert [ai.position(job["query_id"]) for job in (a1, b1)] == [2, 3]
+    
+    for _ in range(3):
+        engine.release()
+        engine.wait_running()
+    engine.release()
+    wait_idle(ai)
+    
+    assert engine.ran == ["first", "b two", "a one", "b one"]
+
+
+def test_remote_clients_are_rate_limited(admission):
+    engine, ai = admission(client_query_burst=2, client_queries_per_minute=6)
+    
+    ai.submit("one", client="a")
+    ai.submit("two", client="a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        ai.submit("three", client="a")
+    assert rejected.value.reason == REASON_RATE_LIMITED
+    assert 0 < rejected.value.retry_after <= 10.0
+    
+    # Other clients and the driver have their own allowance
+    ai.submit("three", client="b")
+    for i in range(5):
+        ai.query(f"driver {i}")
+    assert ai.get_stats()["rejected"][REASON_RATE_LIMITED] == 1
+
+
+def test_queue_is_bounded(admission):
+    engine, ai = admission(max_queued_queries=2, client_query_burst=10)
+    ai.submit("running")
+    engine.wait_running()
+    ai.submit("queued one")
+    ai.submit("queued two")
+    
+    with pytest.raises(AdmissionRejected) as rejected:
+        ai.query("driver too")
+    assert rejected.value.reason == REASON_QUEUE_FULL
+    assert rejected.value.retry_after > 0
+    
+    # A duplicate costs no queue slot
+    assert ai.submit("Queued one!")["merged"] is True
+
+
+class Results:
+    def __init__(self):
+        self.finished = {}
+    
+    def start(self, query_id, query):
+        pass
+    
+    def finish(self, query_id, response=None, error=None):
+        self.finished[query_id] = (response, str(error) if error else None)
+
+
+class DeadlineEngine(GatedEngine):
+    """Streams until the deadline of a "slow" query, like the real engine's generate()"""
+    
+    def __init__(self):
+        super().__init__()
+        self.results = Results()
+        self.deadlines = []
+    
+    def run_query(self, text, context=None, callback=None, query_id=None, on_token=None, deadline=None):
+        self.ran.append(text)
+        self.deadlines.append(deadline)
+        if text == "slow":
+            while time.monotonic() <= deadline:
+                time.sleep(0.01)
+            self.results.finish(query_id, error="Generation timed out")
+            callback(query_id, "Sorry, that took me too long to think about.")
+            return
+        self.results.finish(query_id, f"Answer to {text}")
+        callback(query_id, f"Answer to {text}")
+
+
+class SilentEngine:
+    """Answers on its own thread, and never does"""
+    
+    def __init__(self):
+        self.results = Results()
+        self.ran = []
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+    
+    def query(self, text, context=None, callback=None, query_id=None, on_token=None):
+        self.ran.append(text)
+
+
+def test_generation_stops_at_the_timeout(stub_config):
+    engine = DeadlineEngine()
+    ai = AIAdmission(engine, stub_config({("ai", "generation_timeout"): 0.2}))
+    ai.start()
+    try:
+        slow = ai.query("slow")
+        fast = ai.query("fast")
+        wait_idle(ai)
+        
+        # The deadline is the start of the generation plus the timeout, the slot is freed after it
+        assert engine.ran == ["slow", "fast"]
+        assert engine.deadlines[0] == pytest.approx(time.monotonic() - 0.2, abs=1.0)
+        assert engine.results.finished[slow][1] == "Generation timed out"
+        assert engine.results.finished[fast] == ("Answer to fast", None)
+        assert ai.position(slow) is None
+    finally:
+        ai.stop()
+
+
+def test_unanswered_query_finishes_with_an_error(stub_config):
+    engine = SilentEngine()
+    ai = AIAdmission(engine, stub_config({("ai", "generation_timeout"): 0.1}))
+    ai.start()
+    try:
+        first = ai.query("never answered")
+        second = ai.query("next")
+        wait_idle(ai)
+        
+        assert engine.ran == ["never answered", "next"]
+        assert engine.results.finished[first] == (None, "No answer within 0.1 s")
+        assert ai.position(first) is None
+        assert ai.submit("never answered")["merged"] is False
+    finally:
+        ai.stop()
+
+
+def test_slow_token_listener_does_not_block_admission(admission):
+    engine, ai = admission(client_query_burst=10)
+    blocked = threading.Event()
+    unblock = threading.Event()
+    
+    def listener(qid, text, index):
+        blocked.set()
+        unblock.wait(TIMEOUT)
+    
+    ai.submit("first", on_token=listener)
+    assert blocked.wait(TIMEOUT)
+    
+    # The worker is stuck in the listener, admission and stats still answer
+    submitted = []
+    thread = threading.Thread(target=lambda: submitted.append((ai.submit("second", client="b"), ai.get_stats())))
+    thread.start()
+    thread.join(1.0)
+    unblock.set()
+    assert submitted and submitted[0][0]["position"] == 1
+    
+    engine.wait_running()
+    engine.release(2)
+    wait_idle(ai)
@@ -0,0 +1,87 @@
+"""
+Splitting streamed answers into sentences for text-to-speech.
+"""
+
+import pytest
+from voice.chunker import SentenceChunker
+
+
+def chunk(pieces, **kwargs):
+    sentences = []
+    chunker = SentenceChunker(sentences.append, **kwargs)
+    for piece in pieces:
+        chunker.feed(piece)
+    chunker.flush()
+    return sentences
+
+
+def tokens(text, size=3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_sentences_are_emitted_as_they_complete():
+    sentences = []
+    chunker = SentenceChunker(sentences.append)
+    
+    chunker.feed("Your engine is running at 92 degrees")
+    assert sentences == []
+    chunker.feed(", which is normal. Fuel is ")
+    assert sentences == ["Your engine is running at 92 degrees, which is normal."]
+    chunker.feed("at 43 percent.")
+    assert len(sentences) == 1
+    
+    chunker.flush()
+    assert sentences[1] == "Fuel is at 43 percent."
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_token_boundaries_dont_matter(size):
+    text = "Oil pressure is 3.5 bar, i.e., fine. Check the tires soon! Are they at 2.4 bar?\nDrive safe."
+    assert chunk(tokens(text, size)) == [
+        "Oil pressure is 3.5 bar, i.e., fine.",
+        "Check the tires soon!",
+        "Are they at 2.4 bar?",
+        "Drive safe."
+    ]
+
+
+def test_short_sentences_wait_for_the_next():
+    assert chunk(["Sure. ", "Hi! ", "Your coolant is at 90 degrees. ", "OK."]) == [
+        "Sure. Hi! Your coolant is at 90 degrees.",
+        "OK."
+    ]
+
+
+def test_run_on_text_is_cut_at_a_clause():
+    text = "first clause here, " * 20
+    sentences = chunk(tokens(text), max_chars=60)
+    
+    assert all(len(sentence) <= 60 for sentence in sentences)
+    assert all(sentence.endswith(",") for sentence in sentences)
+    assert " ".join(sentences) == text.strip()
+    
+    # No clause break, cut at a space
+    sentences = chunk(["word " * 50], max_chars=40)
+    assert all(len(sentence) <= 40 for sentence in sentences)
+    assert " ".join(sentences) == ("word " * 50).strip()
+
+
+def test_finish_speaks_an_answer_that_was_not_streamed():
+    sentences = []
+    chunker = SentenceChunker(sentences.append)
+    chunker.finish("The cache had this answer. It was not generated again.")
+    assert sentences == ["The cache had this answer.", "It was not generated again."]
+    
+    # Streamed answers only emit the rest
+    sentences.clear()
+    chunker = SentenceChunker(sentences.append)
+    chunker.feed("Streamed sentence number one. And the")
+    chunker.finish("Streamed sentence number one. And the end.")
+    assert sentences == ["Streamed sentence number one.", "And the"]
+
+
+def test_emit_errors_are_contained():
+    chunker = SentenceChunker(lambda sentence: 1 / 0)
+    chunker.feed("This sentence fails to be spoken. ")
+    chunker.flush()
+    assert chunker.sentences == 1
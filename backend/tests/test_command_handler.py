@@ -0,0 +1,167 @@
+"""
+Voice on/off commands, from the exact patterns and from routed intents, and spoken
+or HTTP commands answered on the spot without asking the LLM.
+"""
+
+import json
+import asyncio
+import pytest
+from voice.command_handler import CommandHandler
+
+VOICE_MODULES = ("sounddevice", "soundfile", "pvporcupine", "pvrecorder", "pyttsx3", "speech_recognition")
+
+
+class StubCore:
+    obd = None
+    gps = None
+    voice = None
+    
+    def __init__(self, config, voice_enabled):
+        self.config = config
+        self.voice_enabled = voice_enabled
+        self.ai = RecordingAI()
+    
+    def toggle_voice(self):
+        self.voice_enabled = not self.voice_enabled
+        return self.voice_enabled
+
+
+class RecordingAI:
+    """Records the queries that reach the LLM"""
+    
+    def __init__(self):
+        self.queries = []
+    
+    def query(self, query_text, context=None, callback=None, on_token=None):
+        self.queries.append(query_text)
+        return "q1"
+    
+    def submit(self, query_text, context=None, callback=None, **kwargs):
+        self.queries.append(query_text)
+        return {"query_id": "q1", "position": 1, "merged": False}
+
+
+class PendingResults:
+    """Answers that never arrive, records how long each was waited for"""
+    
+    def __init__(self):
+        self.timeouts = []
+    
+    def wait(self, query_id, timeout):
+        self.timeouts.append(timeout)
+        return {"status": "pending"}
+
+
+class StubRequest:
+    remote = "127.0.0.1"
+    
+    def __init__(self, command):
+        self.command = command
+    
+    async def json(self):
+        return {"command": self.command}
+
+
+@pytest.fixture
+def make_core(stub_config):
+    """Make a core with voice on or off, intents are only routed where a test routes them"""
+    return lambda voice_enabled: StubCore(stub_config({("voice", "intent_routing"): False}), voice_enabled)
+
+
+@pytest.mark.parametrize("command, initial, expected", [
+    ("unmute yourself", False, True),
+    ("mute yourself", True, False),
+    ("turn on the voice", False, True),
+    ("turn off the voice", True, False),
+    ("switch off speech", True, False),
+])
+def test_voice_patterns(make_core, command, initial, expected):
+    core = make_core(initial)
+    CommandHandler(core).process_command(command)
+    assert core.voice_enabled is expected
+
+
+@pytest.mark.parametrize("intent, initial, expected", [
+    ("voice_on", False, True),
+    ("voice_off", True, False),
+])
+def test_voice_intents(monkeypatch, make_core, intent, initial, expected):
+    core = make_core(initial)
+    handler = CommandHandler(core)
+    monkeypatch.setattr(handler.intent_router, "route", lambda text: (intent, 0.9))
+    
+    handler.process_command("could you please")
+    assert core.voice_enabled is expected
+
+
+def test_voice_already_in_requested_state(make_core):
+    core = make_core(True)
+    CommandHandler(core).process_command("unmute yourself")
+    assert core.voice_enabled is True
+
+
+@pytest.mark.parametrize("command, intent, answer", [
+    ("How fast am I going", None, "I can't read the speed at the moment."),
+    ("is it running hot", "engine_temperature", "I can't read the engine temperature at the moment."),
+])
+def test_spoken_command_skips_the_llm(monkeypatch, make_core, command, intent, answer):
+    for module in VOICE_MODULES:
+        pytest.importorskip(module)
+    from voice.system import VoiceSystem
+    
+    core = make_core(True)
+    handler = CommandHandler(core)
+    monkeypatch.setattr(handler.intent_router, "route", lambda text: intent and (intent, 0.9))
+    voice = VoiceSystem(core.config, core.ai, handler)
+    spoken = []
+    monkeypatch.setattr(voice, "_recognize_speech", lambda: command)
+    monkeypatch.setattr(voice, "speak", lambda text, interrupt=False: spoken.append(text))
+    
+    voice._handle_voice_command()
+    assert spoken == ["Yes?", answer]
+    assert core.ai.queries == []
+
+
+@pytest.mark.parametrize("command, intent, answer", [
+    ("How fast am I going", None, "I can't read the speed at the moment."),
+    ("is it running hot", "engine_temperature", "I can't read the engine temperature at the moment."),
+])
+def test_http_command_skips_the_llm(monkeypatch, make_core, command, intent, answer):
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("aiohttp_cors")
+    from api.server import APIServer
+    
+    core = make_core(True)
+    core.command_handler = CommandHandler(core)
+    monkeypatch.setattr(core.command_handler.intent_router, "route", lambda text: intent and (intent, 0.9))
+    core.config.API_HOST, core.config.API_PORT = "127.0.0.1", 0
+    server = APIServer(core.config, core)
+    
+    async def post(command):
+        server.loop = asyncio.get_running_loop()
+        response = await server._handle_voice_command(StubRequest(command))
+        return json.loads(response.text)
+    
+    assert asyncio.run(post(command)) == {"success": True, "text": answer, "message": "Command handled"}
+    assert core.ai.queries == []
+    
+    # Anything else is queued for the AI, its answer is long-polled
+    monkeypatch.setattr(core.command_handler.intent_router, "route", lambda text: None)
+    assert asyncio.run(post("tell me a joke"))["result_url"] == "/api/voice/result/q1"
+    assert core.ai.queries == ["tell me a joke"]
+
+
+def test_command_on_the_event_loop_does_not_wait(make_core):
+    core = make_core(True)
+    core.component_status = {"ai": {"available": True}}
+    core.current_mode, core.current_personality = "Standard", "Revvy OG"
+    core.ai.results = PendingResults()
+    handler = CommandHandler(core)
+    
+    async def ask():
+        return handler.process_command("tell me a joke")
+    
+    # Off the loop the answer is waited for, on it the query is only started
+    assert handler.process_command("tell me a joke") == "I'm still thinking about your request: 'tell me a joke'"
+    assert asyncio.run(ask()) == "I'm still thinking about your request: 'tell me a joke'"
+    assert core.ai.results.timeouts == [20.0, 0]
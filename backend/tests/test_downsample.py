@@ -0,0 +1,110 @@
+"""
+LTTB and min/max downsampling of telemetry series.
+"""
+
+import numpy as np
+import pytest
+from telemetry.downsample import lttb_indices, lttb, minmax, downsample
+
+
+def reference_lttb(x, y, n):
+    """Straightforward per-bucket LTTB, as in Steinarsson's paper"""
+    count = len(x)
+    edges = np.linspace(1, count - 1, n - 1).astype(np.int64)
+    selected = [0]
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            cx, cy = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    return np.array(selected + [count - 1])
+
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(1)
+    x = np.cumsum(rng.uniform(0.05, 0.15, 5000))
+    y = np.sin(x) * 50 + rng.normal(0, 5, len(x))
+    
+    for n in (3, 10, 100, 999):
+        indices = lttb_indices(x, y, n)
+        assert len(indices) == n
+        assert np.all(np.diff(indices) > 0)
+        np.testing.assert_array_equal(indices, reference_lttb(x, y, n))
+
+
+def test_lttb_small_inputs():
+    x = np.arange(10.0)
+    y = x ** 2
+    
+    np.testing.assert_array_equal(lttb_indices(x, y, 10), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(x, y, 50), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(x, y, 2), [0, 9])
+    np.testing.assert_array_equal(lttb_indices(x, y, 1), [0])
+    assert len(lttb_indices(x, y, 0)) == 0
+
+
+def test_lttb_keeps_a_spike():
+    times = np.arange(1000.0)
+    values = np.zeros(1000)
+    values[637] = 100.0
+    
+    t, v = lttb(times, values, 20)
+    assert 637.0 in t
+    assert v.max() == 100.0
+
+
+def test_minmax_keeps_bucket_extremes():
+    rng = np.random.default_rng(2)
+    times = np.cumsum(rng.uniform(0.5, 1.5, 2000))
+    values = rng.normal(0, 1, len(times))
+    values[1234] = 10.0
+    values[77] = -10.0
+    
+    t, v = minmax(times, values, 100)
+    assert len(t) <= 100
+    assert np.all(np.diff(t) > 0)
+    assert times[1234] in t and times[77] in t
+    
+    # Every kept point is a sample, and every bucket's min and max are kept
+    index = np.searchsorted(times, t)
+    np.testing.assert_array_equal(values[index], v)
+    edges = np.linspace(times[0], times[-1], 51)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        inside = (times >= lo) & (times < hi)
+        kept = (t >= lo) & (t < hi)
+        if inside.any():
+            assert v[kept].min() == values[inside].min()
+            assert v[kept].max() == values[inside].max()
+
+
+def test_minmax_with_gaps_and_short_series():
+    # A drive, the car parked for an hour, another drive
+    times = np.concatenate([np.arange(0.0, 100.0), np.arange(3700.0, 3800.0)])
+    values = np.sin(times)
+    
+    t, v = minmax(times, values, 40)
+    assert 0 < len(t) <= 40
+    assert np.all(np.isin(t, times))
+    
+    t, v = minmax(times[:5], values[:5], 40)
+    np.testing.assert_array_equal(t, times[:5])
+
+
+def test_downsample_methods():
+    times = np.arange(500.0)
+    values = np.cos(times / 10)
+    
+    assert len(downsample(times, values, 50)[0]) == 50
+    assert len(downsample(times, values, 50, "minmax")[0]) <= 50
+    with pytest.raises(ValueError):
+        downsample(times, values, 50, "average")
@@ -0,0 +1,93 @@
+"""
+AI engine generation against a fake model: streaming, the generation deadline and
+the conversation history the prompts carry.
+"""
+
+import time
+import threading
+import pytest
+
+pytest.importorskip("llama_cpp")
+from ai.engine import AIEngine
+
+
+class SlowModel:
+    """Yields a word every `delay` seconds, forever"""
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.eval_tokens = []
+        self.stopped = threading.Event()
+    
+    def tokenize(self, text):
+        return list(text)
+    
+    def reset(self):
+        self.eval_tokens = []
+    
+    def eval(self, tokens):
+        self.eval_tokens.extend(tokens)
+    
+    def __call__(self, prompt, **kwargs):
+        assert kwargs["stream"]
+        try:
+            while True:
+                time.sleep(self.delay)
+                yield {"choices": [{"text": "word "}]}
+        finally:
+            self.stopped.set()
+
+
+@pytest.fixture
+def engine(stub_config):
+    engine = AIEngine(stub_config({("ai", "response_cache"): False, ("ai", "prefix_cache_entries"): 0}))
+    engine.llm = SlowModel(0.01)
+    engine.ready.set()
+    return engine
+
+
+def test_generation_stops_at_the_deadline(engine):
+    pieces = []
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        engine.generate("Hello", on_token=lambda text, index: pieces.append(text), deadline=started + 0.2)
+    
+    assert time.monotonic() - started < 1.0
+    assert engine.llm.stopped.is_set()
+    assert 0 < len(pieces) <= 20
+    
+    # The model is free for the next query
+    assert engine.generate_lock.acquire(blocking=False)
+    engine.generate_lock.release()
+
+
+def test_query_past_its_deadline_finishes_with_an_error(engine):
+    answers = []
+    response = engine.run_query("Tell me about turbochargers", callback=lambda qid, text: answers.append(text),
+                                query_id="q1", deadline=time.monotonic() + 0.1)
+    
+    assert answers == [response]
+    result = engine.results.get("q1")
+    assert result["status"] == "error"
+    assert "timed out" in result["error"]
+
+
+def test_history_is_trimmed_in_blocks(engine):
+    engine.config.set("ai", "memory_limit", 4)
+    kept = []
+    prompts = []
+    for turn in range(1, 10):
+        engine._remember(f"q{turn}", f"a{turn}")
+        kept.append([entry["user"] for entry in engine.conversation_history])
+        prompts.append(engine._build_prompt("next").split("\nCurrent Date")[0])
+    
+    # Turns are added until the window is full, then the older half goes at once
+    assert kept == [
+        ["q1"], ["q1", "q2"], ["q1", "q2", "q3"], ["q1", "q2", "q3", "q4"],
+        ["q4", "q5"], ["q4", "q5", "q6"], ["q4", "q5", "q6", "q7"],
+        ["q7", "q8"], ["q7", "q8", "q9"]
+    ]
+    
+    # Between trims every prompt starts with the whole previous one
+    for turn in (1, 2, 3, 5, 6, 8):
+        assert prompts[turn].startswith(prompts[turn - 1])
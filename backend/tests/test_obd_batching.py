@@ -0,0 +1,41 @@
+"""
+Multi-PID batching against the ELM327 emulator, with and without ECUs that only
+answer the first PID of a request.
+"""
+
+POLLED = ["rpm", "speed", "throttle_pos", "engine_load", "coolant_temp", "intake_temp"]
+
+
+def poll(manager, names):
+    return manager.broker.call(lambda: manager._poll(names), 0, "test poll")
+
+
+def test_batches_when_the_ecu_answers_every_pid(connect):
+    emulator, manager = connect()
+    
+    poll(manager, POLLED)
+    assert manager.batch_supported is True
+    
+    before = emulator.get_stats()
+    values = poll(manager, POLLED)
+    after = emulator.get_stats()
+    
+    assert set(values) == set(POLLED)
+    assert after["requests"] - before["requests"] == 1
+
+
+def test_no_multi_pid_falls_back_to_single_queries(connect):
+    emulator, manager = connect("no_multi_pid")
+    
+    values = poll(manager, POLLED)
+    assert manager.batch_supported is False
+    assert set(values) == set(POLLED)
+    
+    # One PID per request from now on, no batch sent along with the singles
+    before = emulator.get_stats()
+    values = poll(manager, POLLED)
+    after = emulator.get_stats()
+    
+    assert set(values) == set(POLLED)
+    assert after["requests"] - before["requests"] == len(POLLED)
+    assert after["pids"] - before["pids"] == len(POLLED)
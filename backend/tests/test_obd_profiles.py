@@ -0,0 +1,56 @@
+"""
+Vehicle profiles against the ELM327 emulator: the VIN they are keyed by and what
+happens when the adapter has moved to another vehicle.
+"""
+
+EMULATOR_VIN = "1REVVY00000000001"
+
+# Profile of another car last seen on the adapter, on a protocol the emulator doesn't speak
+OTHER_CAR = {
+    "key": "WVWZZZ1KZAW000042",
+    "vin": "WVWZZZ1KZAW000042",
+    "protocol": "7",
+    "baudrate": None,
+    "supported_pids": "be1fa813",
+    "available_commands": ["rpm", "speed"],
+    "has_turbo": True,
+    "batch_supported": True
+}
+
+
+def revalidate(manager):
+    port = manager.config.get("obd", "port")
+    manager.broker.call(lambda: manager._revalidate_profile(port), 0, "test revalidate")
+
+
+def test_vin_is_read_in_full(connect):
+    emulator, manager = connect()
+    
+    # Leading 1 and the zeros are part of the VIN
+    assert manager.broker.call(manager._read_vin, 0, "test vin") == EMULATOR_VIN
+    
+    revalidate(manager)
+    assert manager.profile["key"] == EMULATOR_VIN
+    assert manager.profiles.get(EMULATOR_VIN)["vin"] == EMULATOR_VIN
+
+
+def test_no_vin_keys_the_profile_by_fingerprint(connect):
+    emulator, manager = connect("no_vin")
+    
+    revalidate(manager)
+    assert manager.profile["vin"] is None
+    assert manager.profile["key"].startswith("ecu-")
+
+
+def test_failed_fast_reconnect_keeps_the_other_cars_profile(connect):
+    emulator, manager = connect(last_profile=OTHER_CAR)
+    
+    # Fell back to a full connect, nothing of the other car carried over (the
+    # background revalidation may have read this car's VIN already)
+    assert manager.profile["vin"] in (None, EMULATOR_VIN)
+    assert manager.profile["protocol"] == emulator.bus_protocol
+    
+    revalidate(manager)
+    assert manager.profile["key"] == EMULATOR_VIN
+    assert manager.profiles.get(OTHER_CAR["vin"])["protocol"] == OTHER_CAR["protocol"]
+    assert manager.profiles.get(OTHER_CAR["vin"])["supported_pids"] == OTHER_CAR["supported_pids"]
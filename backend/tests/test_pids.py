@@ -0,0 +1,81 @@
+"""
+PID catalog decoders against python-OBD's, and registering extended PIDs.
+"""
+
+import random
+import obd
+import pytest
+from obd import ECU
+from obd.protocols.protocol import Message
+from backend.obd.pids import MODE01, PIDCatalog
+
+CATALOG = PIDCatalog()
+
+# PIDs python-OBD decodes differently on purpose
+DIFFERENT = {"EVAP_VAPOR_PRESSURE"}
+
+
+def message(data):
+    result = Message([])
+    result.ecu = ECU.ENGINE
+    result.data = bytearray(data)
+    return result
+
+
+def python_obd_value(cmd, data):
+    value = cmd([message(data)]).value
+    return float(getattr(value, "magnitude", value))
+
+
+@pytest.mark.parametrize("pid", sorted(pid for pid, entry in MODE01.items()
+                                       if obd.commands.has_pid(1, pid) and entry[0] not in DIFFERENT))
+def test_matches_python_obd(pid):
+    cmd = obd.commands[1][pid]
+    spec = CATALOG.get(0x01, pid)
+    assert spec.name == cmd.name
+    assert spec.size == cmd.bytes - 2
+    
+    rng = random.Random(pid)
+    payloads = [[0] * spec.size, [0xFF] * spec.size] + \
+               [[rng.randrange(256) for _ in range(spec.size)] for _ in range(20)]
+    for payload in payloads:
+        data = [0x41, pid] + payload
+        # python-OBD scales some PIDs by 1/65535 or a rounded factor where J1979 has 1/65536
+        expected = pytest.approx(python_obd_value(cmd, data), rel=1e-3)
+        assert spec.decode_messages([message(data)]) == expected, payload
+
+
+def test_evap_vapor_pressure_is_signed_16_bit():
+    spec = CATALOG.find("EVAP_VAPOR_PRESSURE")
+    cmd = obd.commands.EVAP_VAPOR_PRESSURE
+    
+    # Agree where the low byte is below 0x80
+    data = [0x41, 0x32, 0xFF, 0x38]
+    assert spec.decode_messages([message(data)]) == python_obd_value(cmd, data) == -50.0
+    
+    # 0x0080 is +32 Pa, python-OBD reads B as -128
+    data = [0x41, 0x32, 0x00, 0x80]
+    assert spec.decode_messages([message(data)]) == 32.0
+    assert python_obd_value(cmd, data) == -32.0
+
+
+def test_decode_messages_skips_other_responses():
+    spec = CATALOG.find("RPM")
+    
+    assert spec.decode_messages([message([0x41, 0x0D, 0x32]), message([0x41, 0x0C, 0x1A, 0xF8])]) == 1726.0
+    assert spec.decode_messages([message([0x41, 0x0C, 0x1A])]) is None
+    assert spec.decode_messages([message([0x7F, 0x01, 0x12])]) is None
+
+
+def test_extended_pids():
+    catalog = PIDCatalog([
+        {"mode": "22", "pid": "F40C", "name": "TRANS_TEMP", "bytes": 1, "formula": "A - 40",
+         "unit": "degC", "header": "7E1"},
+        {"pid": "1234", "name": "BROKEN", "bytes": 1, "formula": "A + B"},
+    ])
+    
+    spec = catalog.find("trans_temp")
+    assert catalog.extended() == [spec]
+    assert spec.request == b"22F40C"
+    assert spec.decode_messages([message([0x62, 0xF4, 0x0C, 0x82])]) == 90.0
+    assert catalog.find("BROKEN") is None
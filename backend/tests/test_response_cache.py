@@ -0,0 +1,67 @@
+"""
+Which AI answers are cacheable, LRU and TTL eviction and persistence of the response cache.
+"""
+
+import pytest
+from ai.response_cache import ResponseCache
+
+CONTEXT = {"vehicle_data": {"coolant_temp": 92, "fuel_level": 43, "speed": 30, "dtc_codes": ["P0420"]}}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "cache.json"), max_entries=2, ttl=60)
+
+
+@pytest.mark.parametrize("question", [
+    "How much fuel do I have?",
+    "am I low on gas",
+    "how fast am I going",
+    "what's my speed",
+    "how hot is the engine",
+    "is the engine overheating",
+    "what's the coolant temperature",
+    "where am I",
+    "tell me a joke",
+    "why is that",
+])
+def test_live_and_follow_up_questions_are_not_cached(cache, question):
+    assert cache.key(question, "Revvy OG", CONTEXT, "metric") is None
+
+
+def test_key_depends_on_personality_units_and_vehicle_state(cache):
+    key = cache.key("What does P0420 mean?", "Revvy OG", CONTEXT, "metric")
+    assert key is not None
+    assert key == cache.key("what does p0420 mean", "Revvy OG", CONTEXT, "metric")
+    assert key != cache.key("what does p0420 mean", "Kiko", CONTEXT, "metric")
+    assert key != cache.key("what does p0420 mean", "Revvy OG", CONTEXT, "imperial")
+    
+    cleared = {"vehicle_data": dict(CONTEXT["vehicle_data"], dtc_codes=[])}
+    assert key != cache.key("what does p0420 mean", "Revvy OG", cleared, "metric")
+
+
+def test_lru_eviction_and_ttl(cache, monkeypatch):
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+    
+    # b was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    
+    import ai.response_cache as module
+    now = module.time.time()
+    monkeypatch.setattr(module.time, "time", lambda: now + 120)
+    assert cache.get("a") is None
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(path, model="model-a.gguf")
+    cache.put("a", "A")
+    cache.save()
+    
+    assert ResponseCache(path, model="model-a.gguf").get("a") == "A"
+    assert ResponseCache(path, model="model-b.gguf").get("a") is None
@@ -0,0 +1,27 @@
+"""
+Drive simulators shared per config by the mock components.
+"""
+
+import gc
+from simulation import simulator as simulation
+
+
+def test_one_simulator_per_config(stub_config):
+    first, second = stub_config(), stub_config()
+    
+    assert simulation.get_shared_simulator(first) is simulation.get_shared_simulator(first)
+    assert simulation.get_shared_simulator(first) is not simulation.get_shared_simulator(second)
+
+
+def test_simulator_is_dropped_with_its_config(stub_config):
+    config = stub_config()
+    simulator = simulation.get_shared_simulator(config)
+    assert config in simulation._shared
+    count = len(simulation._shared)
+    
+    del config
+    gc.collect()
+    assert len(simulation._shared) == count - 1
+    
+    # A new config never gets the old simulator, even at a reused address
+    assert simulation.get_shared_simulator(stub_config()) is not simulator
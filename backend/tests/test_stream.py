@@ -0,0 +1,84 @@
+"""
+Binary telemetry stream state across subscribes: the frames a client acknowledged
+survive a resubscribe, switching the encoding starts over with a keyframe.
+"""
+
+import asyncio
+import pytest
+from api.stream import TelemetryStream
+from api.telemetry_codec import HEADER, FLAG_KEYFRAME
+
+
+class StubChannel:
+    rate_factor = 1.0
+    
+    def __init__(self):
+        self.frames = []
+    
+    def offer_latest(self, topic, message):
+        self.frames.append(message)
+
+
+class StubFanOut:
+    def __init__(self):
+        self.channels = {}
+    
+    def open(self, websocket):
+        self.channels[websocket] = StubChannel()
+        return self.channels[websocket]
+    
+    def close(self, websocket):
+        self.channels.pop(websocket, None)
+    
+    def close_all(self):
+        self.channels.clear()
+
+
+@pytest.fixture
+def stream():
+    loop = asyncio.new_event_loop()
+    fanout = StubFanOut()
+    data = {"rpm": 800.0, "speed": 0.0}
+    stream = TelemetryStream(loop, fanout, max_rate_hz=1000.0)
+    stream.register_topic("vehicle", lambda: dict(data), "vehicle_data")
+    stream.add_client("ws")
+    yield stream, fanout.channels["ws"], data
+    stream.close()
+    loop.close()
+
+
+def publish(stream, data, **values):
+    data.update(values)
+    stream._on_update("vehicle")
+
+
+def is_keyframe(frame):
+    return bool(HEADER.unpack_from(frame, 0)[1] & FLAG_KEYFRAME)
+
+
+def test_resubscribe_keeps_the_acknowledged_base(stream):
+    stream, channel, data = stream
+    stream.set_encoding("ws", "binary")
+    stream.subscribe("ws", {"vehicle": None})
+    publish(stream, data, rpm=900.0)
+    assert is_keyframe(channel.frames[-1])
+    stream.ack("ws", "vehicle", HEADER.unpack_from(channel.frames[-1], 0)[2])
+    
+    # The client subscribes again (e.g. to add a topic), restating the encoding
+    assert stream.set_encoding("ws", "binary")["vehicle"]["kind"] == 1
+    stream.subscribe("ws", {"vehicle": None, "gps": None})
+    publish(stream, data, rpm=950.0)
+    assert not is_keyframe(channel.frames[-1])
+
+
+def test_switching_encoding_starts_over(stream):
+    stream, channel, data = stream
+    stream.set_encoding("ws", "binary")
+    stream.subscribe("ws", {"vehicle": None})
+    publish(stream, data, rpm=900.0)
+    stream.ack("ws", "vehicle", HEADER.unpack_from(channel.frames[-1], 0)[2])
+    
+    assert stream.set_encoding("ws", "json") is None
+    stream.set_encoding("ws", "binary")
+    publish(stream, data, rpm=950.0)
+    assert is_keyframe(channel.frames[-1])
@@ -0,0 +1,21 @@
+"""
+System monitor without psutil: the API server still starts, metrics are reported
+as unavailable.
+"""
+
+import telemetry.system_monitor as system_monitor
+from telemetry.system_monitor import SystemMonitor
+
+
+def test_without_psutil(monkeypatch, stub_config):
+    monkeypatch.setattr(system_monitor, "psutil", None)
+    
+    monitor = SystemMonitor(stub_config())
+    monitor.start()
+    try:
+        assert monitor.thread is None
+        assert monitor.get_status() == {"available": False, "error": "psutil is not installed"}
+        times, values = monitor.get_history("cpu_percent", 60)
+        assert len(values) == 0
+    finally:
+        monitor.stop()
@@ -0,0 +1,71 @@
+"""
+Binary telemetry frames: keyframes, deltas against an acknowledged frame and the
+JSON trailer of fields outside the schema.
+"""
+
+import struct
+import pytest
+from api.telemetry_codec import TelemetryCodec, HEADER, FLAG_KEYFRAME
+
+BASE = {
+    "rpm": 2150.0, "speed": 54.0, "coolant_temp": 89.5, "fuel_level": 63.25,
+    "last_updated": 1700000000.125, "speed_unit": "km/h", "dtc_codes": [], "has_turbo": True
+}
+
+
+@pytest.fixture
+def codec():
+    return TelemetryCodec("vehicle")
+
+
+def test_keyframe_round_trip(codec):
+    frame = codec.encode(1, BASE, timestamp=5.0)
+    kind, flags, seq, base_seq, timestamp, count, _ = HEADER.unpack_from(frame, 0)
+    assert (kind, flags & FLAG_KEYFRAME, seq, base_seq, timestamp, count) == (1, FLAG_KEYFRAME, 1, 0, 5.0, 5)
+    
+    assert codec.decode(frame) == (1, BASE)
+
+
+def test_delta_carries_only_changes(codec):
+    data = dict(BASE, rpm=2175.0, speed_unit="mph", dtc_codes=["P0420"])
+    del data["has_turbo"]
+    
+    frame = codec.encode(2, data, 1, BASE)
+    assert len(frame) < len(codec.encode(2, data))
+    assert HEADER.unpack_from(frame, 0)[5] == 1      # Only rpm in the fields
+    
+    seq, decoded = codec.decode(frame, {1: BASE})
+    assert seq == 2
+    assert decoded == data
+
+
+def test_delta_chain(codec):
+    states = {}
+    base_seq, base = 0, None
+    for seq in range(1, 20):
+        data = dict(BASE, rpm=2000.0 + seq * 25, last_updated=BASE["last_updated"] + seq * 0.1)
+        if seq % 3 == 0:
+            data["dtc_codes"] = ["P0301"]
+        frame = codec.encode(seq, data, base_seq, base)
+        _, states[seq] = codec.decode(frame, states)
+        assert states[seq] == data
+        
+        # The client acknowledges every other frame
+        if seq % 2:
+            base_seq, base = seq, data
+
+
+def test_values_follow_the_schema_precision(codec):
+    # float32 fields round, timestamps are float64
+    _, decoded = codec.decode(codec.encode(1, {"coolant_temp": 89.3, "last_updated": 1700000000.123456}))
+    assert decoded["coolant_temp"] == struct.unpack("<f", struct.pack("<f", 89.3))[0]
+    assert decoded["last_updated"] == 1700000000.123456
+
+
+def test_unknown_base_and_wrong_topic(codec):
+    delta = codec.encode(2, dict(BASE, rpm=900.0), 1, BASE)
+    with pytest.raises(KeyError):
+        codec.decode(delta, {7: BASE})
+    
+    with pytest.raises(ValueError):
+        TelemetryCodec("gps").decode(codec.encode(1, BASE))
@@ -0,0 +1,78 @@
+"""
+Trip files when writing goes wrong: a failed chunk or a writer that outlives stop().
+"""
+
+import threading
+import numpy as np
+from telemetry.trip_recorder import TripRecorder, TripFile, TRAILER, TRAILER_MAGIC
+
+
+def has_footer(path):
+    with open(path, "rb") as f:
+        return f.read()[-TRAILER.size:].endswith(TRAILER_MAGIC)
+
+
+def drop_footer(path):
+    """Cut the footer off, as if the power had gone before stop()"""
+    with open(path, "rb+") as f:
+        data = f.read()
+        offset, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        assert magic == TRAILER_MAGIC
+        f.truncate(offset)
+
+
+def make_recorder(stub_config, tmp_path):
+    recorder = TripRecorder(stub_config({("telemetry", "trip_directory"): str(tmp_path)}))
+    recorder.start()
+    return recorder
+
+
+def test_names_of_a_failed_chunk_go_with_the_next(monkeypatch, stub_config, tmp_path):
+    recorder = make_recorder(stub_config, tmp_path)
+    write_chunk = recorder._write_chunk
+    failed = []
+    
+    def flaky(*args):
+        if not failed:
+            failed.append(args)
+            raise OSError("No space left on device")
+        return write_chunk(*args)
+    
+    monkeypatch.setattr(recorder, "_write_chunk", flaky)
+    recorder.record({"rpm": 800}, 1.0)
+    with recorder.lock:
+        recorder._flush_locked()
+    recorder.record({"rpm": 900, "speed": 10}, 2.0)
+    recorder.stop()
+    
+    # Without the footer the signal names come from the chunks that made it to disk
+    drop_footer(recorder.path)
+    with TripFile(recorder.path) as trip:
+        assert trip.signals == ["rpm", "speed"]
+        assert list(trip.read("rpm")[1]) == [900]
+        assert list(trip.read("speed")[1]) == [10]
+
+
+def test_no_footer_while_the_writer_is_busy(monkeypatch, stub_config, tmp_path):
+    recorder = make_recorder(stub_config, tmp_path)
+    write_chunk = recorder._write_chunk
+    gate = threading.Event()
+    
+    def stalled(*args):
+        gate.wait(5.0)
+        return write_chunk(*args)
+    
+    monkeypatch.setattr(recorder, "_write_chunk", stalled)
+    writer = recorder.thread
+    monkeypatch.setattr(writer, "join", lambda timeout=None: None)
+    
+    recorder.record({"rpm": 800}, 1.0)
+    recorder.stop()
+    assert not has_footer(recorder.path)
+    
+    # The chunk lands after stop() gave up on the writer, the reader still finds it
+    gate.set()
+    threading.Thread.join(writer, 5.0)
+    with TripFile(recorder.path) as trip:
+        assert trip.sample_count == 1
+        assert np.array_equal(trip.read("rpm")[1], [800])
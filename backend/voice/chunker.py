@@ -0,0 +1,68 @@
+"""
+Revvy AI Companion - Sentence Chunker
+Turns a stream of generated tokens into whole sentences, so text-to-speech can start
+on the first sentence while the rest of the answer is still being generated.
+"""
+
+import re
+import logging
+
+logger = logging.getLogger("SentenceChunker")
+
+# End of a sentence: terminal punctuation, closing quotes or brackets, then a space.
+# "3.5" or "e.g.," don't end one, there is no space right after the period.
+SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+
+# Where to cut a sentence that runs on without an end
+CLAUSE_BREAK = re.compile(r'[,;:—]\s+')
+
+
+class SentenceChunker:
+    """Buffer streamed text and emit(sentence) for each complete sentence"""
+    
+    def __init__(self, emit, min_chars=20, max_chars=200):
+        self.emit = emit
+        self.min_chars = min_chars      # Shorter sentences wait for the next one ("Hi!" "Sure.")
+        self.max_chars = max_chars      # Longer text without an end is cut at a clause
+        self.buffer = ""
+        self.sentences = 0
+    
+    def feed(self, text):
+        """Add streamed text, emits every sentence it completes"""
+        self.buffer += text
+        
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            if match.end() - start >= self.min_chars:
+                self._emit(self.buffer[start:match.end()])
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        
+        while len(self.buffer) > self.max_chars:
+            breaks = [m.end() for m in CLAUSE_BREAK.finditer(self.buffer, 0, self.max_chars)]
+            cut = breaks[-1] if breaks else self.buffer.rfind(" ", 0, self.max_chars) + 1
+            if cut <= 0:
+                break
+            self._emit(self.buffer[:cut])
+            self.buffer = self.buffer[cut:]
+    
+    def flush(self):
+        """Emit whatever is left, at the end of the stream"""
+        self._emit(self.buffer)
+        self.buffer = ""
+    
+    def finish(self, text):
+        """End of an answer whose full text is `text`: emit the rest, or all of it if nothing was streamed"""
+        if not self.sentences and not self.buffer:
+            self.feed(text or "")
+        self.flush()
+    
+    def _emit(self, text):
+        text = text.strip()
+        if not text:
+            return
+        self.sentences += 1
+        try:
+            self.emit(text)
+        except Exception as e:
+            logger.error(f"Error emitting sentence: {e}")
@@ -1,12 +1,29 @@
 import re
+import asyncio
 import logging
 import threading
 import time
 from datetime import datetime
+from .intent_router import IntentRouter
 
 # Set up logger
 logger = logging.getLogger("CommandHandler")
 
+# Below this the fuel answer suggests filling up (percent)
+LOW_FUEL_PERCENT = 15
+
+# Coolant temperatures (Celsius) of a cold and an overheating engine
+ENGINE_COLD_TEMP = 60
+ENGINE_HOT_TEMP = 105
+
+def _on_event_loop():
+    """True on a thread running an asyncio loop, which must not block"""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
 class CommandHandler:
     """Handles voice and text commands for the Revvy AI Companion"""
     
@@ -52,37 +69,39 @@ class CommandHandler:
             r'(clear|reset) (the )?(check engine|warning|trouble|diagnostic|dtc|error) (light|code|codes|issues|problems)': self._handle_clear_dtc
         }
         
+        # Commands the patterns miss are matched by meaning before they go to the AI
+        self.intent_handlers = {
+            "vehicle_status": (self._handle_vehicle_status, ()),
+            "speed": (self._handle_speed_request, ()),
+            "engine_info": (self._handle_engine_info, ()),
+            "engine_temperature": (self._handle_engine_temperature, ()),
+            "fuel": (self._handle_fuel_request, ()),
+            "diagnostic_codes": (self._handle_diagnostic_codes, ()),
+            "location": (self._handle_location_request, ()),
+            "help": (self._handle_help_request, ()),
+            "volume_up": (self._handle_volume_change, ("increase",)),
+            "volume_down": (self._handle_volume_change, ("decrease",)),
+            "voice_off": (self._handle_voice_toggle, (False,)),
+            "voice_on": (self._handle_voice_toggle, (True,)),
+            "units_metric": (self._handle_unit_toggle, ("metric",)),
+            "units_imperial": (self._handle_unit_toggle, ("imperial",))
+        }
+        self.intent_router = IntentRouter(revvy_core.config)
+        self.intent_router.start()
+        
         logger.info("Command Handler initialized")
     
-    def process_command(self, command, context=None):
-        """Process a user command using pattern matching and AI fallback"""
+    def process_command(self, command, context=None, timeout=None):
+        """Process a user command using pattern matching and AI fallback
+        
+        An AI answer is waited for up to `timeout` seconds (ai.command_timeout by default), never
+        on an event loop thread: there the query is only started, its answer is polled by query_id.
+        """
         logger.info(f"Processing command: {command}")
         
-        # Check for direct pattern matches first
-        for pattern, handler in self.command_patterns.items():
-            match = re.search(pattern, command.lower())
-            if match:
-                logger.debug(f"Command matched pattern: {pattern}")
-                
-                # Extract the parameters from the match
-                if "mode" in pattern:
-                    mode = match.group(3)
-                    return handler(mode)
-                elif "personality" in pattern:
-                    personality = match.group(3)
-                    return handler(personality)
-                elif "metric|imperial" in pattern:
-                    unit_system = match.group(3)
-                    return handler(unit_system)
-                elif "volume (to|at)" in pattern:
-                    volume = int(match.group(4))
-                    return handler(volume)
-                elif "volume|sound" in pattern:
-                    direction = match.group(1)
-                    return handler(direction)
-                else:
-                    # No parameters needed for this command
-                    return handler()
+        response = self.handle_locally(command)
+        if response is not None:
+            return response
         
         # No direct pattern match, use AI to interpret the command
         if self.revvy_core.ai and self.revvy_core.component_status['ai']['available']:
@@ -104,15 +123,72 @@ class CommandHandler:
                 'voice_enabled': self.revvy_core.voice_enabled
             }
             
-            # Process with AI and return response
+            # Process with AI and wait for the answer in the result store
             query_id = self.revvy_core.ai.query(command, ai_context)
             
-            # This would normally be handled through a callback mechanism
-            # For synchronous response, we'd need to implement a wait mechanism
-            return f"I'm thinking about your request: '{command}'"
+            results = getattr(self.revvy_core.ai, "results", None)
+            if timeout is None:
+                timeout = self.revvy_core.config.get("ai", "command_timeout", 20.0)
+            if _on_event_loop():
+                timeout = 0
+            result = results.wait(query_id, timeout) if results else None
+            
+            if result and result['status'] == 'done':
+                return result['response']
+            if result and result['status'] == 'error':
+                logger.error(f"AI query {query_id} failed: {result['error']}")
+                return "I'm sorry, something went wrong while thinking about that."
+            
+            # Still generating, the answer stays available under its query_id
+            return f"I'm still thinking about your request: '{command}'"
         else:
             return "I'm sorry, I couldn't understand that command and my AI processing is not available."
     
+    def handle_locally(self, command):
+        """Answer a command from the patterns or a routed intent, None if it needs the AI
+        
+        Blocks for the routing and any vehicle read, call it off the event loop.
+        """
+        # Check for direct pattern matches first
+        for pattern, handler in self.command_patterns.items():
+            match = re.search(pattern, command.lower())
+            if match:
+                logger.debug(f"Command matched pattern: {pattern}")
+                
+                # Extract the parameters from the match
+                if "mode" in pattern:
+                    mode = match.groups()[-1]
+                    return handler(mode)
+                elif "personality" in pattern:
+                    personality = match.group(3)
+                    return handler(personality)
+                elif "metric|imperial" in pattern:
+                    unit_system = "metric" if "metric" in match.group(0) else "imperial"
+                    return handler(unit_system)
+                elif "volume (to|at)" in pattern:
+                    volume = int(match.group(4))
+                    return handler(volume)
+                elif "volume|sound" in pattern:
+                    direction = match.group(1)
+                    return handler(direction)
+                elif "voice|speech" in pattern:
+                    return handler(match.group(2) == "on")
+                elif "mute|unmute" in pattern:
+                    return handler(match.group(1) == "unmute")
+                else:
+                    # No parameters needed for this command
+                    return handler()
+        
+        # Close enough in meaning to a command, a few milliseconds instead of a generation
+        routed = self.intent_router.route(command)
+        if routed:
+            intent, score = routed
+            logger.debug(f"Command routed to intent {intent} ({score:.2f})")
+            handler, args = self.intent_handlers[intent]
+            return handler(*args)
+        
+        return None
+    
     def _handle_mode_change(self, mode):
         """Handle changing the operating mode"""
         available_modes = self.revvy_core.config.AVAILABLE_MODES
@@ -159,13 +235,118 @@ class CommandHandler:
         else:
             return f"I couldn't find a personality matching '{personality}'. Available personalities include Revvy OG, Turbo Revvy, and others."
     
-    def _handle_voice_toggle(self, command=None):
-        """Handle toggling voice on/off"""
-        # Figure out the requested state
-        voice_on = True
-        if command and any(term in command.lower() for term in ["off", "mute"]):
-            voice_on = False
+    def _handle_unit_toggle(self, unit_system):
+        """Handle switching between metric and imperial units"""
+        if self.revvy_core.config.get("display", "unit_system") != unit_system:
+            self.revvy_core.config.set("display", "unit_system", unit_system)
+            
+            # Keep the individual units in line with the system
+            if unit_system == "metric":
+                units = {"temperature_unit": "celsius", "pressure_unit": "kpa", "distance_unit": "km", "speed_unit": "kph"}
+            else:
+                units = {"temperature_unit": "fahrenheit", "pressure_unit": "psi", "distance_unit": "mi", "speed_unit": "mph"}
+            for key, value in units.items():
+                self.revvy_core.config.set("display", key, value)
+        
+        return f"Using {unit_system} units."
+    
+    def _vehicle_data(self):
+        """Current vehicle data in the user's units, None without an OBD connection"""
+        if not self.revvy_core.obd or not self.revvy_core.obd.is_connected():
+            return None
+        return self.revvy_core.obd.get_vehicle_data_with_units()
+    
+    def _handle_vehicle_status(self):
+        """Handle request for an overall vehicle status"""
+        data = self._vehicle_data()
+        if data is None:
+            return "I can't access the vehicle data at the moment."
+        
+        parts = []
+        if data.get("speed") is not None:
+            parts.append(f"you're doing {round(data['speed'])} {data.get('speed_unit', 'km/h')}")
+        if data.get("rpm") is not None:
+            parts.append(f"the engine is at {round(data['rpm'])} RPM")
+        if data.get("coolant_temp") is not None:
+            parts.append(f"coolant is {round(data['coolant_temp'])}°{data.get('coolant_temp_unit', 'C')}")
+        if data.get("fuel_level") is not None:
+            parts.append(f"fuel is at {round(data['fuel_level'])}%")
         
+        response = f"Right now {', '.join(parts)}." if parts else "I don't have any readings from the vehicle yet."
+        
+        # Mention the check engine light either way
+        dtc_codes = data.get("dtc_codes") or []
+        if dtc_codes:
+            response += f" The check engine light is on with {len(dtc_codes)} code{'s' if len(dtc_codes) > 1 else ''}."
+        else:
+            response += " No trouble codes."
+        return response
+    
+    def _handle_speed_request(self):
+        """Handle request for the current speed"""
+        data = self._vehicle_data()
+        if data is None or data.get("speed") is None:
+            return "I can't read the speed at the moment."
+        return f"You're doing {round(data['speed'])} {data.get('speed_unit', 'km/h')}."
+    
+    def _handle_engine_info(self):
+        """Handle request for engine RPM, load and temperature"""
+        data = self._vehicle_data()
+        if data is None or data.get("rpm") is None:
+            return "I can't read the engine data at the moment."
+        
+        response = f"The engine is at {round(data['rpm'])} RPM"
+        if data.get("engine_load") is not None:
+            response += f" with {round(data['engine_load'])}% load"
+        response += "."
+        if data.get("coolant_temp") is not None:
+            response += f" Coolant is {round(data['coolant_temp'])}°{data.get('coolant_temp_unit', 'C')}."
+        return response
+    
+    def _handle_engine_temperature(self):
+        """Handle request for the engine temperature"""
+        data = self._vehicle_data()
+        if data is None or data.get("coolant_temp") is None:
+            return "I can't read the engine temperature at the moment."
+        
+        unit = data.get("coolant_temp_unit", "C")
+        response = f"Coolant is at {round(data['coolant_temp'])}°{unit}"
+        if data.get("oil_temp") is not None:
+            response += f" and oil at {round(data['oil_temp'])}°{data.get('oil_temp_unit', unit)}"
+        
+        # Judged in Celsius, whatever the display units
+        celsius = self.revvy_core.obd.get_coolant_temp()
+        if celsius is not None and celsius >= ENGINE_HOT_TEMP:
+            response += ". That's hot, pull over safely and let the engine cool down."
+        elif celsius is not None and celsius < ENGINE_COLD_TEMP:
+            response += ". It's still warming up, go easy on it for now."
+        else:
+            response += ", right where it should be."
+        return response
+    
+    def _handle_fuel_request(self):
+        """Handle request for the fuel level"""
+        data = self._vehicle_data()
+        if data is None or data.get("fuel_level") is None:
+            return "I can't read the fuel level at the moment."
+        
+        fuel_level = round(data["fuel_level"])
+        if fuel_level < LOW_FUEL_PERCENT:
+            return f"Fuel is low at {fuel_level}%. Time to find a gas station."
+        return f"You have {fuel_level}% fuel left."
+    
+    def _handle_diagnostic_codes(self):
+        """Handle request for diagnostic trouble codes"""
+        if not self.revvy_core.obd or not self.revvy_core.obd.is_connected():
+            return "I can't access the vehicle diagnostic system at the moment."
+        
+        dtc_codes = self.revvy_core.obd.get_dtc_codes()
+        if not dtc_codes:
+            return "There are no diagnostic trouble codes. The check engine light should be off."
+        return f"I found {len(dtc_codes)} diagnostic trouble code{'s' if len(dtc_codes) > 1 else ''}: {', '.join(dtc_codes)}. Ask me about any of them for details."
+    
+    def _handle_voice_toggle(self, voice_on=True):
+        """Handle turning voice output on or off"""
         # Toggle voice state
         current_state = self.revvy_core.voice_enabled
         if voice_on != current_state:
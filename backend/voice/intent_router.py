@@ -0,0 +1,255 @@
+"""
+Revvy AI Companion - Intent Router
+Routes commands that miss the exact command patterns ("how hot is my engine", "am I
+low on gas") to their handler by meaning instead of the LLM. A small sentence
+embedding model encodes the command and compares it with the embedded exemplars of
+each intent, kept in an index on disk. Only a confident, unambiguous match is routed;
+open-ended questions fall through to the LLM.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("IntentRouter")
+
+# Commands that look like an intent but need the LLM's answer
+INTENT_LLM = "llm"
+
+# A handful of phrasings per intent, the router generalizes from them. Actions that
+# can't be undone (clearing codes, restart, shutdown) are left to the exact patterns.
+INTENT_EXEMPLARS = {
+    "vehicle_status": [
+        "how is my car doing",
+        "give me a status report",
+        "is everything okay with the car",
+        "how's the vehicle",
+        "car status",
+        "run a quick check on the car",
+    ],
+    "speed": [
+        "how fast am I going",
+        "what speed are we doing",
+        "am I speeding",
+        "current speed",
+        "how quick are we moving",
+    ],
+    "engine_info": [
+        "how is the engine running",
+        "what are the revs",
+        "engine rpm",
+        "how hard is the engine working",
+        "what's the engine load",
+    ],
+    "engine_temperature": [
+        "how hot is my engine",
+        "is the engine overheating",
+        "what's the coolant temperature",
+        "engine temp",
+        "is the engine warmed up yet",
+        "how warm is the motor",
+    ],
+    "fuel": [
+        "am I low on gas",
+        "how much fuel do I have",
+        "do I need to fill up",
+        "fuel level",
+        "how much gas is left in the tank",
+        "should I stop for petrol",
+    ],
+    "diagnostic_codes": [
+        "why is the check engine light on",
+        "are there any trouble codes",
+        "what codes does the car have",
+        "any warnings on the dashboard",
+        "is anything wrong with the car",
+    ],
+    "location": [
+        "where are we",
+        "what's my location",
+        "where am I right now",
+        "gps position",
+    ],
+    "help": [
+        "what can you do",
+        "what can I ask you",
+        "how do I use you",
+        "list your features",
+    ],
+    "volume_up": [
+        "louder please",
+        "I can't hear you",
+        "speak up",
+        "volume up",
+    ],
+    "volume_down": [
+        "quieter please",
+        "you're too loud",
+        "turn it down a bit",
+        "volume down",
+    ],
+    "voice_off": [
+        "stop talking",
+        "be quiet",
+        "shut up for a while",
+        "silence please",
+    ],
+    "voice_on": [
+        "you can talk again",
+        "start talking again",
+        "unmute",
+        "speak to me again",
+    ],
+    "units_metric": [
+        "show kilometers and celsius",
+        "use kilometers",
+        "switch to metric",
+    ],
+    "units_imperial": [
+        "show miles and fahrenheit",
+        "use miles",
+        "switch to imperial",
+    ],
+    INTENT_LLM: [
+        "why does my car make a squeaking noise when I brake",
+        "what oil should I use in my car",
+        "tell me a joke",
+        "how do turbochargers work",
+        "what does a catalytic converter do",
+        "how can I improve my fuel economy",
+        "what does code P0420 mean",
+        "explain what my engine temperature means for the turbo",
+        "what's a good song for a road trip",
+        "how often should I rotate my tires",
+    ],
+}
+
+
+class IntentRouter:
+    """Embedding nearest-neighbour intent matcher with a confidence threshold"""
+    
+    def __init__(self, config, exemplars=None):
+        self.config = config
+        self.model_name = self.config.get("voice", "intent_model", "./ai/models/all-MiniLM-L6-v2")
+        self.index_path = self.config.get("voice", "intent_index_path", "./data/intent_index.npz")
+        self.threshold = self.config.get("voice", "intent_threshold", 0.6)
+        self.margin = self.config.get("voice", "intent_margin", 0.05)
+        self.exemplars = exemplars or INTENT_EXEMPLARS
+        
+        self.model = None
+        self.intents = []           # Intent names, in index order
+        self.embeddings = None      # Unit vectors of the exemplars, grouped by intent
+        self.starts = None          # Index of each intent's first exemplar
+        self.ready = threading.Event()
+        self.loader = None
+        
+        # Metrics
+        self.routed = 0
+        self.passed = 0
+        self.route_time = 0.0       # Moving average of seconds per route()
+    
+    def start(self):
+        """Load the model and index in the background, commands go to the LLM until then"""
+        if self.loader or not self.config.get("voice", "intent_routing", True):
+            return
+        self.loader = threading.Thread(target=self._load, name="IntentRouterLoader")
+        self.loader.daemon = True
+        self.loader.start()
+    
+    def is_ready(self):
+        return self.ready.is_set()
+    
+    def _load(self):
+        try:
+            started = time.monotonic()
+            # torch takes seconds to import on a Pi, keep it off the startup path
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_name, device="cpu")
+            
+            if not self._read_index():
+                self._build_index()
+            self.ready.set()
+            logger.info(f"Intent router ready in {time.monotonic() - started:.1f} s "
+                        f"({len(self.intents)} intents, {len(self.embeddings)} exemplars)")
+        except Exception as e:
+            logger.error(f"Intent router unavailable, commands go to the AI: {e}")
+    
+    def _signature(self):
+        """Changes whenever the model or the exemplars do, so a stale index is rebuilt"""
+        source = json.dumps({"model": self.model_name, "exemplars": self.exemplars}, sort_keys=True)
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+    
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with np.load(self.index_path) as index:
+                if str(index["signature"]) != self._signature():
+                    logger.info("Intent index is out of date, rebuilding it")
+                    return False
+                self._set_index(list(index["intents"]), index["embeddings"], index["starts"])
+            return True
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Could not read intent index {self.index_path}: {e}")
+            return False
+    
+    def _build_index(self):
+        intents = list(self.exemplars)
+        phrases = [phrase for intent in intents for phrase in self.exemplars[intent]]
+        starts = np.cumsum([0] + [len(self.exemplars[intent]) for intent in intents[:-1]])
+        embeddings = self.model.encode(phrases, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+        self._set_index(intents, embeddings, starts)
+        
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            temp_path = self.index_path + ".tmp.npz"
+            np.savez(temp_path, signature=self._signature(), intents=np.array(intents),
+                     embeddings=embeddings, starts=starts)
+            os.replace(temp_path, self.index_path)
+            logger.info(f"Intent index saved to {self.index_path}")
+        except OSError as e:
+            logger.warning(f"Could not save intent index: {e}")
+    
+    def _set_index(self, intents, embeddings, starts):
+        self.intents = [str(intent) for intent in intents]
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.starts = np.asarray(starts, dtype=np.intp)
+    
+    def scores(self, text):
+        """Best cosine similarity of text to each intent's exemplars, {intent: score}"""
+        query = self.model.encode([text], normalize_embeddings=True, convert_to_numpy=True)[0]
+        similarity = self.embeddings @ query.astype(np.float32)
+        best = np.maximum.reduceat(similarity, self.starts)
+        return dict(zip(self.intents, best.tolist()))
+    
+    def route(self, text):
+        """Get (intent, score) for a confident match of a command, None if it should go to the LLM"""
+        if not self.ready.is_set() or not text:
+            return None
+        
+        started = time.monotonic()
+        ranked = sorted(self.scores(text.lower()).items(), key=lambda item: item[1], reverse=True)
+        self.route_time += (time.monotonic() - started - self.route_time) * 0.2
+        
+        intent, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if intent == INTENT_LLM or score < self.threshold or score - runner_up < self.margin:
+            self.passed += 1
+            logger.debug(f"No intent for '{text}' (best {intent} {score:.2f}, next {runner_up:.2f})")
+            return None
+        
+        self.routed += 1
+        logger.debug(f"Routed '{text}' to {intent} ({score:.2f})")
+        return intent, score
+    
+    def get_stats(self):
+        return {
+            "ready": self.ready.is_set(),
+            "routed": self.routed,
+            "passed_to_ai": self.passed,
+            "route_ms": round(self.route_time * 1000, 2)
+        }
@@ -17,15 +17,17 @@ import pvporcupine
 from pvrecorder import PvRecorder
 import pyttsx3
 import speech_recognition as sr
+from .chunker import SentenceChunker
 
 logger = logging.getLogger("VoiceSystem")
 
 class VoiceSystem:
     """Handles voice interactions with wake word detection and TTS"""
     
-    def __init__(self, config, ai_engine):
+    def __init__(self, config, ai_engine, command_handler=None):
         self.config = config
         self.ai_engine = ai_engine
+        self.command_handler = command_handler
         self.running = False
         self.thread = None
         self.wake_word_thread = None
@@ -206,8 +208,19 @@ class VoiceSystem:
             if command:
                 logger.info(f"Recognized command: {command}")
                 
-                # Process command with AI
-                self.ai_engine.query(command, callback=self._handle_ai_response)
+                # Commands and questions about the car are answered right away, without the AI
+                response = self.command_handler.handle_locally(command) if self.command_handler else None
+                if response is not None:
+                    self.speak(response)
+                    return
+                
+                # Process command with AI, each sentence is spoken as soon as it is generated
+                chunker = SentenceChunker(self.speak)
+                self.ai_engine.query(
+                    command,
+                    callback=lambda query_id, response: self._handle_ai_response(query_id, response, chunker),
+                    on_token=lambda query_id, text, index: chunker.feed(text)
+                )
             else:
                 logger.info("No speech recognized")
                 self.speak("I didn't catch that.")
@@ -250,9 +263,12 @@ class VoiceSystem:
             logger.error(f"Error recognizing speech: {e}")
             return None
     
-    def _handle_ai_response(self, query_id, response_text):
+    def _handle_ai_response(self, query_id, response_text, chunker=None):
         """Handle AI response to voice command"""
-        if response_text:
+        if chunker:
+            # Speak what the streamed sentences didn't cover
+            chunker.finish(response_text)
+        elif response_text:
             # Speak the response
             self.speak(response_text)
     
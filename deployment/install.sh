@@ -65,9 +65,9 @@ pip install \
   SpeechRecognition \
   obd \
   llama-cpp-python \
-  websockets \
   aiohttp \
-  aiohttp_cors
+  aiohttp_cors \
+  sentence-transformers
 
 # Install frontend dependencies
 echo "Installing frontend dependencies..."
@@ -141,6 +141,13 @@ if [ ! -f "/opt/revvy/ai/models/mistral-7b-instruct-q4_k_m.gguf" ]; then
   curl -L https://huggingface.co/TheBloke/Mistral-7B-Instruct-v0.2-GGUF/resolve/main/mistral-7b-instruct-v0.2.Q4_K_M.gguf -o /opt/revvy/ai/models/mistral-7b-instruct-q4_k_m.gguf
 fi
 
+# Download the intent routing model, the car has no network to fetch it by name at startup
+if [ ! -d "/opt/revvy/ai/models/all-MiniLM-L6-v2" ]; then
+  echo "Downloading intent routing model..."
+  mkdir -p /opt/revvy/ai/models
+  python3 -c "from sentence_transformers import SentenceTransformer; SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2').save('/opt/revvy/ai/models/all-MiniLM-L6-v2')"
+fi
+
 echo "Installation complete!"
 echo "Run the setup wizard to configure your OBD connection:"
 echo "  sudo python3 /opt/revvy/backend/setup.py"
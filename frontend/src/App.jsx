@@ -41,20 +41,40 @@ function App() {
         setConnected(true);
         console.log('Connected to Revvy backend');
         
-        // Get initial data
-        const data = await API.getVehicleData();
-        setVehicleData(data);
+        // Get initial data in one request
+        let initial = {};
+        try {
+          initial = await API.getBatch(['vehicle', 'mode', 'achievements', 'units']);
+        } catch (error) {
+          console.error('Batch request failed, loading resources one by one:', error);
+        }
+        
+        // Resources the batch couldn't build are fetched on their own
+        const load = async (name, get) => {
+          if (initial[name] && !initial[name].error) return initial[name];
+          try {
+            const data = await get();
+            return data && !data.error ? data : null;
+          } catch (error) {
+            return null;
+          }
+        };
+        
+        const vehicle = await load('vehicle', () => API.getVehicleData());
+        if (vehicle) setVehicleData(vehicle);
         
-        const mode = await API.getCurrentMode();
-        setCurrentMode(mode.mode);
-        setPersonality(mode.personality);
+        const mode = await load('mode', () => API.getCurrentMode());
+        if (mode) {
+          setCurrentMode(mode.mode);
+          setPersonality(mode.personality);
+        }
         
-        const achievementData = await API.getAchievements();
-        setAchievements(achievementData);
+        const achievementData = await load('achievements', () => API.getAchievements());
+        if (achievementData) setAchievements(achievementData);
         
         // Get initial unit settings
-        const settings = await API.getUnitSettings();
-        setUnitSystem(settings.unit_system);
+        const settings = await load('units', () => API.getUnitSettings());
+        if (settings) setUnitSystem(settings.unit_system);
         
       } catch (error) {
         console.error('Failed to connect to Revvy backend:', error);
@@ -63,17 +83,12 @@ function App() {
     
     connectToBackend();
     
-    // Set up interval to refresh data
-    const dataInterval = setInterval(async () => {
-      if (connected) {
-        try {
-          const data = await API.getVehicleData();
-          setVehicleData(data);
-        } catch (error) {
-          console.error('Error fetching vehicle data:', error);
-        }
-      }
-    }, 1000);
+    // Vehicle data is pushed by the backend as soon as the OBD loop publishes it
+    const handleVehicleData = (message) => {
+      setVehicleData(message.data);
+    };
+    API.onMessage('vehicle_data', handleVehicleData);
+    API.subscribe({ vehicle: 10, ai: null });
     
     // Set up event listeners
     API.onMessage('mode_changed', (data) => {
@@ -135,13 +150,13 @@ function App() {
       
       return () => {
         window.removeEventListener('keydown', handleKeyDown);
-        clearInterval(dataInterval);
+        API.offMessage('vehicle_data', handleVehicleData);
         API.disconnect();
       };
     }
     
     return () => {
-      clearInterval(dataInterval);
+      API.offMessage('vehicle_data', handleVehicleData);
       API.disconnect();
       API.offMessage('unit_system_changed');
     };
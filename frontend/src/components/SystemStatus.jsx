@@ -21,26 +21,33 @@ const SystemStatus = () => {
   const [expanded, setExpanded] = useState(false);
   
   useEffect(() => {
-    // Get initial status
+    // Get initial status, then the backend pushes updates
     fetchSystemStatus();
     
-    // Poll for updates
-    const interval = setInterval(fetchSystemStatus, 10000);
+    const handleSystemStatus = (message) => {
+      applySystemStatus(message.data);
+    };
     
-    return () => clearInterval(interval);
+    API.onMessage('system_status', handleSystemStatus);
+    API.subscribe({ system: 1 });
+    
+    return () => {
+      API.offMessage('system_status', handleSystemStatus);
+    };
   }, []);
   
+  const applySystemStatus = (status) => {
+    setSystemStatus(prev => ({
+      ...prev,
+      ...status,
+      ...(status.system_metrics || {})
+    }));
+  };
+  
   const fetchSystemStatus = async () => {
     try {
-      const status = await API.getStatus();
-      
-      // Add additional system metrics
-      const metrics = await API.getSystemMetrics();
-      
-      setSystemStatus({
-        ...status,
-        ...metrics
-      });
+      const status = await API.getSystemStatus();
+      applySystemStatus(status);
     } catch (error) {
       console.error('Failed to fetch system status:', error);
     }
@@ -15,26 +15,44 @@ const SystemStatusBar = () => {
   const [retrying, setRetrying] = useState(false);
   
   useEffect(() => {
-    // Initial fetch
+    // Initial fetch, then the backend pushes status changes
     fetchSystemStatus();
     
-    // Set up periodic status check
-    const interval = setInterval(fetchSystemStatus, 10000);
+    const handleSystemStatus = (message) => {
+      applySystemStatus(message.data);
+    };
     
-    return () => clearInterval(interval);
+    const handleConnectionChanged = (message) => {
+      setStatus(prev => ({
+        ...prev,
+        serverConnection: message.connected
+      }));
+    };
+    
+    API.onMessage('system_status', handleSystemStatus);
+    API.onMessage('connection_changed', handleConnectionChanged);
+    API.subscribe({ system: 1 });
+    
+    return () => {
+      API.offMessage('system_status', handleSystemStatus);
+      API.offMessage('connection_changed', handleConnectionChanged);
+    };
   }, []);
   
+  const applySystemStatus = (systemStatus) => {
+    setStatus({
+      obd: systemStatus.obd_connected,
+      gps: systemStatus.gps_active,
+      voice: systemStatus.voice_enabled,
+      ai: systemStatus.ai_available,
+      serverConnection: true
+    });
+  };
+  
   const fetchSystemStatus = async () => {
     try {
       const systemStatus = await API.getSystemStatus();
-      
-      setStatus({
-        obd: systemStatus.obd_connected,
-        gps: systemStatus.gps_active,
-        voice: systemStatus.voice_enabled,
-        ai: systemStatus.ai_available,
-        serverConnection: true
-      });
+      applySystemStatus(systemStatus);
     } catch (error) {
       console.error('Error fetching system status:', error);
       setStatus(prev => ({
@@ -10,11 +10,23 @@ class API {
     
     // WebSocket connection
     this.ws = null;
-    this.wsUrl = 'ws://localhost:5001';
+    this.wsUrl = 'ws://localhost:5000/ws';
     
     // Event listeners
     this.eventListeners = {};
     
+    // Stream topics and requested max rates (Hz), re-sent after every reconnect
+    this.subscriptions = {};
+    
+    // Telemetry frame encoding: 'binary' (compact delta frames) or 'json'
+    this.encoding = 'binary';
+    this.binarySchemas = {};
+    this.binaryStates = {};
+    
+    // Last version of each batch resource and its ETag, unchanged ones aren't sent again
+    this.batchCache = {};
+    this.batchEtags = {};
+    
     // Connection status
     this.connected = false;
     
@@ -85,6 +97,7 @@ class API {
     
     try {
       this.ws = new WebSocket(this.wsUrl);
+      this.ws.binaryType = 'arraybuffer';
       
       this.ws.onopen = () => {
         console.log('WebSocket connected');
@@ -96,15 +109,22 @@ class API {
           this.reconnectTimer = null;
         }
         
-        // Subscribe to events
-        this.ws.send(JSON.stringify({
-          type: 'subscribe',
-          events: ['vehicle_data', 'mode_changed', 'notification', 'achievement_unlocked', 'unit_system_changed']
-        }));
+        // Resume the topic subscriptions made so far, delta frames start over from a keyframe
+        this.binaryStates = {};
+        this.sendSubscriptions();
+        this.handleWebSocketMessage({ type: 'connection_changed', connected: true });
       };
       
       this.ws.onmessage = (event) => {
         try {
+          if (event.data instanceof ArrayBuffer) {
+            const message = this.decodeBinaryFrame(event.data);
+            if (message) {
+              this.handleWebSocketMessage(message);
+            }
+            return;
+          }
+          
           const data = JSON.parse(event.data);
           this.handleWebSocketMessage(data);
         } catch (error) {
@@ -116,6 +136,7 @@ class API {
         console.log('WebSocket disconnected');
         this.connected = false;
         this.ws = null;
+        this.handleWebSocketMessage({ type: 'connection_changed', connected: false });
         
         // Attempt to reconnect
         if (!this.reconnectTimer) {
@@ -149,6 +170,13 @@ class API {
   handleWebSocketMessage(data) {
     const messageType = data.type;
     
+    // Schemas for binary frames arrive with the subscription reply
+    if (messageType === 'subscribed' && data.schemas) {
+      Object.entries(data.schemas).forEach(([topic, schema]) => {
+        this.binarySchemas[schema.kind] = { topic, fields: schema.fields };
+      });
+    }
+    
     // Call event listeners
     if (messageType && this.eventListeners[messageType]) {
       this.eventListeners[messageType].forEach(callback => {
@@ -157,6 +185,103 @@ class API {
     }
   }
   
+  /**
+   * Subscribe to pushed topics, e.g. { vehicle: 10, system: 1 } (max rate in Hz, null for the server default)
+   * or with a view, e.g. { vehicle: { max_rate: 20, fields: ['rpm'], units: 'imperial' } }
+   */
+  subscribe(topics) {
+    this.subscriptions = { ...this.subscriptions, ...topics };
+    this.sendSubscriptions(topics);
+  }
+  
+  /**
+   * Stop receiving pushed topics
+   */
+  unsubscribe(topics) {
+    topics.forEach(topic => delete this.subscriptions[topic]);
+    
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.sendWebSocketMessage({ type: 'unsubscribe', topics });
+    }
+  }
+  
+  /**
+   * Send topic subscriptions (all of them by default) if the WebSocket is open
+   */
+  sendSubscriptions(topics = this.subscriptions) {
+    if (!this.ws || this.ws.readyState !== WebSocket.OPEN || Object.keys(topics).length === 0) {
+      return;
+    }
+    
+    const request = {};
+    Object.entries(topics).forEach(([topic, options]) => {
+      request[topic] = (options !== null && typeof options === 'object') ? options : { max_rate: options };
+    });
+    
+    this.sendWebSocketMessage({ type: 'subscribe', topics: request, encoding: this.encoding });
+  }
+  
+  /**
+   * Decode a binary telemetry frame (see backend/api/telemetry_codec.py) into a JSON-style message
+   */
+  decodeBinaryFrame(buffer) {
+    const view = new DataView(buffer);
+    const kind = view.getUint8(0);
+    const flags = view.getUint8(1);
+    const seq = view.getUint32(2, true);
+    const baseSeq = view.getUint32(6, true);
+    const count = view.getUint8(18);
+    const trailerLength = view.getUint16(19, true);
+    
+    const schema = this.binarySchemas[kind];
+    if (!schema) {
+      return null;
+    }
+    
+    // Deltas apply on top of a frame we acknowledged earlier
+    const states = this.binaryStates[schema.topic] || (this.binaryStates[schema.topic] = new Map());
+    let data;
+    if (flags & 0x01) {
+      data = {};
+    } else if (states.has(baseSeq)) {
+      data = { ...states.get(baseSeq) };
+    } else {
+      return null;
+    }
+    
+    let offset = 21;
+    for (let i = 0; i < count; i++) {
+      const [name, format] = schema.fields[view.getUint8(offset)];
+      if (format === 'd') {
+        data[name] = view.getFloat64(offset + 1, true);
+        offset += 9;
+      } else {
+        data[name] = Math.round(view.getFloat32(offset + 1, true) * 1000) / 1000;
+        offset += 5;
+      }
+    }
+    
+    if (trailerLength) {
+      const trailer = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, offset, trailerLength)));
+      Object.entries(trailer).forEach(([name, value]) => {
+        if (value === null) {
+          delete data[name];
+        } else {
+          data[name] = value;
+        }
+      });
+    }
+    
+    // Keep a few recent states for deltas still in flight, then acknowledge this one
+    states.set(seq, data);
+    if (states.size > 32) {
+      states.delete(states.keys().next().value);
+    }
+    this.sendWebSocketMessage({ type: 'ack', topic: schema.topic, seq });
+    
+    return { type: `${schema.topic}_data`, seq, data };
+  }
+  
   /**
    * Register event listener
    */
@@ -241,6 +366,46 @@ class API {
     }
   }
   
+  /**
+   * Get several resources in one request, e.g. getBatch(['vehicle', 'mode', 'achievements', 'units'])
+   */
+  async getBatch(resources) {
+    try {
+      const etags = {};
+      resources.forEach(name => {
+        if (this.batchEtags[name]) etags[name] = this.batchEtags[name];
+      });
+      
+      const response = await fetch(`${this.baseUrl}/batch`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ resources, etags })
+      });
+      const result = await response.json();
+      
+      Object.assign(this.batchEtags, result.etags);
+      Object.assign(this.batchCache, result.resources);
+      
+      // Resources that failed to build are left out, not filled in from an older batch
+      const errors = result.errors || {};
+      const data = {};
+      resources.forEach(name => {
+        if (name in errors) {
+          delete this.batchCache[name];
+          delete this.batchEtags[name];
+          return;
+        }
+        data[name] = this.batchCache[name];
+      });
+      return data;
+    } catch (error) {
+      console.error('Error getting batch:', error);
+      throw error;
+    }
+  }
+  
   /**
    * Get vehicle data
    */
@@ -254,6 +419,44 @@ class API {
     }
   }
   
+  /**
+   * Get metric history downsampled on the server, e.g. getVehicleHistory(['rpm'], { seconds: 1800 })
+   */
+  async getVehicleHistory(metrics, { seconds = 600, start, end, points = 500, method = 'lttb', units } = {}) {
+    try {
+      const params = new URLSearchParams({ metrics: metrics.join(','), points, method });
+      this.addHistoryRange(params, { seconds, start, end, units });
+      const response = await fetch(`${this.baseUrl}/vehicle/history?${params}`);
+      return await response.json();
+    } catch (error) {
+      console.error('Error getting vehicle history:', error);
+      throw error;
+    }
+  }
+  
+  /**
+   * Get the GPS track downsampled on the server
+   */
+  async getGpsTrack({ seconds = 600, start, end, points = 500, units } = {}) {
+    try {
+      const params = new URLSearchParams({ points });
+      this.addHistoryRange(params, { seconds, start, end, units });
+      const response = await fetch(`${this.baseUrl}/gps/track?${params}`);
+      return await response.json();
+    } catch (error) {
+      console.error('Error getting GPS track:', error);
+      throw error;
+    }
+  }
+  
+  addHistoryRange(params, { seconds, start, end, units }) {
+    // A range with an end in the past is cacheable, "the last N seconds" is not
+    if (start !== undefined) params.set('start', start);
+    else params.set('seconds', seconds);
+    if (end !== undefined) params.set('end', end);
+    if (units) params.set('units', units);
+  }
+  
   /**
    * Get current mode
    */
@@ -289,8 +492,9 @@ class API {
   
   /**
    * Send voice command
+   * onToken(text, answerSoFar) is called as the answer streams in over the WebSocket
    */
-  async sendVoiceCommand(command) {
+  async sendVoiceCommand(command, onToken) {
     // Try WebSocket first for faster response
     if (this.ws && this.ws.readyState === WebSocket.OPEN) {
       const sent = this.sendWebSocketMessage({
@@ -301,10 +505,46 @@ class API {
       if (sent) {
         // Return a promise that will be resolved when we get the response
         return new Promise((resolve) => {
+          let queryId = null;
+          let answer = '';
+          let timer = null;
+          
+          const cleanup = () => {
+            clearTimeout(timer);
+            this.offMessage('ai_response', listener);
+            this.offMessage('command_rejected', rejected);
+            this.offMessage('command_received', received);
+            this.offMessage('ai_token', token);
+          };
+          
+          // Timeout after 10 seconds without a word from the AI
+          const restartTimer = () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+              cleanup();
+              resolve({
+                success: false,
+                text: "I'm having trouble processing that right now."
+              });
+            }, 10000);
+          };
+          
+          const received = (data) => {
+            queryId = data.query_id;
+          };
+          
+          // Pieces of the answer as they are generated
+          const token = (data) => {
+            if (queryId && data.query_id !== queryId) return;
+            answer += data.text;
+            restartTimer();
+            if (onToken) onToken(data.text, answer);
+          };
+          
           const listener = (data) => {
-            if (data.type === 'ai_response') {
-              // Remove the listener
-              this.offMessage('ai_response', listener);
+            if (data.type === 'ai_response' && (!queryId || data.query_id === queryId)) {
+              // Remove the listeners
+              cleanup();
               
               // Resolve with the response
               resolve({
@@ -314,17 +554,23 @@ class API {
             }
           };
           
-          // Add listener for response
-          this.onMessage('ai_response', listener);
-          
-          // Timeout after 10 seconds
-          setTimeout(() => {
-            this.offMessage('ai_response', listener);
+          // The AI is busy or this client asked too often
+          const rejected = (data) => {
+            cleanup();
             resolve({
               success: false,
-              text: "I'm having trouble processing that right now."
+              overloaded: true,
+              retryAfter: data.retry_after,
+              text: data.message
             });
-          }, 10000);
+          };
+          
+          // Add listeners for response
+          this.onMessage('ai_response', listener);
+          this.onMessage('command_rejected', rejected);
+          this.onMessage('command_received', received);
+          this.onMessage('ai_token', token);
+          restartTimer();
         });
       }
     }
@@ -338,8 +584,26 @@ class API {
         },
         body: JSON.stringify({ command })
       });
+      const received = await response.json();
+      if (response.status === 429 || response.status === 503) {
+        return { success: false, overloaded: true, retryAfter: received.retry_after, text: received.message };
+      }
+      if (!received.query_id) return received;
       
-      return await response.json();
+      // Long-poll for the answer, each request returns as soon as it is ready
+      for (let attempt = 0; attempt < 4; attempt++) {
+        const result = await fetch(`${this.baseUrl}/voice/result/${received.query_id}?timeout=25`);
+        if (result.status === 202) continue;
+        
+        const data = await result.json();
+        return {
+          success: data.status === 'done',
+          query_id: received.query_id,
+          text: data.status === 'done' ? data.response : "I'm having trouble processing that right now."
+        };
+      }
+      
+      return { success: false, query_id: received.query_id, text: "I'm still thinking about that." };
     } catch (error) {
       console.error('Error sending voice command:', error);
       throw error;